@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Benchmark de carga de la API, en proceso (sin uvicorn ni red)
+Ejecutar: python benchmarks/carga.py --db uta_bench [--concurrencia 20] [--duracion 15] [--salida r.json]
+          python benchmarks/carga.py --memoria --reclamos 10000
+          python benchmarks/carga.py --db uta_bench --comparar base.json
+
+Con --db se usa un mongod real (MONGO_URL) y una base ya poblada con
+benchmarks/datos.py. Con --memoria los datos se generan en un mongomock en
+memoria. Esto sirve para comparar la sobrecarga de la aplicación, no el
+costo de las consultas; la búsqueda por texto se omite allí.
+
+Cada escenario corre `--concurrencia` clientes concurrentes durante
+`--duracion` segundos contra la app ASGI (httpx.ASGITransport). Se informan
+p50/p95/p99 y peticiones por segundo, y con --salida el resultado en JSON
+para comparar entre commits.
+
+El escenario notificaciones_stream mide la apertura de un stream SSE: pedir
+el token de stream, conectar y recibir el primer evento (sync). httpx espera
+a que termine la respuesta, y un stream no termina, así que se conecta
+directamente a la app ASGI y se desconecta tras el primer evento.
+
+Requiere httpx (y mongomock-motor para --memoria). Para medir
+get_current_user sin la caché de usuarios, exportar USER_CACHE_TTL_SECONDS=0;
+para el modo sin estado, AUTH_MODE=stateless (y una --duracion menor que
+ACCESS_TOKEN_EXPIRE_MINUTES).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from dotenv import load_dotenv  # noqa: E402
+
+load_dotenv(BACKEND_DIR / '.env')
+
+BUSQUEDAS = ["frenos", "ventilación cabina", "LíneaB-CON", "matafuegos", "relevo turno"]
+
+
+# Each scenario returns (path, params, token) for one request
+ESCENARIOS = {
+    "reclamos_admin": lambda ctx, rng: ("/api/reclamos", {"limit": 50}, ctx["admin"]),
+    "reclamos_emisor": lambda ctx, rng: ("/api/reclamos", {"limit": 50}, rng.choice(ctx["emisores"])),
+    "reclamos_filtrados": lambda ctx, rng: (
+        "/api/reclamos", {"limit": 50, "linea": rng.choice(ctx["lineas"]), "estado": "Pendiente"}, ctx["admin"]
+    ),
+    "reclamos_resumen": lambda ctx, rng: ("/api/reclamos/resumen", {"limit": 200}, ctx["admin"]),
+    "reclamos_facetas": lambda ctx, rng: (
+        "/api/reclamos/search", {"limit": 50, "linea": rng.choice(ctx["lineas"])}, ctx["admin"]
+    ),
+    "reclamos_busqueda": lambda ctx, rng: (
+        "/api/reclamos", {"limit": 50, "search": rng.choice(BUSQUEDAS)}, ctx["admin"]
+    ),
+    "reclamo_detalle": lambda ctx, rng: (f"/api/reclamos/{rng.choice(ctx['ids'])}", {}, ctx["admin"]),
+    "comentarios": lambda ctx, rng: (f"/api/reclamos/{rng.choice(ctx['ids'])}/comentarios", {}, ctx["admin"]),
+    "estadisticas_admin": lambda ctx, rng: ("/api/estadisticas", {}, ctx["admin"]),
+    "estadisticas_emisor": lambda ctx, rng: ("/api/estadisticas", {}, rng.choice(ctx["emisores"])),
+    "auth_me": lambda ctx, rng: ("/api/auth/me", {}, rng.choice(ctx["emisores"])),
+    "notificaciones": lambda ctx, rng: ("/api/notifications", {}, rng.choice(ctx["emisores"])),
+    "notificaciones_no_leidas": lambda ctx, rng: (
+        "/api/notifications/unread/count", {}, rng.choice(ctx["emisores"])
+    ),
+}
+SOLO_MONGOD = {"reclamos_busqueda"}
+STREAM_PATH = "/api/notifications/stream"
+ESCENARIOS["notificaciones_stream"] = lambda ctx, rng: (STREAM_PATH, {}, rng.choice(ctx["emisores"]))
+
+
+def percentil(ordenados: list, p: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordenados:
+        return 0.0
+    k = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados) + 0.5) - 1))
+    return ordenados[k]
+
+
+def resumen(latencias: list, errores: int, segundos: float) -> dict:
+    ordenadas = sorted(latencias)
+    return {
+        "peticiones": len(latencias),
+        "errores": errores,
+        "rps": round(len(latencias) / segundos, 1) if segundos else 0,
+        "p50_ms": round(percentil(ordenadas, 50) * 1000, 2),
+        "p95_ms": round(percentil(ordenadas, 95) * 1000, 2),
+        "p99_ms": round(percentil(ordenadas, 99) * 1000, 2),
+        "max_ms": round(ordenadas[-1] * 1000, 2) if ordenadas else 0,
+    }
+
+
+async def primer_evento(app, http, token: str) -> int:
+    """Open the notification stream like the browser does and disconnect
+    after the first event. Returns the HTTP status of the stream, or of the
+    token request if that failed."""
+    response = await http.post("/api/notifications/stream-token", headers={"Authorization": f"Bearer {token}"})
+    if response.status_code >= 400:
+        return response.status_code
+
+    recibido = asyncio.Event()
+    estado = {"pedido": False, "status": 0}
+
+    async def receive():
+        if not estado["pedido"]:
+            estado["pedido"] = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # StreamingResponse ends the stream when the client disconnects
+        await recibido.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            estado["status"] = message["status"]
+        elif message["type"] == "http.response.body" and message.get("body"):
+            recibido.set()
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": STREAM_PATH, "raw_path": STREAM_PATH.encode(), "root_path": "",
+        "query_string": f"token={response.json()['token']}".encode(),
+        "headers": [(b"host", b"bench"), (b"accept", b"text/event-stream")],
+        "client": ("127.0.0.1", 0), "server": ("bench", 80),
+    }
+    await app(scope, receive, send)
+    return estado["status"]
+
+
+async def correr_escenario(http, ctx, escenario, concurrencia: int, duracion: float, seed: int) -> dict:
+    latencias, errores = [], 0
+    fin = time.perf_counter() + duracion
+
+    async def cliente(n: int):
+        nonlocal errores
+        rng = random.Random(f"{seed}-{escenario}-{n}")
+        while time.perf_counter() < fin:
+            path, params, token = ESCENARIOS[escenario](ctx, rng)
+            start = time.perf_counter()
+            if path == STREAM_PATH:
+                status = await primer_evento(ctx["app"], http, token)
+            else:
+                status = (await http.get(path, params=params, headers={"Authorization": f"Bearer {token}"})).status_code
+            latencias.append(time.perf_counter() - start)
+            if status >= 400:
+                errores += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(cliente(n) for n in range(concurrencia)))
+    return resumen(latencias, errores, time.perf_counter() - start)
+
+
+def commit_actual() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocido"
+
+
+def comparar(base: dict, actual: dict):
+    print(f"\n{'escenario':<26}{'p95 base':>10}{'p95 ahora':>11}{'Δ':>8}{'rps base':>10}{'rps ahora':>11}")
+    for escenario, r in actual["resultados"].items():
+        b = base["resultados"].get(escenario)
+        if not b:
+            continue
+        delta = (r["p95_ms"] - b["p95_ms"]) / b["p95_ms"] * 100 if b["p95_ms"] else 0
+        print(f"{escenario:<26}{b['p95_ms']:>10.2f}{r['p95_ms']:>11.2f}{delta:>+7.0f}%{b['rps']:>10.1f}{r['rps']:>11.1f}")
+
+
+async def main(args) -> int:
+    if args.db:
+        os.environ['DB_NAME'] = args.db
+    os.environ.setdefault('DB_NAME', 'uta_bench')
+    import httpx
+
+    import server
+    from benchmarks.datos import poblar
+
+    if args.memoria:
+        from mongomock_motor import AsyncMongoMockClient
+
+        # Point every module-level handle of server.py at the in-memory client
+        server.client = AsyncMongoMockClient(tz_aware=True)
+        server.db = server.client[os.environ['DB_NAME']]
+        server.notification_queue.collection = server.db.notifications
+        print(f"   generando {args.reclamos:,} reclamos en memoria...")
+        await poblar(server.db, args.reclamos, args.emisores, args.seed)
+        server.notification_queue.start()
+    else:
+        await server.startup_db_client()
+
+    db = server.db
+    reclamos = await db.reclamos.count_documents({})
+    if not reclamos:
+        print(f"❌ La base {db.name} no tiene reclamos; poblarla con benchmarks/datos.py")
+        return 1
+    admin = await db.users.find_one({"role": "ADMIN"}, {"_id": 0})
+    emisores = await db.users.find({"role": "EMISOR_RECLAMO"}, {"_id": 0}).to_list(200)
+    ids = [r["id"] for r in await db.reclamos.find({}, {"_id": 0, "id": 1}).limit(2000).to_list(2000)]
+    ctx = {
+        "admin": server.emitir_tokens(admin)["access_token"],
+        "emisores": [server.emitir_tokens(e)["access_token"] for e in emisores],
+        "lineas": await db.reclamos.distinct("linea"),
+        "ids": ids,
+        "app": server.app,
+    }
+
+    escenarios = args.escenarios or [e for e in ESCENARIOS if not (args.memoria and e in SOLO_MONGOD)]
+    resultados = {}
+    transport = httpx.ASGITransport(app=server.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+            print(f"{'escenario':<26}{'pet.':>8}{'err':>6}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}  (ms)")
+            for escenario in escenarios:
+                if args.calentamiento:
+                    await correr_escenario(http, ctx, escenario, args.concurrencia, args.calentamiento, args.seed)
+                r = await correr_escenario(http, ctx, escenario, args.concurrencia, args.duracion, args.seed)
+                resultados[escenario] = r
+                print(f"{escenario:<26}{r['peticiones']:>8}{r['errores']:>6}{r['rps']:>9.1f}"
+                      f"{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}")
+    finally:
+        await server.shutdown_db_client()
+
+    salida = {
+        "meta": {
+            "commit": commit_actual(),
+            "fecha": datetime.now(timezone.utc).isoformat(),
+            "backend": "memoria" if args.memoria else "mongod",
+            "reclamos": reclamos,
+            "concurrencia": args.concurrencia,
+            "duracion": args.duracion,
+            "seed": args.seed,
+            "python": platform.python_version(),
+        },
+        "resultados": resultados,
+    }
+    if args.salida:
+        args.salida.write_text(json.dumps(salida, indent=2))
+        print(f"✅ Resultados guardados en {args.salida}")
+    if args.comparar:
+        comparar(json.loads(args.comparar.read_text()), salida)
+    return 1 if any(r["errores"] for r in resultados.values()) else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", help="base ya poblada en MONGO_URL")
+    parser.add_argument("--memoria", action="store_true", help="usar mongomock con datos generados al vuelo")
+    parser.add_argument("--reclamos", type=int, default=10_000, help="reclamos a generar con --memoria")
+    parser.add_argument("--emisores", type=int, default=200, help="emisores a generar con --memoria")
+    parser.add_argument("--concurrencia", type=int, default=20)
+    parser.add_argument("--duracion", type=float, default=15, help="segundos por escenario")
+    parser.add_argument("--calentamiento", type=float, default=2, help="segundos sin medir antes de cada escenario")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--escenarios", nargs="+", choices=list(ESCENARIOS))
+    parser.add_argument("--salida", type=Path, help="guardar resultados en JSON")
+    parser.add_argument("--comparar", type=Path, help="JSON de una corrida anterior")
+    args = parser.parse_args()
+    if not args.db and not args.memoria:
+        parser.error("indicar --db o --memoria")
+    sys.exit(asyncio.run(main(args)))
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Generador de datos sintéticos para los benchmarks
+Ejecutar: python benchmarks/datos.py --reclamos 100000 [--emisores 500] [--seed 42] [--db uta_bench]
+
+Escribe en la base indicada (por defecto DB_NAME) usuarios, reclamos,
+comentarios y notificaciones con distribuciones parecidas a las reales, y deja
+listos los contadores de números de reclamo y las estadísticas materializadas.
+Con la misma semilla genera siempre los mismos datos. La base debe estar
+vacía: usar una base dedicada, nunca la de producción.
+
+Todos los usuarios generados tienen la contraseña "benchmark".
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from dotenv import load_dotenv  # noqa: E402
+from passlib.context import CryptContext  # noqa: E402
+from pymongo import UpdateOne  # noqa: E402
+
+from counters import CATEGORIA_CODIGOS, SEEDED_ID, codigo_categoria, counter_id, generar_numero_reclamo  # noqa: E402
+from search import numero_busqueda  # noqa: E402
+from stats import record_created_many  # noqa: E402
+
+load_dotenv(BACKEND_DIR / '.env')
+
+PASSWORD = "benchmark"
+# Weights are rough shares observed in production
+LINEAS = {"A": 15, "B": 20, "C": 15, "D": 20, "E": 10, "H": 12, "Premetro": 8}
+CATEGORIAS = {
+    "Condiciones de trabajo": 30,
+    "Faltante de materiales o elementos de seguridad": 20,
+    "Higiene y salubridad": 15,
+    "Seguridad y prevención": 12,
+    "Personal y recursos humanos": 10,
+    "Conflictos o situaciones laborales": 8,
+    "Otros reclamos gremiales": 5,
+}
+ESTADOS = {"Pendiente": 35, "En gestión": 25, "En negociación": 10, "Resuelto": 30}
+SECTORES = ["Cabecera", "Taller", "Boletería", "Andén", "Cabina", "Vestuario", "Depósito", "Señales"]
+PALABRAS = (
+    "falta ventilación cabina frenos relevo turno andén iluminación baño matafuegos guantes calzado "
+    "uniforme escalera mecánica molinete señal túnel vía limpieza descanso horario franco licencia "
+    "seguridad agresión pasajero supervisor"
+).split()
+RESPONSABLES = [None, "Mantenimiento", "Operaciones", "Recursos Humanos", "Seguridad e Higiene"]
+SPAN_DAYS = 730
+BATCH = 5000
+
+assert set(CATEGORIAS) == set(CATEGORIA_CODIGOS)
+
+
+def _pick(rng: random.Random, weights: dict):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+class Generador:
+    """Seeded factory of documents shaped like the ones server.py writes."""
+
+    def __init__(self, seed: int = 42, now: datetime = None):
+        self.rng = random.Random(seed)
+        self.now = now or datetime(2026, 1, 1, tzinfo=timezone.utc)
+        self.contadores = {}
+        # One cheap hash shared by every generated user
+        self.password_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash(PASSWORD)
+
+    def _uuid(self) -> str:
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def usuario(self, username: str, role: str = "EMISOR_RECLAMO", linea: str = None) -> dict:
+        return {
+            "id": self._uuid(),
+            "username": username,
+            "email": f"{username}@bench.uta",
+            "password_hash": self.password_hash,
+            "role": role,
+            "linea_asignada": linea,
+            "created_at": self.now - timedelta(days=SPAN_DAYS + 1),
+            "is_active": True,
+        }
+
+    def emisor(self, n: int) -> dict:
+        return self.usuario(f"bench-emisor{n}", linea=_pick(self.rng, LINEAS))
+
+    def reclamo(self, emisor: dict) -> dict:
+        rng = self.rng
+        linea = emisor["linea_asignada"]
+        categoria = _pick(rng, CATEGORIAS)
+        key = (linea, codigo_categoria(categoria))
+        self.contadores[key] = self.contadores.get(key, 0) + 1
+        numero = generar_numero_reclamo(linea, categoria, self.contadores[key])
+        creado = self.now - timedelta(seconds=rng.randrange(SPAN_DAYS * 86400))
+        estado = _pick(rng, ESTADOS)
+        # Most claims get a couple of replies, a few long threads
+        comentarios = min(int(rng.expovariate(1 / 2.5)), 40)
+        cierre = None
+        if estado == "Resuelto":
+            cierre = min(creado + timedelta(hours=rng.expovariate(1 / 240)), self.now)
+        return {
+            "id": self._uuid(),
+            "numero_reclamo": numero,
+            "numero_busqueda": numero_busqueda(numero),
+            "linea": linea,
+            "categoria": categoria,
+            "sector_estacion": f"{rng.choice(SECTORES)} {rng.randrange(1, 30)}",
+            "descripcion": " ".join(rng.choice(PALABRAS) for _ in range(int(rng.lognormvariate(3.2, 0.6)))),
+            "archivos": [f"/uploads/{rng.getrandbits(256):064x}.jpg" for _ in range(rng.choice((0, 0, 0, 1, 2)))],
+            "estado": estado,
+            "responsable": rng.choice(RESPONSABLES),
+            "comment_count": comentarios,
+            "last_comment_at": None,
+            "creator_id": emisor["id"],
+            "creator_username": emisor["username"],
+            "fecha_creacion": creado,
+            "fecha_cierre": cierre,
+            "solucion": "Resuelto con la gerencia" if cierre else None,
+            "responsable_cierre": "bench-admin" if cierre else None,
+            "version": comentarios,
+            "updated_at": creado,
+        }
+
+    def comentarios(self, reclamo: dict, admin: dict) -> list:
+        rng = self.rng
+        docs = []
+        momento = reclamo["fecha_creacion"]
+        for _ in range(reclamo["comment_count"]):
+            momento = min(momento + timedelta(minutes=rng.expovariate(1 / 600)), self.now)
+            autor = rng.choice((admin["username"], reclamo["creator_username"]))
+            docs.append({
+                "id": self._uuid(),
+                "reclamo_id": reclamo["id"],
+                "text": " ".join(rng.choice(PALABRAS) for _ in range(rng.randrange(3, 25))),
+                "author": autor,
+                "timestamp": momento,
+            })
+        if docs:
+            reclamo["last_comment_at"] = reclamo["updated_at"] = momento
+        return docs
+
+    def notificacion(self, reclamo: dict) -> dict:
+        return {
+            "id": self._uuid(),
+            "user_id": reclamo["creator_id"],
+            "reclamo_id": reclamo["id"],
+            "reclamo_numero": reclamo["numero_reclamo"],
+            "message": f"El administrador ha respondido a tu reclamo {reclamo['numero_reclamo']}",
+            "is_read": self.rng.random() < 0.7,
+            "created_at": reclamo["last_comment_at"],
+        }
+
+
+async def poblar(db, reclamos: int, emisores: int = 500, seed: int = 42, progreso: bool = False) -> dict:
+    """Fill an empty database. Returns {"admin": user, "emisores": [users]}."""
+    gen = Generador(seed)
+    admin = gen.usuario("bench-admin", role="ADMIN")
+    usuarios = [gen.emisor(n) for n in range(emisores)]
+    await db.users.insert_many([dict(u) for u in [admin, *usuarios]])
+
+    start = time.perf_counter()
+    for offset in range(0, reclamos, BATCH):
+        lote, comentarios, notificaciones = [], [], []
+        for _ in range(min(BATCH, reclamos - offset)):
+            reclamo = gen.reclamo(gen.rng.choice(usuarios))
+            comentarios.extend(gen.comentarios(reclamo, admin))
+            if reclamo["comment_count"]:
+                notificaciones.append(gen.notificacion(reclamo))
+            lote.append(reclamo)
+        await db.reclamos.insert_many([dict(r) for r in lote], ordered=False)
+        if comentarios:
+            await db.comentarios.insert_many(comentarios, ordered=False)
+        if notificaciones:
+            await db.notifications.insert_many(notificaciones, ordered=False)
+        await record_created_many(db, lote)
+        if progreso:
+            hechos = offset + len(lote)
+            print(f"   {hechos:>9,} reclamos ({hechos / (time.perf_counter() - start):,.0f}/s)", end="\r")
+    if progreso:
+        print()
+
+    # Counters continue after the generated numbers; mark them seeded so
+    # startup does not rescan every claim
+    ops = [
+        UpdateOne({"_id": counter_id(linea, codigo)}, {"$max": {"valor": valor}}, upsert=True)
+        for (linea, codigo), valor in gen.contadores.items()
+    ]
+    ops.append(UpdateOne({"_id": SEEDED_ID}, {"$set": {"valor": 1}}, upsert=True))
+    await db.contadores.bulk_write(ops, ordered=False)
+    return {"admin": admin, "emisores": usuarios}
+
+
+async def main(args) -> int:
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    from indexes import ensure_indexes
+
+    # Conectar a MongoDB
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    db = client[args.db or os.environ['DB_NAME']]
+    try:
+        if await db.reclamos.estimated_document_count():
+            print(f"❌ La base {db.name} ya tiene reclamos; usar una base vacía")
+            return 1
+        await ensure_indexes(db)
+        await poblar(db, args.reclamos, args.emisores, args.seed, progreso=True)
+    finally:
+        client.close()
+    print(f"✅ {args.reclamos:,} reclamos generados en {db.name}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reclamos", type=int, default=10_000)
+    parser.add_argument("--emisores", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", help="base de datos destino (por defecto DB_NAME)")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark de serialización de listas de reclamos
+Ejecutar: python benchmarks/serializacion.py [--n 1000] [--repeat 20]
+
+Compara, por lista de N reclamos:
+  - default: lo que hace FastAPI con response_model=ReclamosPage
+    (construir el modelo, revalidarlo, jsonable_encoder y json.dumps)
+  - fast:    el camino FAST_JSON (trusted_page + orjson)
+e informa también el tamaño del cuerpo sin comprimir, gzip y brotli.
+No necesita MongoDB: los documentos son sintéticos.
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+# server.py reads these at import time; the client never connects here
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'benchmark')
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+
+import fast_json  # noqa: E402
+from benchmarks.datos import Generador  # noqa: E402
+from server import Reclamo, ReclamosPage  # noqa: E402
+
+
+async def default_path(field, docs) -> bytes:
+    page = ReclamosPage(items=docs, next_cursor="abc", prev_cursor=None)
+    content = await serialize_response(field=field, response_content=page)
+    return JSONResponse(content).body
+
+
+def fast_path(docs) -> bytes:
+    return fast_json.trusted_page(Reclamo, docs, "abc", None).body
+
+
+def medir(fn, repeat: int) -> float:
+    """Best of `repeat` runs, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=1000, help="reclamos por lista")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    gen = Generador(args.seed)
+    emisores = [gen.emisor(i) for i in range(50)]
+    docs = [gen.reclamo(gen.rng.choice(emisores)) for _ in range(args.n)]
+    field = create_response_field(name="Response_obtener_reclamos", type_=ReclamosPage)
+    loop = asyncio.new_event_loop()
+
+    default_body = loop.run_until_complete(default_path(field, docs))
+    t_default = medir(lambda: loop.run_until_complete(default_path(field, docs)), args.repeat)
+    print(f"default: {t_default * 1000:8.2f} ms  ({t_default / args.n * 1e6:6.1f} µs/reclamo)")
+
+    if fast_json.orjson is None:
+        print("⚠️  orjson no está instalado: se omite el camino rápido")
+        fast_body = default_body
+    else:
+        fast_body = fast_path(docs)
+        t_fast = medir(lambda: fast_path(docs), args.repeat)
+        print(f"fast:    {t_fast * 1000:8.2f} ms  ({t_fast / args.n * 1e6:6.1f} µs/reclamo)  "
+              f"x{t_default / t_fast:.1f}")
+        if json.loads(fast_body) != json.loads(default_body):
+            print("⚠️  los cuerpos de ambos caminos difieren")
+
+    print(f"\ncuerpo:  {len(fast_body):>9,} bytes")
+    print(f"gzip:    {len(gzip.compress(fast_body, compresslevel=9)):>9,} bytes")
+    try:
+        import brotli
+        print(f"brotli:  {len(brotli.compress(fast_body, quality=4)):>9,} bytes")
+    except ImportError:
+        pass
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
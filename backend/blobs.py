@@ -0,0 +1,100 @@
+"""
+Content-addressed storage for claim attachments.
+
+The request body is not streamed into the store. Starlette's multipart
+parser has already spooled the whole file before the handler runs: up to
+1 MB in memory, the rest in a temporary file. Oversized bodies are
+therefore spooled too; subir_archivo only refuses to copy them.
+store_upload then copies the spooled file in chunks into
+uploads/<sha256><ext>, hashing with SHA-256 as it goes, so memory stays
+bounded but the bytes hit disk twice. Identical files are stored once.
+The `archivos` collection holds one document per blob (_id = hash) with a
+reference count of the claims pointing at it, so unreferenced blobs can
+be removed later by gc_uploads.py.
+"""
+
+import asyncio
+import hashlib
+import os
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable
+
+from pymongo import ReturnDocument
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def _write_chunk(fh, digest, chunk: bytes):
+    # hashlib and file writes both release the GIL for large buffers
+    digest.update(chunk)
+    fh.write(chunk)
+
+
+def _discard(fh, path: Path):
+    fh.close()
+    path.unlink(missing_ok=True)
+
+
+async def store_upload(db, upload, uploads_dir: Path, max_bytes: int) -> dict:
+    """Copy the spooled `upload` into the blob store and return its `archivos` document.
+
+    Raises UploadTooLarge as soon as more than max_bytes have been read.
+    """
+    tmp_path = uploads_dir / f".tmp-{uuid.uuid4()}"
+    digest = hashlib.sha256()
+    size = 0
+    fh = await asyncio.to_thread(open, tmp_path, "wb")
+    try:
+        while chunk := await upload.read(CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge()
+            await asyncio.to_thread(_write_chunk, fh, digest, chunk)
+        await asyncio.to_thread(fh.close)
+    except BaseException:
+        await asyncio.to_thread(_discard, fh, tmp_path)
+        raise
+
+    sha256 = digest.hexdigest()
+    now = datetime.now(timezone.utc)
+    blob = await db.archivos.find_one_and_update(
+        {"_id": sha256},
+        {
+            "$setOnInsert": {
+                "filename": f"{sha256}{Path(upload.filename or '').suffix.lower()}",
+                "size": size,
+                "content_type": upload.content_type,
+                "ref_count": 0,
+                "created_at": now,
+            },
+            # Keeps a fresh upload out of gc before its reference is counted
+            "$set": {"last_uploaded_at": now},
+        },
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+
+    target = uploads_dir / blob["filename"]
+    if await asyncio.to_thread(target.exists):
+        await asyncio.to_thread(tmp_path.unlink)
+    else:
+        await asyncio.to_thread(os.replace, tmp_path, target)
+    return blob
+
+
+async def add_reference(db, sha256: str):
+    await db.archivos.update_one({"_id": sha256}, {"$inc": {"ref_count": 1}})
+
+
+async def release_references(db, urls: Iterable[str]):
+    """Drop one reference for every blob URL in `urls`. Files uploaded before
+    the blob store have no `archivos` document and are left alone."""
+    hashes = [Path(url).stem for url in urls]
+    if hashes:
+        await db.archivos.update_many({"_id": {"$in": hashes}}, {"$inc": {"ref_count": -1}})
@@ -0,0 +1,336 @@
+"""
+Bulk import of users, invitations and historical claims from CSV or NDJSON.
+
+Used by the /api/import endpoints and by importar.py. Every row is validated
+first, and rows that fail are reported instead of aborting the import. The
+rest are written with insert_many(ordered=False) in chunks, so one bad row
+(e.g. a username taken meanwhile) only costs that row. Passwords are hashed
+on PasswordHasher's process pool, and claim numbers are reserved with one
+counter update per (linea, categoria) instead of one per claim.
+
+Numbers are reserved only for rows that passed validation, but a row can
+still fail at insert time (e.g. a write error). Its number is not handed
+out again, so the sequence has a gap there, as it does for a deleted claim.
+Numbers are unique, not contiguous.
+
+Usernames and emails are compared exactly, both within the file and
+against existing users, the way the unique indexes and the API compare them.
+
+Every import returns a report:
+    {"total": n, "importados": n, "errores": [{"fila": n, "errores": [...]}], "creados": [...]}
+where `fila` is the 1-based data row (CSV header excluded).
+"""
+
+import csv
+import io
+import json
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, ConfigDict, EmailStr, ValidationError, field_validator
+from pymongo.errors import BulkWriteError
+
+from counters import codigo_categoria, generar_numero_reclamo, reserve_block
+from http_cache import bump_generation
+from search import numero_busqueda
+from serialization import to_datetime
+from stats import record_created_many
+
+INSERT_CHUNK = 1000
+ROLES = ("ADMIN", "EMISOR_RECLAMO")
+FORMATOS = ("csv", "ndjson")
+
+
+class UsuarioFila(BaseModel):
+    model_config = ConfigDict(extra="ignore", str_strip_whitespace=True)
+
+    username: str
+    email: EmailStr
+    password: str
+    role: str = "EMISOR_RECLAMO"
+    linea_asignada: Optional[str] = None
+
+    @field_validator("role")
+    @classmethod
+    def _role(cls, value):
+        if value not in ROLES:
+            raise ValueError(f"must be one of {', '.join(ROLES)}")
+        return value
+
+
+class ReclamoFila(BaseModel):
+    model_config = ConfigDict(extra="ignore", str_strip_whitespace=True)
+
+    linea: str
+    categoria: str
+    sector_estacion: str
+    descripcion: str
+    estado: str = "Pendiente"
+    responsable: Optional[str] = None
+    solucion: Optional[str] = None
+    responsable_cierre: Optional[str] = None
+    creator_username: Optional[str] = None
+    fecha_creacion: Optional[datetime] = None
+    fecha_cierre: Optional[datetime] = None
+
+
+class Report:
+    def __init__(self, total: int):
+        self.total = total
+        self.errores: Dict[int, List[str]] = defaultdict(list)
+        self.creados: List[dict] = []
+
+    def error(self, fila: int, mensaje: str):
+        self.errores[fila].append(mensaje)
+
+    def as_dict(self) -> dict:
+        return {
+            "total": self.total,
+            "importados": len(self.creados),
+            "errores": [{"fila": fila, "errores": msgs} for fila, msgs in sorted(self.errores.items())],
+            "creados": self.creados,
+        }
+
+
+def detect_format(filename: Optional[str]) -> str:
+    return "ndjson" if (filename or "").lower().endswith((".ndjson", ".jsonl", ".json")) else "csv"
+
+
+def parse_rows(data: bytes, formato: str) -> Tuple[List[Tuple[int, dict]], Dict[int, str]]:
+    """Split an upload into (fila, raw row) pairs. Rows that cannot even be
+    parsed are returned separately as {fila: error}."""
+    text = data.decode("utf-8-sig")
+    rows, errores = [], {}
+    if formato == "csv":
+        for fila, row in enumerate(csv.DictReader(io.StringIO(text)), start=1):
+            # Empty cells mean "not given", so optional fields get their default
+            rows.append((fila, {k: v for k, v in row.items() if k and v not in (None, "")}))
+    else:
+        fila = 0
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            fila += 1
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as exc:
+                errores[fila] = f"invalid JSON: {exc.msg}"
+                continue
+            if not isinstance(row, dict):
+                errores[fila] = "each line must be a JSON object"
+                continue
+            rows.append((fila, row))
+    return rows, errores
+
+
+def _validate(model, rows, report: Report) -> list:
+    valid = []
+    for fila, row in rows:
+        try:
+            valid.append((fila, model(**row)))
+        except ValidationError as exc:
+            for err in exc.errors():
+                report.error(fila, f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}")
+    return valid
+
+
+def _unique_in_file(valid, report: Report) -> list:
+    fields = ("username", "email")
+    seen = {field: {} for field in fields}
+    kept = []
+    for fila, item in valid:
+        duplicated = False
+        for field in fields:
+            value = getattr(item, field)
+            if value in seen[field]:
+                report.error(fila, f"{field}: duplicates row {seen[field][value]}")
+                duplicated = True
+            else:
+                seen[field][value] = fila
+        if not duplicated:
+            kept.append((fila, item))
+    return kept
+
+
+async def _not_registered(db, valid, report: Report) -> list:
+    """Drop rows whose username or email already belongs to a user (one query)."""
+    if not valid:
+        return valid
+    existing = await db.users.find(
+        {"$or": [
+            {"username": {"$in": [item.username for _, item in valid]}},
+            {"email": {"$in": [item.email for _, item in valid]}},
+        ]},
+        {"_id": 0, "username": 1, "email": 1},
+    ).to_list(None)
+    usernames = {u["username"] for u in existing}
+    emails = {u["email"] for u in existing}
+    kept = []
+    for fila, item in valid:
+        if item.username in usernames:
+            report.error(fila, "username: already exists")
+        elif item.email in emails:
+            report.error(fila, "email: already registered")
+        else:
+            kept.append((fila, item))
+    return kept
+
+
+async def _insert(collection, docs: List[Tuple[int, dict]], report: Report) -> List[Tuple[int, dict]]:
+    """insert_many(ordered=False) in chunks; returns the (fila, doc) pairs written."""
+    written = []
+    for start in range(0, len(docs), INSERT_CHUNK):
+        chunk = docs[start:start + INSERT_CHUNK]
+        failed = set()
+        try:
+            # insert_many adds _id to what it is given; keep the originals clean
+            await collection.insert_many([dict(doc) for _, doc in chunk], ordered=False)
+        except BulkWriteError as exc:
+            for err in exc.details.get("writeErrors", []):
+                fila = chunk[err["index"]][0]
+                failed.add(err["index"])
+                if err.get("code") == 11000:
+                    fields = ", ".join(err.get("keyValue", {})) or "key"
+                    report.error(fila, f"{fields}: already exists")
+                else:
+                    report.error(fila, err.get("errmsg", "write failed"))
+        written.extend(pair for i, pair in enumerate(chunk) if i not in failed)
+    return written
+
+
+async def import_users(db, rows, hasher, dry_run: bool = False, report: Optional[Report] = None) -> dict:
+    report = report or Report(len(rows))
+    valid = _validate(UsuarioFila, rows, report)
+    valid = await _not_registered(db, _unique_in_file(valid, report), report)
+    if dry_run:
+        report.creados = [{"fila": fila, "username": item.username} for fila, item in valid]
+        return report.as_dict()
+
+    hashes = await hasher.hash_many([item.password for _, item in valid])
+    now = datetime.now(timezone.utc)
+    docs = [
+        (fila, {
+            "id": str(uuid.uuid4()),
+            "username": item.username,
+            "email": item.email,
+            "password_hash": password_hash,
+            "role": item.role,
+            "linea_asignada": item.linea_asignada,
+            "created_at": now,
+            "is_active": True,
+        })
+        for (fila, item), password_hash in zip(valid, hashes)
+    ]
+    for fila, doc in await _insert(db.users, docs, report):
+        report.creados.append({"fila": fila, "id": doc["id"], "username": doc["username"]})
+    return report.as_dict()
+
+
+async def import_invitations(db, rows, dry_run: bool = False, report: Optional[Report] = None) -> dict:
+    report = report or Report(len(rows))
+    valid = _validate(UsuarioFila, rows, report)
+    valid = await _not_registered(db, _unique_in_file(valid, report), report)
+    if dry_run:
+        report.creados = [{"fila": fila, "username": item.username} for fila, item in valid]
+        return report.as_dict()
+
+    now = datetime.now(timezone.utc)
+    docs = [
+        (fila, {
+            "id": str(uuid.uuid4()),
+            "token": str(uuid.uuid4()),
+            "username": item.username,
+            "email": item.email,
+            # Invitations keep the password until accepted, like create_invitation
+            "password": item.password,
+            "linea_asignada": item.linea_asignada,
+            "used": False,
+            "created_at": now,
+            "expires_at": now + timedelta(days=7),
+        })
+        for fila, item in valid
+    ]
+    for fila, doc in await _insert(db.invitations, docs, report):
+        report.creados.append({"fila": fila, "id": doc["id"], "username": doc["username"], "token": doc["token"]})
+    return report.as_dict()
+
+
+async def import_reclamos(db, rows, dry_run: bool = False, report: Optional[Report] = None) -> dict:
+    report = report or Report(len(rows))
+    valid = _validate(ReclamoFila, rows, report)
+
+    # Resolve every creator_username with one query
+    usernames = {item.creator_username for _, item in valid if item.creator_username}
+    creators = {}
+    if usernames:
+        async for user in db.users.find({"username": {"$in": list(usernames)}}, {"_id": 0, "id": 1, "username": 1}):
+            creators[user["username"]] = user["id"]
+    resolved = []
+    for fila, item in valid:
+        if item.creator_username and item.creator_username not in creators:
+            report.error(fila, f"creator_username: unknown user {item.creator_username}")
+        else:
+            resolved.append((fila, item))
+    if dry_run:
+        report.creados = [{"fila": fila} for fila, _ in resolved]
+        return report.as_dict()
+
+    # One block of claim numbers per (linea, categoria code)
+    grupos = defaultdict(list)
+    for pair in resolved:
+        grupos[(pair[1].linea, codigo_categoria(pair[1].categoria))].append(pair)
+    numeros = {}
+    for (linea, codigo), pairs in grupos.items():
+        first = await reserve_block(db, linea, codigo, len(pairs))
+        for offset, (fila, _) in enumerate(pairs):
+            numeros[fila] = first + offset
+
+    now = datetime.now(timezone.utc)
+    docs = []
+    for fila, item in resolved:
+        numero = generar_numero_reclamo(item.linea, item.categoria, numeros[fila])
+        docs.append((fila, {
+            "id": str(uuid.uuid4()),
+            "numero_reclamo": numero,
+            "numero_busqueda": numero_busqueda(numero),
+            "linea": item.linea,
+            "categoria": item.categoria,
+            "sector_estacion": item.sector_estacion,
+            "descripcion": item.descripcion,
+            "archivos": [],
+            "estado": item.estado,
+            "responsable": item.responsable,
+            "comment_count": 0,
+            "last_comment_at": None,
+            "creator_id": creators.get(item.creator_username),
+            "creator_username": item.creator_username,
+            # Naive dates in the file are taken as UTC
+            "fecha_creacion": to_datetime(item.fecha_creacion) or now,
+            "fecha_cierre": to_datetime(item.fecha_cierre),
+            "solucion": item.solucion,
+            "responsable_cierre": item.responsable_cierre,
+            "version": 0,
+            "updated_at": now,
+        }))
+    written = await _insert(db.reclamos, docs, report)
+    if written:
+        await record_created_many(db, [doc for _, doc in written])
+        await bump_generation(db)
+    for fila, doc in written:
+        report.creados.append({"fila": fila, "id": doc["id"], "numero_reclamo": doc["numero_reclamo"]})
+    return report.as_dict()
+
+
+async def run_import(db, tipo: str, data: bytes, formato: str, hasher=None, dry_run: bool = False) -> dict:
+    """Parse `data` and import it as `tipo` (usuarios, invitaciones or reclamos)."""
+    rows, parse_errors = parse_rows(data, formato)
+    report = Report(len(rows) + len(parse_errors))
+    for fila, mensaje in parse_errors.items():
+        report.error(fila, mensaje)
+    if tipo == "usuarios":
+        return await import_users(db, rows, hasher, dry_run, report)
+    if tipo == "invitaciones":
+        return await import_invitations(db, rows, dry_run, report)
+    return await import_reclamos(db, rows, dry_run, report)
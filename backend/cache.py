@@ -0,0 +1,79 @@
+"""
+Small in-process TTL + LRU cache.
+
+Entries expire `ttl` seconds after being stored and the least recently used
+entry is dropped once `maxsize` is reached. A ttl of 0 disables the cache:
+every lookup is a miss and nothing is stored. Each worker process has its
+own cache, so writers must evict the keys they change.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.maxsize > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        if not self.enabled:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else None,
+        }
+
+
+def list_cache_key(kind: Hashable, generation: int, current_user: dict, query: dict, search: Optional[str],
+                   cursor: Optional[str], limit: int) -> tuple:
+    """Key of a cached claim list page. `kind` tells apart pages of different
+    shape (e.g. the projection). Emisores get entries of their own; admins
+    share them. Blank searches key like no search, as they list the same."""
+    scope = current_user["id"] if current_user["role"] == "EMISOR_RECLAMO" else "ADMIN"
+    return (kind, generation, scope, tuple(sorted(query.items())), (search or "").strip() or None, cursor, limit)
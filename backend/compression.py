@@ -0,0 +1,48 @@
+"""
+Response compression for the API.
+
+Responses of at least COMPRESS_MIN_BYTES are compressed with brotli when the
+optional brotli-asgi package is installed and the client accepts it.
+Otherwise they are gzipped. A compressed body is a different representation,
+so a strong ETag is weakened on the way out, the way nginx does it.
+Conditional requests compare ETags weakly anyway (see http_cache.is_fresh).
+
+Some paths are never compressed. The SSE stream would be held back by the
+compressor's buffer. Uploads are mostly already-compressed images and are
+served with range support.
+"""
+
+from starlette.datastructures import MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:  # optional dependency
+    BrotliMiddleware = None
+
+EXCLUDED_PREFIXES = ("/api/notifications/stream", "/uploads")
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = 1024, excluded_prefixes=EXCLUDED_PREFIXES):
+        self.app = app
+        self.excluded_prefixes = tuple(excluded_prefixes)
+        if BrotliMiddleware is not None:
+            self.compressed = BrotliMiddleware(app, minimum_size=minimum_size, gzip_fallback=True)
+        else:
+            self.compressed = GZipMiddleware(app, minimum_size=minimum_size)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.excluded_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_weakened(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                etag = headers.get("etag")
+                if "content-encoding" in headers and etag and not etag.startswith("W/"):
+                    headers["etag"] = "W/" + etag
+            await send(message)
+
+        await self.compressed(scope, receive, send_weakened)
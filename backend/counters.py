@@ -0,0 +1,168 @@
+"""
+Atomic sequence counters for claim numbers.
+
+Each (linea, category code) pair has a document in `contadores` holding the
+last number handed out. find_one_and_update with $inc is atomic, so
+concurrent creates get distinct numbers and deleting a claim never makes a
+number come back.
+
+Before the counters, numbers were derived from a count of existing claims,
+so a delete could make one be handed out twice. The unique index on
+numero_reclamo cannot be built over such data, and without it nothing
+backs the counters up: check_unique_numbers() refuses to start the server
+until renumber_duplicates() (manage_indexes.py --renumerar-duplicados) has
+given the later copies fresh numbers.
+"""
+
+import logging
+from typing import List
+
+from pymongo import ReturnDocument, UpdateOne
+
+from search import numero_busqueda
+
+logger = logging.getLogger(__name__)
+
+SEEDED_ID = "reclamo:seeded"
+
+CATEGORIA_CODIGOS = {
+    "Condiciones de trabajo": "CON",
+    "Faltante de materiales o elementos de seguridad": "MAT",
+    "Higiene y salubridad": "HIG",
+    "Seguridad y prevención": "SEG",
+    "Personal y recursos humanos": "PER",
+    "Conflictos o situaciones laborales": "LAB",
+    "Otros reclamos gremiales": "OTR"
+}
+
+
+def codigo_categoria(categoria: str) -> str:
+    return CATEGORIA_CODIGOS.get(categoria, "OTR")
+
+
+def generar_numero_reclamo(linea: str, categoria: str, contador: int) -> str:
+    return f"Línea{linea}-{codigo_categoria(categoria)}-{contador:04d}"
+
+
+def counter_id(linea: str, codigo: str) -> str:
+    return f"reclamo:{linea}:{codigo}"
+
+
+async def next_numero(db, linea: str, codigo: str) -> int:
+    doc = await db.contadores.find_one_and_update(
+        {"_id": counter_id(linea, codigo)},
+        {"$inc": {"valor": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return doc["valor"]
+
+
+async def reserve_block(db, linea: str, codigo: str, count: int) -> int:
+    """Reserve `count` consecutive numbers with a single $inc and return the
+    first one. Used by bulk imports instead of one round trip per claim."""
+    doc = await db.contadores.find_one_and_update(
+        {"_id": counter_id(linea, codigo)},
+        {"$inc": {"valor": count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return doc["valor"] - count + 1
+
+
+async def seed_counters(db) -> int:
+    """Start every counter at the highest number already used.
+
+    Claim numbers look like "Línea{linea}-{COD}-{n:04d}"; the last two
+    dash-separated parts give the category code and the sequence. $max makes
+    this safe to run again or concurrently from several workers.
+    """
+    pipeline = [
+        {"$project": {"_id": 0, "linea": 1, "partes": {"$split": ["$numero_reclamo", "-"]}}},
+        {"$group": {
+            "_id": {"linea": "$linea", "codigo": {"$arrayElemAt": ["$partes", -2]}},
+            "maximo": {"$max": {"$convert": {
+                "input": {"$arrayElemAt": ["$partes", -1]}, "to": "int", "onError": 0, "onNull": 0
+            }}},
+        }},
+    ]
+    ops = []
+    async for row in db.reclamos.aggregate(pipeline):
+        if row["_id"].get("codigo") is None:
+            continue
+        ops.append(UpdateOne(
+            {"_id": counter_id(row["_id"]["linea"], row["_id"]["codigo"])},
+            {"$max": {"valor": row["maximo"]}},
+            upsert=True,
+        ))
+    if ops:
+        await db.contadores.bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+async def ensure_counters_seeded(db) -> bool:
+    """Run the one-time seeding migration unless it already ran. Returns True if it did."""
+    if await db.contadores.find_one({"_id": SEEDED_ID}):
+        return False
+    await seed_counters(db)
+    await db.contadores.update_one({"_id": SEEDED_ID}, {"$set": {"valor": 1}}, upsert=True)
+    return True
+
+
+class DuplicateClaimNumbers(RuntimeError):
+    pass
+
+
+async def find_duplicate_numbers(db, limit: int = 50) -> List[dict]:
+    """Claim numbers used more than once: [{"numero": n, "ids": [...]}], oldest claim first."""
+    pipeline = [
+        {"$sort": {"fecha_creacion": 1, "id": 1}},
+        {"$group": {"_id": "$numero_reclamo", "ids": {"$push": "$id"}, "n": {"$sum": 1}}},
+        {"$match": {"n": {"$gt": 1}}},
+        {"$limit": limit},
+    ]
+    return [
+        {"numero": row["_id"], "ids": row["ids"]}
+        async for row in db.reclamos.aggregate(pipeline, allowDiskUse=True)
+    ]
+
+
+async def check_unique_numbers(db):
+    """Raise DuplicateClaimNumbers if any claim number is used twice.
+
+    Skipped when the unique index exists, since the index already
+    guarantees there are none.
+    """
+    async for info in db.reclamos.list_indexes():
+        if info["name"] == "numero_reclamo_unique":
+            return
+    duplicates = await find_duplicate_numbers(db, limit=5)
+    if duplicates:
+        raise DuplicateClaimNumbers(
+            f"Claim numbers used more than once (e.g. {', '.join(d['numero'] for d in duplicates)}); "
+            "the numero_reclamo_unique index cannot be built. Run "
+            "`python manage_indexes.py --renumerar-duplicados` and restart."
+        )
+
+
+async def renumber_duplicates(db) -> List[dict]:
+    """Give every copy of a duplicated claim number but the oldest a new
+    number from its counter. Returns [{"id", "antes", "despues"}]."""
+    await seed_counters(db)
+    changes = []
+    while duplicates := await find_duplicate_numbers(db):
+        for duplicate in duplicates:
+            for reclamo_id in duplicate["ids"][1:]:
+                reclamo = await db.reclamos.find_one(
+                    {"id": reclamo_id}, {"_id": 0, "linea": 1, "categoria": 1, "numero_reclamo": 1}
+                )
+                codigo = codigo_categoria(reclamo["categoria"])
+                numero = generar_numero_reclamo(reclamo["linea"], reclamo["categoria"],
+                                                await next_numero(db, reclamo["linea"], codigo))
+                await db.reclamos.update_one(
+                    {"id": reclamo_id},
+                    {"$set": {"numero_reclamo": numero, "numero_busqueda": numero_busqueda(numero)}},
+                )
+                logger.warning("Claim %s renumbered from %s to %s", reclamo_id, reclamo["numero_reclamo"], numero)
+                changes.append({"id": reclamo_id, "antes": reclamo["numero_reclamo"], "despues": numero})
+    return changes
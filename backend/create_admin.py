@@ -38,7 +38,7 @@ async def create_admin():
         "password_hash": pwd_context.hash("admin123"),
         "role": "ADMIN",
         "linea_asignada": None,
-        "created_at": datetime.now(timezone.utc).isoformat(),
+        "created_at": datetime.now(timezone.utc),
         "is_active": True
     }
     
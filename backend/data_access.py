@@ -0,0 +1,112 @@
+"""
+Single-round-trip writes for claims and users.
+
+Authorization is folded into the write filter: an emisor's write only
+matches claims it created, so the common case is one find_one_and_update
+or update_one and no read beforehand. When a write matches nothing,
+explain_miss() does the one extra read that tells a missing claim (404)
+from someone else's (403). That read only happens on the failure path,
+except for uploads, which check first so a rejected upload stores nothing.
+
+Uniqueness of usernames, emails and claim numbers is left to the unique
+indexes (see indexes.py): inserts catch DuplicateKeyError and
+duplicate_field() says which key collided.
+"""
+
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+MISSING, FORBIDDEN, UNCHANGED = "missing", "forbidden", "unchanged"
+
+
+def marcar_modificado(update: dict) -> dict:
+    """Add the version bump every claim write must carry to an update document."""
+    update.setdefault("$set", {})["updated_at"] = datetime.now(timezone.utc)
+    update.setdefault("$inc", {})["version"] = 1
+    return update
+
+
+def reclamo_filter(reclamo_id: str, current_user: dict, **extra) -> dict:
+    """Filter matching the claim only if `current_user` may write to it."""
+    query = {"id": reclamo_id, **extra}
+    if current_user["role"] == "EMISOR_RECLAMO":
+        query["creator_id"] = current_user["id"]
+    return query
+
+
+async def explain_miss(db, reclamo_id: str, current_user: dict) -> str:
+    """Why a scoped write matched nothing: MISSING, FORBIDDEN or UNCHANGED
+    (the claim is writable but an extra filter condition did not hold)."""
+    reclamo = await db.reclamos.find_one({"id": reclamo_id}, {"_id": 0, "creator_id": 1})
+    if reclamo is None:
+        return MISSING
+    if current_user["role"] == "EMISOR_RECLAMO" and reclamo.get("creator_id") != current_user["id"]:
+        return FORBIDDEN
+    return UNCHANGED
+
+
+async def update_reclamo(db, reclamo_id: str, fields: dict, projection: dict) -> Optional[Tuple[dict, dict]]:
+    """Apply an admin edit and return (before, after), or None if the claim
+    does not exist. Resolving sets fecha_cierre only when it is still empty,
+    which needs a pipeline update so the check happens on the server."""
+    now = datetime.now(timezone.utc)
+    if fields.get("estado") == "Resuelto":
+        # $literal: user text starting with "$" must not be read as a field path
+        update = [{"$set": {
+            **{k: {"$literal": v} for k, v in fields.items()},
+            "fecha_cierre": {"$ifNull": ["$fecha_cierre", now]},
+            "updated_at": now,
+            "version": {"$add": [{"$ifNull": ["$version", 0]}, 1]},
+        }}]
+    else:
+        update = {"$set": {**fields, "updated_at": now}, "$inc": {"version": 1}}
+
+    # BEFORE, because the statistics rollups need the old values; the new
+    # document is the old one with the same changes applied
+    before = await db.reclamos.find_one_and_update(
+        {"id": reclamo_id}, update, projection=projection, return_document=ReturnDocument.BEFORE
+    )
+    if before is None:
+        return None
+    after = {**before, **fields, "updated_at": now, "version": before.get("version", 0) + 1}
+    if fields.get("estado") == "Resuelto":
+        after["fecha_cierre"] = before.get("fecha_cierre") or now
+    return before, after
+
+
+async def registrar_comentario(db, reclamo_id: str, current_user: dict, timestamp: datetime) -> Optional[dict]:
+    """Count a new comment on the claim. Returns the claim's creator_id and
+    numero_reclamo, or None if the claim is missing or not the user's."""
+    return await db.reclamos.find_one_and_update(
+        reclamo_filter(reclamo_id, current_user),
+        marcar_modificado({"$inc": {"comment_count": 1}, "$max": {"last_comment_at": timestamp}}),
+        projection={"_id": 0, "creator_id": 1, "numero_reclamo": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def adjuntar_archivo(db, reclamo_id: str, current_user: dict, url: str) -> bool:
+    """Add `url` to the claim's archivos. False if nothing was written; ask
+    explain_miss() why (UNCHANGED means the file was already attached)."""
+    result = await db.reclamos.update_one(
+        reclamo_filter(reclamo_id, current_user, archivos={"$ne": url}),
+        marcar_modificado({"$push": {"archivos": url}}),
+    )
+    return result.modified_count == 1
+
+
+def duplicate_field(exc: DuplicateKeyError) -> str:
+    """Name of the first field of the unique index a DuplicateKeyError hit."""
+    details = exc.details or {}
+    for key in ("keyPattern", "keyValue"):
+        if details.get(key):
+            return next(iter(details[key]))
+    # Older servers only report the index name, e.g. "username_unique"
+    message = details.get("errmsg", str(exc))
+    for field in ("username", "email", "numero_reclamo", "id"):
+        if f"{field}_" in message or f"{field}:" in message:
+            return field
+    return "key"
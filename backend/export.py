@@ -0,0 +1,174 @@
+"""
+Bulk export of claims for GET /api/reclamos/export and the XLSX jobs.
+
+Rows are read from a MongoDB cursor in batches and encoded one batch at a
+time, so memory use does not grow with the number of claims. CSV and NDJSON
+are streamed straight into the response. XLSX cannot be streamed: it is
+written by a background job to EXPORTS_DIR with openpyxl's write-only
+workbook (optional dependency) and downloaded once the job is done.
+purge_exports removes jobs and files older than the retention period.
+
+Claim text is user input. Values starting with a character that makes a
+spreadsheet evaluate the cell (=, +, -, @) are written as text: prefixed
+with an apostrophe in CSV, as string cells in XLSX.
+"""
+
+import asyncio
+import csv
+import io
+import json
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import AsyncIterator, List
+
+from serialization import to_datetime
+
+logger = logging.getLogger(__name__)
+
+try:
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+except ImportError:  # optional dependency
+    openpyxl = None
+
+XLSX_AVAILABLE = openpyxl is not None
+
+BATCH_SIZE = 500
+COLUMNS = (
+    "numero_reclamo", "linea", "categoria", "sector_estacion", "descripcion", "estado", "responsable",
+    "creator_username", "fecha_creacion", "fecha_cierre", "solucion", "responsable_cierre", "comment_count",
+    "archivos",
+)
+DATETIME_COLUMNS = ("fecha_creacion", "fecha_cierre")
+PROJECTION = {"_id": 0, **{column: 1 for column in COLUMNS}}
+SORT = [("fecha_creacion", -1), ("id", -1)]
+# Leading characters that make Excel or LibreOffice read a cell as a formula
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _is_formula(value) -> bool:
+    return isinstance(value, str) and value.startswith(FORMULA_PREFIXES)
+
+
+def _row(doc: dict) -> dict:
+    row = {column: doc.get(column) for column in COLUMNS}
+    for column in DATETIME_COLUMNS:
+        row[column] = to_datetime(row[column])
+    row["archivos"] = " ".join(row["archivos"] or [])
+    return row
+
+
+async def _batches(collection, query: dict) -> AsyncIterator[List[dict]]:
+    cursor = collection.find(query, PROJECTION).sort(SORT).batch_size(BATCH_SIZE)
+    batch = []
+    async for doc in cursor:
+        batch.append(_row(doc))
+        if len(batch) == BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _csv_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if value is None:
+        return ""
+    return "'" + value if _is_formula(value) else value
+
+
+async def stream_csv(collection, query: dict) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM so Excel opens the accents correctly
+    yield "\ufeff".encode()
+    writer.writerow(COLUMNS)
+    async for batch in _batches(collection, query):
+        for row in batch:
+            writer.writerow([_csv_value(value) for value in row.values()])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+async def stream_ndjson(collection, query: dict) -> AsyncIterator[bytes]:
+    async for batch in _batches(collection, query):
+        yield "".join(
+            json.dumps(row, ensure_ascii=False, default=datetime.isoformat) + "\n" for row in batch
+        ).encode()
+
+
+# XLSX jobs. Each job is a document in `exportaciones`:
+# {id, estado: pendiente|listo|error, filtro, archivo, filas, created_by, created_at, finished_at}
+
+def _xlsx_value(sheet, value):
+    if isinstance(value, datetime):
+        # Excel has no time zones: write UTC wall-clock time
+        return value.replace(tzinfo=None)
+    if _is_formula(value):
+        # openpyxl turns strings starting with "=" into formulas
+        cell = WriteOnlyCell(sheet, value=value)
+        cell.data_type = "s"
+        return cell
+    return value
+
+
+def _write_rows(sheet, batch: List[dict]):
+    for row in batch:
+        sheet.append([_xlsx_value(sheet, value) for value in row.values()])
+
+
+async def create_xlsx_job(db, query: dict, created_by: str) -> dict:
+    job = {
+        "id": str(uuid.uuid4()),
+        "estado": "pendiente",
+        "filtro": json.dumps(query, default=str),
+        "archivo": None,
+        "filas": 0,
+        "error": None,
+        "created_by": created_by,
+        "created_at": datetime.now(timezone.utc),
+        "finished_at": None,
+    }
+    await db.exportaciones.insert_one(dict(job))
+    return job
+
+
+async def run_xlsx_job(db, job_id: str, query: dict, exports_dir: Path):
+    """Write every claim matching `query` to exports_dir/<job id>.xlsx and record the outcome."""
+    path = exports_dir / f"{job_id}.xlsx"
+    filas = 0
+    try:
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet("Reclamos")
+        sheet.append(list(COLUMNS))
+        async for batch in _batches(db.reclamos, query):
+            await asyncio.to_thread(_write_rows, sheet, batch)
+            filas += len(batch)
+        await asyncio.to_thread(workbook.save, path)
+    except Exception as exc:
+        logger.exception("XLSX export %s failed", job_id)
+        path.unlink(missing_ok=True)
+        update = {"estado": "error", "error": str(exc)}
+    else:
+        update = {"estado": "listo", "archivo": path.name, "filas": filas}
+    update["finished_at"] = datetime.now(timezone.utc)
+    await db.exportaciones.update_one({"id": job_id}, {"$set": update})
+
+
+async def purge_exports(db, exports_dir: Path, max_age: timedelta) -> int:
+    """Delete XLSX jobs created more than `max_age` ago, and files that old
+    whether or not a job still refers to them. Returns the files removed."""
+    cutoff = datetime.now(timezone.utc) - max_age
+    await db.exportaciones.delete_many({"created_at": {"$lt": cutoff}})
+    removed = 0
+    for path in exports_dir.glob("*.xlsx"):
+        if datetime.fromtimestamp(path.stat().st_mtime, timezone.utc) < cutoff:
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
@@ -0,0 +1,69 @@
+"""
+Per-facet claim counts for GET /api/reclamos/search.
+
+The page of results is the ordinary keyset list (listar_reclamos); this
+module only counts. One aggregation gives:
+- the total, under every filter;
+- one count per facet, under every filter except the facet's own. The
+  línea dropdown therefore still shows how many claims each other line
+  has while a line is selected.
+
+The leading $match is the only stage that can use an index, so it narrows
+as far as every branch allows. It holds the caller's scope, the search and
+any filter that is not a facet. With two or more facet filters set, it also
+requires all of them but one, since no branch counts a claim that misses
+two. After that, only the facet fields go into $facet.
+
+Counts do not depend on the page, so callers cache them per query and not
+per cursor.
+"""
+
+from typing import Dict, List
+
+FACETS = ("linea", "categoria", "estado", "responsable")
+
+
+def _without(filters: Dict[str, str], field: str) -> dict:
+    return {name: value for name, value in filters.items() if name != field}
+
+
+def _leading_match(base: dict, filters: Dict[str, str]) -> dict:
+    shared = {field: value for field, value in filters.items() if field not in FACETS}
+    faceted = {field: value for field, value in filters.items() if field in FACETS}
+    match = {**base, **shared}
+    if len(faceted) > 1:
+        match["$or"] = [_without(faceted, field) for field in faceted]
+    return match
+
+
+def _match(filters: Dict[str, str]) -> List[dict]:
+    return [{"$match": filters}] if filters else []
+
+
+def facet_pipeline(base: dict, filters: Dict[str, str]) -> list:
+    # Other filters are applied by the leading $match, and the branches only
+    # see the facet fields
+    faceted = {field: value for field, value in filters.items() if field in FACETS}
+    facets = {"total": _match(faceted) + [{"$count": "n"}]}
+    for field in FACETS:
+        facets[field] = _match(_without(faceted, field)) + [
+            {"$group": {"_id": f"${field}", "total": {"$sum": 1}}},
+            {"$sort": {"total": -1, "_id": 1}},
+        ]
+    return [
+        {"$match": _leading_match(base, filters)},
+        {"$project": {"_id": 0, **{field: 1 for field in FACETS}}},
+        {"$facet": facets},
+    ]
+
+
+async def fetch_facet_counts(collection, base: dict, filters: Dict[str, str]) -> dict:
+    """Run facet_pipeline and return {total, facetas: {field: [{valor, total}]}}."""
+    result = (await collection.aggregate(facet_pipeline(base, filters)).to_list(1))[0]
+    return {
+        "total": result["total"][0]["n"] if result["total"] else 0,
+        "facetas": {
+            field: [{"valor": bucket["_id"], "total": bucket["total"]} for bucket in result[field]]
+            for field in FACETS
+        },
+    }
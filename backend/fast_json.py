@@ -0,0 +1,87 @@
+"""
+Opt-in fast serialization for the claim list endpoints.
+
+By default FastAPI validates what an endpoint returns against its
+response_model, runs jsonable_encoder over the result and encodes it with
+the stdlib json module. Claim lists are already built from documents this
+API wrote, so with FAST_JSON=true (and orjson installed) they skip all of
+that. `trusted_page` only shapes the documents to the model's fields, and
+the page is encoded once by orjson.
+
+Run benchmarks/serializacion.py to compare both paths.
+"""
+
+import logging
+import os
+from typing import Dict, List, Optional, Type
+
+from pydantic import BaseModel
+from starlette.responses import Response
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+FAST_JSON = os.environ.get('FAST_JSON', 'false').lower() == 'true'
+if FAST_JSON and orjson is None:
+    logger.warning("FAST_JSON is set but orjson is not installed; using the default encoder")
+    FAST_JSON = False
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        # UTC as "Z", matching pydantic's JSON output for the same datetimes
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+
+
+_shapes: Dict[type, tuple] = {}
+
+
+def _shape(model: Type[BaseModel]) -> tuple:
+    """(required field names, {optional field: default}) for `model`, computed once."""
+    if model not in _shapes:
+        required, defaults = [], {}
+        for name, field in model.model_fields.items():
+            if field.is_required() or field.default_factory is not None:
+                # Factories (ids, creation dates) are always set when the document is written
+                required.append(name)
+            else:
+                defaults[name] = field.default
+        _shapes[model] = (tuple(required), defaults)
+    return _shapes[model]
+
+
+def trusted_items(model: Type[BaseModel], docs: List[dict]) -> List[dict]:
+    """Shape trusted documents like model.model_dump() would, without
+    validating them: unknown keys (e.g. a text search score) are dropped and
+    fields added after a document was written get their default."""
+    required, defaults = _shape(model)
+    items = []
+    for doc in docs:
+        item = {name: doc[name] for name in required}
+        for name, default in defaults.items():
+            item[name] = doc.get(name, default)
+        items.append(item)
+    return items
+
+
+def trusted_page(model: Type[BaseModel], docs: List[dict], next_cursor: Optional[str], prev_cursor: Optional[str],
+                 response: Optional[Response] = None, **extra) -> FastJSONResponse:
+    """A {items, next_cursor, prev_cursor, **extra} page as a FastJSONResponse.
+    Headers already set on `response` (e.g. ETag) are carried over."""
+    page = FastJSONResponse({
+        "items": trusted_items(model, docs),
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor,
+        **extra,
+    })
+    if response is not None:
+        for key, value in response.headers.items():
+            if key not in ("content-length", "content-type"):
+                page.headers[key] = value
+    return page
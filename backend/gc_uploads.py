@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Script para borrar archivos subidos que ya no usa ningún reclamo
+Ejecutar: python gc_uploads.py [--grace-hours 24] [--dry-run]
+"""
+
+import argparse
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+import os
+from dotenv import load_dotenv
+from pathlib import Path
+from datetime import datetime, timezone, timedelta
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+UPLOADS_DIR = ROOT_DIR / 'uploads'
+
+async def gc_uploads(grace_hours: float, dry_run: bool):
+    # Conectar a MongoDB
+    mongo_url = os.environ['MONGO_URL']
+    client = AsyncIOMotorClient(mongo_url, tz_aware=True)
+    db = client[os.environ['DB_NAME']]
+
+    # Recent uploads may not have their reference counted yet
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=grace_hours)
+    unreferenced = {"ref_count": {"$lte": 0}, "last_uploaded_at": {"$lt": cutoff}}
+
+    removed = 0
+    try:
+        async for blob in db.archivos.find(unreferenced):
+            print(f"   {blob['filename']} ({blob['size']} bytes)")
+            if dry_run:
+                continue
+            # Only delete if it is still unreferenced at this point
+            result = await db.archivos.delete_one({"_id": blob["_id"], **unreferenced})
+            if result.deleted_count:
+                (UPLOADS_DIR / blob["filename"]).unlink(missing_ok=True)
+                removed += 1
+    finally:
+        client.close()
+
+    print(f"✅ {removed} archivos eliminados")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--grace-hours", type=float, default=24, help="antigüedad mínima de la última subida")
+    parser.add_argument("--dry-run", action="store_true", help="solo listar, no borrar")
+    args = parser.parse_args()
+    asyncio.run(gc_uploads(args.grace_hours, args.dry_run))
@@ -0,0 +1,112 @@
+"""
+Conditional GET support for claim, list and statistics responses.
+
+Every claim carries a `version` that each mutation increments, along with
+`updated_at`. That gives GET /api/reclamos/{id} a strong ETag. Lists and
+statistics depend on many claims at once. For those, every claim write also
+bumps one generation counter in `contadores`, and their weak ETags combine
+that generation with a hash of the caller's scope and parameters.
+
+Responses are sent with `Cache-Control: private, no-cache`, so browsers keep
+them but revalidate each time. A matching If-None-Match (or If-Modified-Since
+when no ETag is sent) is answered with 304 before the body is built.
+
+Uploads are content-addressed and never change under the same name, so
+ImmutableStaticFiles serves them with a one-year immutable cache lifetime.
+"""
+
+import hashlib
+import json
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional, Tuple
+
+from fastapi.staticfiles import StaticFiles
+from pymongo import ReturnDocument
+from starlette.responses import Response
+
+GENERATION_ID = "reclamos:generation"
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+REVALIDATE = "private, no-cache"
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+async def bump_generation(db) -> int:
+    """Mark every list and statistics response as stale. Call after any claim write."""
+    doc = await db.contadores.find_one_and_update(
+        {"_id": GENERATION_ID},
+        {"$inc": {"valor": 1}, "$set": {"updated_at": datetime.now(timezone.utc)}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return doc["valor"]
+
+
+async def read_generation(db) -> Tuple[int, datetime]:
+    doc = await db.contadores.find_one({"_id": GENERATION_ID})
+    if not doc:
+        return 0, EPOCH
+    return doc["valor"], doc.get("updated_at") or EPOCH
+
+
+def claim_etag(reclamo: dict) -> str:
+    # Claims created before versioning have no version until their next write
+    return f'"{reclamo["id"]}-{reclamo.get("version", 0)}"'
+
+
+def weak_etag(tag, *parts) -> str:
+    """W/"<tag>-<hash of parts>". `parts` must identify the representation:
+    the caller's scope and every query parameter that shapes the body."""
+    digest = hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()[:16]
+    return f'W/"{tag}-{digest}"'
+
+
+def _opaque(etag: str) -> str:
+    # If-None-Match uses the weak comparison: W/"x" matches "x"
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def is_fresh(request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """True if the client's cached copy is still valid (RFC 9110 section 13.1)."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        return _opaque(etag) in {_opaque(tag.strip()) for tag in if_none_match.split(",")}
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        # HTTP dates have whole-second resolution
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def set_validators(response: Response, etag: str, last_modified: Optional[datetime] = None):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = REVALIDATE
+    if last_modified:
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        response.headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+
+
+def not_modified(etag: str, last_modified: Optional[datetime] = None) -> Response:
+    response = Response(status_code=304)
+    set_validators(response, etag, last_modified)
+    return response
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """StaticFiles for content-addressed files: names change whenever content does."""
+
+    def file_response(self, *args, **kwargs) -> Response:
+        response = super().file_response(*args, **kwargs)
+        if response.status_code in (200, 304):
+            response.headers["Cache-Control"] = IMMUTABLE
+        return response
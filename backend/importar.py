@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Script para importar usuarios, invitaciones o reclamos históricos en lote
+Ejecutar: python importar.py usuarios archivo.csv [--dry-run] [--reporte errores.json]
+          python importar.py invitaciones archivo.ndjson
+          python importar.py reclamos historico.csv
+
+Columnas (CSV con encabezado, o un objeto JSON por línea):
+  usuarios / invitaciones: username, email, password, role, linea_asignada
+  reclamos: linea, categoria, sector_estacion, descripcion, estado, responsable,
+            solucion, responsable_cierre, creator_username, fecha_creacion, fecha_cierre
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from motor.motor_asyncio import AsyncIOMotorClient
+from passlib.context import CryptContext
+import os
+from dotenv import load_dotenv
+from pathlib import Path
+
+from bulk_import import FORMATOS, detect_format, run_import
+from passwords import PasswordHasher
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+# Same hash settings as server.py
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=int(os.environ.get('BCRYPT_ROUNDS', '12'))
+)
+
+async def importar(tipo: str, archivo: Path, formato: str, dry_run: bool, reporte: Path) -> int:
+    # Conectar a MongoDB
+    mongo_url = os.environ['MONGO_URL']
+    client = AsyncIOMotorClient(mongo_url, tz_aware=True)
+    db = client[os.environ['DB_NAME']]
+    hasher = PasswordHasher(pwd_context, max_workers=1)
+
+    try:
+        report = await run_import(db, tipo, archivo.read_bytes(), formato, hasher, dry_run=dry_run)
+    finally:
+        hasher.shutdown()
+        client.close()
+
+    accion = "validadas" if dry_run else "importadas"
+    print(f"✅ {report['importados']} de {report['total']} filas {accion}")
+    if tipo == "invitaciones" and not dry_run:
+        for creado in report["creados"]:
+            print(f"   {creado['username']}: /invitacion/{creado['token']}")
+    if report["errores"]:
+        print(f"⚠️  {len(report['errores'])} filas con errores")
+        for error in report["errores"][:20]:
+            print(f"   fila {error['fila']}: {'; '.join(error['errores'])}")
+        if len(report["errores"]) > 20:
+            print("   ...")
+    if reporte:
+        reporte.write_text(json.dumps(report, ensure_ascii=False, indent=2))
+        print(f"   Reporte completo en {reporte}")
+    return 1 if report["errores"] else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("tipo", choices=["usuarios", "invitaciones", "reclamos"])
+    parser.add_argument("archivo", type=Path)
+    parser.add_argument("--formato", choices=FORMATOS, help="por defecto según la extensión del archivo")
+    parser.add_argument("--dry-run", action="store_true", help="solo validar, no escribir")
+    parser.add_argument("--reporte", type=Path, help="guardar el reporte completo en JSON")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(importar(
+        args.tipo, args.archivo, args.formato or detect_format(args.archivo.name), args.dry_run, args.reporte
+    )))
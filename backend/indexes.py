@@ -0,0 +1,209 @@
+"""
+Declared MongoDB indexes for every query issued by server.py.
+
+`ensure_indexes` is called from the startup hook and from manage_indexes.py.
+Index creation is idempotent: an existing index with the same name and spec
+is a no-op, and conflicts (same name, different spec, or duplicate data for
+a unique index) are reported instead of aborting startup. Indexes listed in
+RETIRED_INDEXES, left behind by earlier versions of INDEXES, are dropped
+first.
+"""
+
+import logging
+from typing import Dict, List
+
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Trailing keys of the covering list indexes (ReclamoResumen minus linea,
+# fecha_creacion and id, which every list index already has)
+RESUMEN_KEYS = [
+    ("numero_reclamo", ASCENDING),
+    ("categoria", ASCENDING),
+    ("sector_estacion", ASCENDING),
+    ("estado", ASCENDING),
+]
+
+# collection -> list of IndexModel. Names are explicit so drift detection
+# does not depend on MongoDB's auto-generated names.
+INDEXES: Dict[str, List[IndexModel]] = {
+    "reclamos": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        # Claim lists for emisores: creator_id + linea, newest first.
+        # Every list index ends in (fecha_creacion, id) for keyset pagination;
+        # the *_resumen ones then carry the rest of the ReclamoResumen fields so
+        # /reclamos/resumen is answered from the index alone.
+        IndexModel(
+            [("creator_id", ASCENDING), ("linea", ASCENDING), ("fecha_creacion", DESCENDING), ("id", DESCENDING),
+             *RESUMEN_KEYS],
+            name="creator_linea_resumen",
+        ),
+        # Claim lists for admins, optionally filtered by linea / estado
+        IndexModel([("fecha_creacion", DESCENDING), ("id", DESCENDING), ("linea", ASCENDING), *RESUMEN_KEYS],
+                   name="fecha_resumen"),
+        IndexModel(
+            [("linea", ASCENDING), ("fecha_creacion", DESCENDING), ("id", DESCENDING), *RESUMEN_KEYS],
+            name="linea_resumen",
+        ),
+        IndexModel(
+            [("estado", ASCENDING), ("fecha_creacion", DESCENDING), ("id", DESCENDING)],
+            name="estado_fecha",
+        ),
+        # numbers come from the contadores sequences; never hand one out twice
+        IndexModel([("numero_reclamo", ASCENDING)], name="numero_reclamo_unique", unique=True),
+        # search: ranked full text, and claim-number prefix lookups
+        IndexModel(
+            [("numero_reclamo", TEXT), ("sector_estacion", TEXT), ("descripcion", TEXT)],
+            name="texto_busqueda",
+            default_language="spanish",
+            weights={"numero_reclamo": 10, "sector_estacion": 5, "descripcion": 1},
+        ),
+        IndexModel([("numero_busqueda", ASCENDING)], name="numero_busqueda"),
+    ],
+    "notifications": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        # get_notifications sorts by created_at; the unread count filters on is_read
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_created"),
+        IndexModel([("user_id", ASCENDING), ("is_read", ASCENDING)], name="user_is_read"),
+    ],
+    "users": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("username", ASCENDING)], name="username_unique", unique=True),
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("role", ASCENDING)], name="role"),
+    ],
+    "estadisticas": [
+        # read_stats for an emisor without an assigned line
+        IndexModel([("creator_id", ASCENDING)], name="creator_id"),
+    ],
+    "archivos": [
+        # gc_uploads.py: unreferenced blobs
+        IndexModel([("ref_count", ASCENDING), ("last_uploaded_at", ASCENDING)], name="ref_count_uploaded"),
+    ],
+    "comentarios": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        # obtener_comentarios pages by (timestamp, id) within a claim
+        IndexModel(
+            [("reclamo_id", ASCENDING), ("timestamp", ASCENDING), ("id", ASCENDING)],
+            name="reclamo_timestamp",
+        ),
+    ],
+    "exportaciones": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+    ],
+    "token_revocations": [
+        # tokens.py: a revocation only matters while the tokens it revokes are valid
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "invitations": [
+        IndexModel([("token", ASCENDING)], name="token_unique", unique=True),
+        IndexModel([("created_at", DESCENDING)], name="created_at"),
+    ],
+}
+
+# Indexes earlier versions declared, dropped by ensure_indexes when present
+# and not matching a current declaration. Each one still costs every write.
+RETIRED_INDEXES: Dict[str, List[str]] = {
+    "reclamos": [
+        # replaced by the *_resumen covering indexes
+        "creator_linea_fecha", "fecha_creacion", "linea_fecha",
+        # the per-line counters replaced the count over (linea, categoria)
+        "linea_categoria",
+        # same name, now (estado, fecha_creacion, id)
+        "estado_fecha",
+    ],
+}
+
+# Options compared when checking an existing index against its declaration
+_COMPARED_OPTIONS = (
+    "unique", "sparse", "partialFilterExpression", "expireAfterSeconds", "weights", "default_language",
+)
+
+
+def _spec(document: dict) -> dict:
+    key = list(document["key"].items())
+    if any(value == TEXT for _, value in key):
+        # MongoDB stores text indexes as {_fts: "text", _ftsx: 1}; the indexed
+        # fields only show up in the weights.
+        key = sorted((field, TEXT) for field in document.get("weights", {}))
+    spec = {"key": key, **{opt: document[opt] for opt in _COMPARED_OPTIONS if document.get(opt)}}
+    if "weights" in spec:
+        spec["weights"] = dict(spec["weights"])
+    return spec
+
+
+async def check_index_drift(db) -> Dict[str, Dict[str, list]]:
+    """Compare the indexes present in the database with INDEXES.
+
+    Returns, per collection, the declared indexes that are `missing`, those
+    whose key or options differ (`mismatched`) and undeclared ones (`extra`).
+    Collections without drift are omitted.
+    """
+    drift = {}
+    for collection, models in INDEXES.items():
+        existing = {}
+        async for info in db[collection].list_indexes():
+            if info["name"] != "_id_":
+                existing[info["name"]] = _spec(info)
+
+        missing, mismatched = [], []
+        for model in models:
+            declared = _spec(model.document)
+            name = model.document["name"]
+            if name not in existing:
+                missing.append(name)
+            elif existing[name] != declared:
+                mismatched.append(name)
+
+        declared_names = {model.document["name"] for model in models}
+        extra = sorted(set(existing) - declared_names)
+
+        if missing or mismatched or extra:
+            drift[collection] = {"missing": missing, "mismatched": mismatched, "extra": extra}
+    return drift
+
+
+async def drop_retired_indexes(db) -> List[str]:
+    """Drop the RETIRED_INDEXES still present with a spec no declaration has.
+    Returns "collection.name" for each index dropped."""
+    dropped = []
+    for collection, names in RETIRED_INDEXES.items():
+        declared = {model.document["name"]: _spec(model.document) for model in INDEXES.get(collection, [])}
+        for info in await db[collection].list_indexes().to_list(None):
+            name = info["name"]
+            if name in names and declared.get(name) != _spec(info):
+                await db[collection].drop_index(name)
+                logger.info("Dropped retired index %s.%s", collection, name)
+                dropped.append(f"{collection}.{name}")
+    return dropped
+
+
+async def ensure_indexes(db, drop_extra: bool = False) -> Dict[str, Dict[str, list]]:
+    """Drop retired indexes, create every declared one and return the
+    remaining drift.
+
+    With drop_extra, other undeclared indexes (e.g. ones created by hand)
+    are dropped once the declared ones exist.
+    """
+    await drop_retired_indexes(db)
+    for collection, models in INDEXES.items():
+        for model in models:
+            try:
+                await db[collection].create_indexes([model])
+            except OperationFailure as exc:
+                # Conflicting spec or duplicate keys for a unique index; keep
+                # starting up and let the drift report surface it.
+                logger.error("Could not create index %s.%s: %s", collection, model.document["name"], exc)
+
+    drift = await check_index_drift(db)
+    if drop_extra:
+        for collection, report in drift.items():
+            for name in report["extra"]:
+                await db[collection].drop_index(name)
+                logger.info("Dropped undeclared index %s.%s", collection, name)
+        drift = await check_index_drift(db)
+    for collection, report in drift.items():
+        logger.warning("Index drift on %s: %s", collection, report)
+    return drift
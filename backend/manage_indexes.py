@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Script para crear y verificar los índices de MongoDB
+Ejecutar: python manage_indexes.py            (crea los índices faltantes)
+          python manage_indexes.py --check    (solo reporta diferencias)
+          python manage_indexes.py --drop-extra (crea y elimina los no declarados)
+          python manage_indexes.py --renumerar-duplicados
+              (da números nuevos a reclamos con número repetido; necesario
+               para crear numero_reclamo_unique sobre datos anteriores a los
+               contadores)
+"""
+
+import asyncio
+import sys
+from motor.motor_asyncio import AsyncIOMotorClient
+import os
+from dotenv import load_dotenv
+from pathlib import Path
+
+from counters import find_duplicate_numbers, renumber_duplicates
+from indexes import ensure_indexes, check_index_drift
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+async def manage_indexes(check_only: bool, drop_extra: bool = False, renumerar: bool = False) -> int:
+    # Conectar a MongoDB
+    mongo_url = os.environ['MONGO_URL']
+    client = AsyncIOMotorClient(mongo_url, tz_aware=True)
+    db = client[os.environ['DB_NAME']]
+
+    try:
+        if renumerar:
+            for cambio in await renumber_duplicates(db):
+                print(f"   {cambio['antes']} -> {cambio['despues']} (reclamo {cambio['id']})")
+        duplicados = await find_duplicate_numbers(db)
+        if check_only:
+            drift = await check_index_drift(db)
+        else:
+            drift = await ensure_indexes(db, drop_extra=drop_extra)
+    finally:
+        client.close()
+
+    if duplicados:
+        # Without numero_reclamo_unique nothing stops the counters from reusing a number
+        print(f"❌ {len(duplicados)} números de reclamo repetidos, por ejemplo "
+              f"{', '.join(d['numero'] for d in duplicados[:5])}")
+        print("   Ejecutar: python manage_indexes.py --renumerar-duplicados")
+        return 1
+
+    if not drift:
+        print("✅ Todos los índices declarados están presentes")
+        return 0
+
+    for collection, report in drift.items():
+        print(f"⚠️  {collection}")
+        for kind in ("missing", "mismatched", "extra"):
+            if report[kind]:
+                print(f"   {kind}: {', '.join(report[kind])}")
+    # Indexes that exist but are not declared are informational only
+    return 1 if any(r["missing"] or r["mismatched"] for r in drift.values()) else 0
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    sys.exit(asyncio.run(manage_indexes("--check" in args, "--drop-extra" in args, "--renumerar-duplicados" in args)))
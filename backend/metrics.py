@@ -0,0 +1,267 @@
+"""
+In-process metrics served at GET /metrics in the Prometheus text format.
+
+- MetricsMiddleware: requests per route template and status code, plus a
+  latency histogram (time until the response starts, so SSE streams and
+  exports are not counted for their whole duration).
+- MongoCommandListener: a pymongo CommandListener that records each
+  command's duration by collection and command name, and how many documents
+  find/aggregate/getMore returned.
+- Event-loop lag: a task that sleeps for a fixed interval and records how
+  late it wakes up.
+- Gauges: callbacks evaluated only when /metrics is scraped (caches, queues).
+
+Recording is a dict lookup plus a bisect under a lock. Motor runs pymongo
+in worker threads, so the listener records from several threads. Nothing
+is exported until scraped, and there are no external dependencies.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DOCS_BUCKETS = (0, 1, 10, 50, 100, 500, 1000, 5000)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, float):
+        if value != value:
+            return "NaN"
+        if value in (float("inf"), float("-inf")):
+            return "+Inf" if value > 0 else "-Inf"
+        return repr(value)
+    return str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket..., +Inf count, sum]
+        self._values: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: Tuple = ()):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = [(labels, list(series)) for labels, series in self._values.items()]
+        for labels, series in values:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), series[:-1]):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-1])}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}"
+
+
+class Gauge:
+    """A value read from `fn` at scrape time. `fn` returns a number, or a
+    dict {label values tuple: number} when labelnames are given. kind="counter"
+    exposes a monotonic value kept elsewhere (e.g. cache hits)."""
+
+    def __init__(self, name: str, help: str, fn: Callable, labelnames: Tuple[str, ...] = (), kind: str = "gauge"):
+        self.name, self.help, self.fn, self.labelnames, self.kind = name, help, fn, labelnames, kind
+
+    def samples(self) -> Iterable[str]:
+        value = self.fn()
+        items = value.items() if self.labelnames else [((), value)]
+        for labels, v in items:
+            if v is not None:
+                yield f"{self.name}{_labels(self.labelnames, labels)} {_number(v)}"
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    def __init__(self, metrics: "Metrics"):
+        self.metrics = metrics
+        # (request_id, connection) -> (command, collection); filled in started()
+        self._pending: Dict[Tuple, Tuple[str, str]] = {}
+
+    @staticmethod
+    def _key(event) -> Tuple:
+        return event.request_id, event.connection_id
+
+    def started(self, event):
+        command = event.command_name
+        target = event.command.get("collection") if command == "getMore" else event.command.get(command)
+        self._pending[self._key(event)] = (command, target if isinstance(target, str) else "")
+
+    def _finish(self, event, failed: bool):
+        command, collection = self._pending.pop(self._key(event), (event.command_name, ""))
+        labels = (collection, command)
+        self.metrics.mongo_duration.observe(event.duration_micros / 1e6, labels)
+        if failed:
+            self.metrics.mongo_failures.inc(labels)
+            return
+        cursor = event.reply.get("cursor") if isinstance(event.reply, dict) else None
+        if cursor:
+            batch = cursor.get("firstBatch", cursor.get("nextBatch"))
+            if batch is not None:
+                self.metrics.mongo_docs.observe(len(batch), labels)
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+
+class Metrics:
+    def __init__(self, namespace: str = "uta"):
+        self.namespace = namespace
+        self._metrics = []
+        self.http_requests = self.counter(
+            "http_requests_total", "HTTP requests by route template and status", ("method", "route", "status")
+        )
+        self.http_latency = self.histogram(
+            "http_request_duration_seconds", "Time until the response starts", ("method", "route")
+        )
+        self.mongo_duration = self.histogram(
+            "mongo_command_duration_seconds", "MongoDB command duration", ("collection", "command")
+        )
+        self.mongo_failures = self.counter(
+            "mongo_command_failures_total", "Failed MongoDB commands", ("collection", "command")
+        )
+        self.mongo_docs = self.histogram(
+            "mongo_documents_returned", "Documents per cursor batch", ("collection", "command"), DOCS_BUCKETS
+        )
+        self.loop_lag = self.histogram("event_loop_lag_seconds", "How late the event loop ran a timer")
+        self.mongo_listener = MongoCommandListener(self)
+        self._lag_task: Optional[asyncio.Task] = None
+
+    def _name(self, name: str) -> str:
+        return f"{self.namespace}_{name}"
+
+    def counter(self, name: str, help: str, labelnames=()) -> Counter:
+        metric = Counter(self._name(name), help, tuple(labelnames))
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labelnames=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(self._name(name), help, tuple(labelnames), buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, help: str, fn: Callable, labelnames=(), kind: str = "gauge") -> Gauge:
+        metric = Gauge(self._name(name), help, fn, tuple(labelnames), kind)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            try:
+                samples = list(metric.samples())
+            except Exception:
+                logger.exception("Could not collect %s", metric.name)
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+    # Event-loop lag
+
+    def start_loop_monitor(self, interval: float = 0.5):
+        if self._lag_task is None:
+            self._lag_task = asyncio.create_task(self._sample_lag(interval))
+
+    def stop_loop_monitor(self):
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+            self._lag_task = None
+
+    async def _sample_lag(self, interval: float):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            self.loop_lag.observe(max(time.perf_counter() - start - interval, 0.0))
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no BaseHTTPMiddleware, so streaming is untouched)."""
+
+    def __init__(self, app, metrics: Metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        started = False
+
+        async def send_wrapper(message):
+            nonlocal status, started
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                started = True
+                self._record(scope, status, time.perf_counter() - start)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if not started:
+                self._record(scope, status, time.perf_counter() - start)
+
+    def _record(self, scope, status: int, elapsed: float):
+        # Route templates keep label cardinality bounded; ids stay out of it
+        route = scope.get("route")
+        path = getattr(route, "path", None) or "unmatched"
+        method = scope["method"]
+        self.metrics.http_requests.inc((method, path, status))
+        self.metrics.http_latency.observe(elapsed, (method, path))
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Migración: mueve los comentarios embebidos en cada reclamo a la colección comentarios
+Ejecutar: python migrate_comentarios.py [--batch 200] [--pause 0.1]
+
+Se puede correr con el servidor en marcha y repetir sin duplicar comentarios:
+cada comentario se inserta por su id y recién después se quita del reclamo.
+"""
+
+import argparse
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+import os
+from dotenv import load_dotenv
+from pathlib import Path
+
+from serialization import to_datetime
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+async def migrate_reclamo(db, reclamo: dict) -> int:
+    comentarios = []
+    for comentario in reclamo["comentarios"]:
+        comentario = {**comentario, "reclamo_id": reclamo["id"], "timestamp": to_datetime(comentario.get("timestamp"))}
+        comentarios.append(comentario)
+
+    if comentarios:
+        await db.comentarios.bulk_write([
+            UpdateOne(
+                {"id": c["id"]},
+                {"$setOnInsert": {k: v for k, v in c.items() if k != "id"}},
+                upsert=True
+            )
+            for c in comentarios
+        ], ordered=False)
+
+    # Counters come from the collection, which may already hold comments
+    # added after the deploy.
+    count = await db.comentarios.count_documents({"reclamo_id": reclamo["id"]})
+    update = {"$unset": {"comentarios": ""}, "$set": {"comment_count": count}}
+    timestamps = [c["timestamp"] for c in comentarios if c["timestamp"]]
+    if timestamps:
+        update["$max"] = {"last_comment_at": max(timestamps)}
+    await db.reclamos.update_one({"_id": reclamo["_id"]}, update)
+    return len(comentarios)
+
+async def migrate(batch: int, pause: float):
+    # Conectar a MongoDB
+    mongo_url = os.environ['MONGO_URL']
+    client = AsyncIOMotorClient(mongo_url, tz_aware=True)
+    db = client[os.environ['DB_NAME']]
+
+    reclamos_migrados = comentarios_migrados = 0
+    try:
+        while True:
+            reclamos = await db.reclamos.find(
+                {"comentarios": {"$exists": True}},
+                {"_id": 1, "id": 1, "comentarios": 1}
+            ).limit(batch).to_list(batch)
+            if not reclamos:
+                break
+            for reclamo in reclamos:
+                comentarios_migrados += await migrate_reclamo(db, reclamo)
+            reclamos_migrados += len(reclamos)
+            print(f"   {reclamos_migrados} reclamos, {comentarios_migrados} comentarios")
+            await asyncio.sleep(pause)
+    finally:
+        client.close()
+
+    print(f"✅ {comentarios_migrados} comentarios movidos desde {reclamos_migrados} reclamos")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch", type=int, default=200, help="reclamos por lote")
+    parser.add_argument("--pause", type=float, default=0.1, help="segundos de espera entre lotes")
+    args = parser.parse_args()
+    asyncio.run(migrate(args.batch, args.pause))
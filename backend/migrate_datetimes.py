@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Migración: convierte las fechas guardadas como texto ISO a fechas nativas de MongoDB
+Ejecutar: python migrate_datetimes.py [--batch 500] [--pause 0.1]
+
+Se puede correr con el servidor en marcha: procesa lotes pequeños y cada
+actualización sólo se aplica si el documento no cambió desde que se leyó.
+Las fechas que no se pueden interpretar se informan y se dejan como están;
+la paginación por cursor las sigue ordenando después de las fechas nativas.
+"""
+
+import argparse
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+import os
+from dotenv import load_dotenv
+from pathlib import Path
+
+from serialization import DATETIME_FIELDS, EMBEDDED_DATETIME_FIELDS, to_datetime
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+def _parse(value: str, name: str, doc_id, field: str):
+    """to_datetime, or the original string (reported) if it is not a valid date."""
+    try:
+        return to_datetime(value)
+    except ValueError:
+        print(f"⚠️  {name} {doc_id}: {field}={value!r} no es una fecha válida, se deja sin convertir")
+        return value
+
+def _updates_for(doc: dict, name: str, fields, embedded):
+    """Return (guard filter, $set) for one document, or None if nothing to convert."""
+    guard, changes = {"_id": doc["_id"]}, {}
+    for field in fields:
+        value = doc.get(field)
+        if isinstance(value, str):
+            parsed = _parse(value, name, doc["_id"], field)
+            if parsed is not value:
+                guard[field] = value
+                changes[field] = parsed
+    if embedded:
+        array, field = embedded
+        items = doc.get(array) or []
+        converted = [
+            {**item, field: _parse(item[field], name, doc["_id"], f"{array}.{field}")}
+            if isinstance(item.get(field), str) else item
+            for item in items
+        ]
+        if any(new is not old and new[field] is not old[field] for new, old in zip(converted, items)):
+            # Rewrite the whole array; the size guard skips documents that got
+            # a new item meanwhile, they are picked up by the next pass.
+            guard[array] = {"$size": len(items)}
+            changes[array] = converted
+    return (guard, changes) if changes else None
+
+async def migrate_collection(db, name: str, batch: int, pause: float) -> int:
+    fields = DATETIME_FIELDS[name]
+    embedded = EMBEDDED_DATETIME_FIELDS.get(name)
+    pending = [{field: {"$type": "string"}} for field in fields]
+    projection = {field: 1 for field in fields}
+    if embedded:
+        pending.append({f"{embedded[0]}.{embedded[1]}": {"$type": "string"}})
+        projection[embedded[0]] = 1
+
+    # Walk by _id so documents left unconverted (invalid dates) do not keep
+    # coming back; repeat the walk while it still converts something, which
+    # picks up documents that changed while their batch was being processed.
+    migrated = 0
+    while True:
+        converted, last_id = 0, None
+        while True:
+            query = {"$or": pending}
+            if last_id is not None:
+                query = {"$and": [query, {"_id": {"$gt": last_id}}]}
+            docs = await db[name].find(query, projection).sort("_id", 1).limit(batch).to_list(batch)
+            if not docs:
+                break
+            last_id = docs[-1]["_id"]
+            ops = []
+            for doc in docs:
+                update = _updates_for(doc, name, fields, embedded)
+                if update:
+                    ops.append(UpdateOne(update[0], {"$set": update[1]}))
+            if ops:
+                result = await db[name].bulk_write(ops, ordered=False)
+                converted += result.modified_count
+                print(f"   {name}: {migrated + converted} documentos convertidos")
+            await asyncio.sleep(pause)
+        migrated += converted
+        if not converted:
+            return migrated
+
+async def migrate(batch: int, pause: float):
+    # Conectar a MongoDB
+    mongo_url = os.environ['MONGO_URL']
+    client = AsyncIOMotorClient(mongo_url, tz_aware=True)
+    db = client[os.environ['DB_NAME']]
+
+    try:
+        for name in DATETIME_FIELDS:
+            migrated = await migrate_collection(db, name, batch, pause)
+            print(f"✅ {name}: {migrated} documentos migrados")
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch", type=int, default=500, help="documentos por lote")
+    parser.add_argument("--pause", type=float, default=0.1, help="segundos de espera entre lotes")
+    args = parser.parse_args()
+    asyncio.run(migrate(args.batch, args.pause))
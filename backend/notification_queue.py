@@ -0,0 +1,152 @@
+"""
+In-process queue that persists notifications in batches.
+
+create_notification only enqueues, so the request that triggered it does
+not wait for a second insert. A single worker task collects documents until
+`batch_size` are waiting or `flush_interval` seconds have passed since the
+first one, writes them with one insert_many and then calls `on_persisted`
+(used to publish them to the notification stream). Transient connection
+errors are retried with backoff; stop() drains what is left on shutdown.
+
+The queue lives in memory: notifications enqueued by a worker that dies
+before flushing are lost.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Callable, List, Optional
+
+from pymongo.errors import AutoReconnect, BulkWriteError, ConnectionFailure, NetworkTimeout
+
+logger = logging.getLogger(__name__)
+
+TRANSIENT_ERRORS = (AutoReconnect, ConnectionFailure, NetworkTimeout)
+DUPLICATE_KEY = 11000
+
+_STOP = object()
+
+
+class NotificationQueue:
+    def __init__(
+        self,
+        collection,
+        on_persisted: Optional[Callable[[List[dict]], None]] = None,
+        batch_size: int = 100,
+        flush_interval: float = 0.25,
+        max_retries: int = 5,
+    ):
+        self.collection = collection
+        self.on_persisted = on_persisted
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self.enqueued = 0
+        self.persisted = 0
+        self.failed = 0
+        self.retries = 0
+        self.batches = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def enqueue(self, doc: dict):
+        self.enqueued += 1
+        self._queue.put_nowait((doc, time.monotonic()))
+
+    async def stop(self, timeout: float = 10):
+        """Flush everything enqueued so far and stop the worker."""
+        if self._task is None:
+            return
+        self._queue.put_nowait(_STOP)
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            logger.error("Notification queue did not drain in %ss, %s left", timeout, self.depth)
+            self._task.cancel()
+        self._task = None
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                await self._flush(batch)
+            except Exception:
+                logger.exception("Dropping %s notifications after an unexpected error", len(batch))
+                self.failed += len(batch)
+
+    async def _flush(self, batch):
+        docs = [doc for doc, _ in batch]
+        failed = set()
+        for attempt in range(self.max_retries + 1):
+            try:
+                # insert_many adds _id to what it is given; keep the originals clean
+                await self.collection.insert_many([dict(doc) for doc in docs], ordered=False)
+                break
+            except BulkWriteError as exc:
+                # ordered=False: everything without a write error was inserted.
+                # A retry after a partial write hits duplicates of what already
+                # made it in, which count as persisted too.
+                errors = [e for e in exc.details.get("writeErrors", []) if e.get("code") != DUPLICATE_KEY]
+                if errors:
+                    logger.error("Could not store %s of %s notifications: %s",
+                                 len(errors), len(docs), errors[0].get("errmsg"))
+                    failed = {e["index"] for e in errors}
+                    self.failed += len(failed)
+                break
+            except TRANSIENT_ERRORS as exc:
+                if attempt == self.max_retries:
+                    logger.error("Giving up on %s notifications: %s", len(docs), exc)
+                    self.failed += len(docs)
+                    return
+                self.retries += 1
+                await asyncio.sleep(min(0.1 * 2 ** attempt, 5))
+
+        written = [pair for i, pair in enumerate(batch) if i not in failed]
+        now = time.monotonic()
+        for _, enqueued_at in written:
+            latency = now - enqueued_at
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+        self.persisted += len(written)
+        self.batches += 1
+        if self.on_persisted and written:
+            self.on_persisted([doc for doc, _ in written])
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth,
+            "enqueued": self.enqueued,
+            "persisted": self.persisted,
+            "failed": self.failed,
+            "retries": self.retries,
+            "batches": self.batches,
+            "avg_latency_seconds": self.total_latency / self.persisted if self.persisted else None,
+            "max_latency_seconds": self.max_latency,
+        }
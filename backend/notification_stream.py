@@ -0,0 +1,148 @@
+"""
+In-process pub/sub behind GET /api/notifications/stream (Server-Sent Events).
+
+create_notification publishes to the broker and every open stream of that
+user receives the event. Event ids are "<boot>-<seq>"; the broker keeps the
+last few events per user so a reconnecting EventSource (Last-Event-ID) gets
+what it missed. When that is not possible - unknown id, a different worker
+or process restart, or a client too slow to keep up with its queue - the
+stream sends a `sync` event and the client reloads its state instead.
+
+The broker only sees notifications persisted by its own process, so a
+stream gets nothing created on another worker. Run the API with a single
+worker while streams are in use. Spreading it over several would need a
+shared channel, e.g. a MongoDB change stream on `notifications`, which in
+turn needs a replica set.
+"""
+
+import asyncio
+import itertools
+import json
+import uuid
+from collections import defaultdict, deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+HEARTBEAT_SECONDS = 15
+
+
+class Subscription:
+    def __init__(self, user_id: str, queue_size: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        # Set when an event had to be dropped because the queue was full
+        self.overflowed = False
+
+
+class NotificationBroker:
+    def __init__(self, history_size: int = 50, queue_size: int = 100):
+        self.history_size = history_size
+        self.queue_size = queue_size
+        self._boot = uuid.uuid4().hex[:8]
+        self._seq = itertools.count(1)
+        self._subscriptions: Dict[str, Set[Subscription]] = defaultdict(set)
+        self._history: Dict[str, Deque[Tuple[int, str, dict]]] = {}
+        # Newest seq that fell out of each user's history
+        self._evicted: Dict[str, int] = {}
+        self.published = 0
+        self.dropped = 0
+
+    def publish(self, user_id: str, event: str, data: dict):
+        seq = next(self._seq)
+        entry = (seq, event, data)
+        history = self._history.setdefault(user_id, deque(maxlen=self.history_size))
+        if len(history) == history.maxlen:
+            self._evicted[user_id] = history[0][0]
+        history.append(entry)
+        self.published += 1
+        for sub in self._subscriptions.get(user_id, ()):
+            try:
+                sub.queue.put_nowait(entry)
+            except asyncio.QueueFull:
+                sub.overflowed = True
+                self.dropped += 1
+
+    def subscribe(self, user_id: str) -> Subscription:
+        sub = Subscription(user_id, self.queue_size)
+        self._subscriptions[user_id].add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        subs = self._subscriptions.get(sub.user_id)
+        if subs is not None:
+            subs.discard(sub)
+            if not subs:
+                del self._subscriptions[sub.user_id]
+
+    def replay(self, user_id: str, last_event_id: Optional[str]) -> Optional[List[Tuple[int, str, dict]]]:
+        """Events after `last_event_id`, or None if they cannot be recovered."""
+        if not last_event_id:
+            return None
+        boot, _, seq = last_event_id.partition("-")
+        if boot != self._boot or not seq.isdigit():
+            return None
+        seq = int(seq)
+        if seq < self._evicted.get(user_id, 0):
+            return None
+        return [entry for entry in self._history.get(user_id, ()) if entry[0] > seq]
+
+    def format(self, entry: Tuple[int, str, dict]) -> str:
+        seq, event, data = entry
+        return f"id: {self._boot}-{seq}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+
+    def close(self):
+        """End every open stream (used on shutdown)."""
+        for subs in self._subscriptions.values():
+            for sub in subs:
+                sub.overflowed = False
+                try:
+                    sub.queue.put_nowait(None)
+                except asyncio.QueueFull:
+                    sub.queue.get_nowait()
+                    sub.queue.put_nowait(None)
+
+    @property
+    def connections(self) -> int:
+        return sum(len(subs) for subs in self._subscriptions.values())
+
+
+async def stream_events(broker: NotificationBroker, user_id: str, request, last_event_id: Optional[str], load_sync):
+    """Async generator of SSE frames for one connection.
+
+    `load_sync` is a coroutine function returning the payload of a `sync`
+    event (the current unread count), used whenever replay is impossible.
+    """
+    # Subscribe before replaying so nothing published in between is lost
+    sub = broker.subscribe(user_id)
+    try:
+        last_seq = 0
+        missed = broker.replay(sub.user_id, last_event_id)
+        if missed is None:
+            yield f"event: sync\ndata: {json.dumps(await load_sync())}\n\n"
+        else:
+            for entry in missed:
+                last_seq = entry[0]
+                yield broker.format(entry)
+
+        while True:
+            try:
+                entry = await asyncio.wait_for(sub.queue.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": ping\n\n"
+                continue
+            if entry is None:
+                break
+            if sub.overflowed:
+                # The client fell behind; drop the backlog and resync
+                while not sub.queue.empty():
+                    sub.queue.get_nowait()
+                sub.overflowed = False
+                yield f"event: sync\ndata: {json.dumps(await load_sync())}\n\n"
+                continue
+            if entry[0] <= last_seq:
+                continue  # already sent during replay
+            last_seq = entry[0]
+            yield broker.format(entry)
+    finally:
+        broker.unsubscribe(sub)
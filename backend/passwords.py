@@ -0,0 +1,106 @@
+"""
+bcrypt hashing and verification off the asyncio event loop.
+
+bcrypt releases the GIL, so a small thread pool runs hashes in parallel
+while the event loop keeps serving other requests. The pool size caps how
+many hashes run at once; callers beyond that wait in the executor queue,
+whose depth is tracked for monitoring.
+
+Bulk imports hash hundreds of passwords at once. hash_many sends them in
+chunks to a separate process pool, created on first use, so an import
+neither competes with logins for the thread pool nor holds the GIL in the
+server process between hashes. Its workers are started with "spawn":
+forking the server while the bcrypt and Motor threads are running can
+leave a child holding a lock no thread will ever release.
+"""
+
+import asyncio
+import multiprocessing
+import time
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from passlib.context import CryptContext
+
+
+# CryptContext per configuration string, rebuilt once in each pool process
+_worker_contexts: Dict[str, CryptContext] = {}
+
+
+def _hash_chunk(config: str, passwords: List[str]) -> List[str]:
+    context = _worker_contexts.get(config)
+    if context is None:
+        context = _worker_contexts[config] = CryptContext.from_string(config)
+    return [context.hash(password) for password in passwords]
+
+
+class PasswordHasher:
+    def __init__(self, context: CryptContext, max_workers: int, bulk_workers: Optional[int] = None):
+        self.context = context
+        self.max_workers = max_workers
+        self.bulk_workers = bulk_workers or os.cpu_count() or 1
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self.pending = 0
+        self.peak_pending = 0
+        self.completed = 0
+        self.total_seconds = 0.0
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        self.pending += 1
+        self.peak_pending = max(self.peak_pending, self.pending)
+        start = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+            self.total_seconds += time.perf_counter() - start
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._run(self.context.verify, password, hashed)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """Verify and, if the hash uses outdated settings (e.g. a lower bcrypt
+        cost), also return a fresh hash to store."""
+        return await self._run(self.context.verify_and_update, password, hashed)
+
+    async def hash_many(self, passwords: List[str], chunk_size: int = 8) -> List[str]:
+        """Hash `passwords` in parallel on the process pool, keeping their order."""
+        if not passwords:
+            return []
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.bulk_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        loop = asyncio.get_running_loop()
+        config = self.context.to_string()
+        chunks = [passwords[i:i + chunk_size] for i in range(0, len(passwords), chunk_size)]
+        results = await asyncio.gather(*(
+            loop.run_in_executor(self._process_pool, _hash_chunk, config, chunk) for chunk in chunks
+        ))
+        return [hashed for chunk in results for hashed in chunk]
+
+    @property
+    def queue_depth(self) -> int:
+        return max(self.pending - self.max_workers, 0)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "in_flight": self.pending,
+            "queue_depth": self.queue_depth,
+            "peak_in_flight": self.peak_pending,
+            "completed": self.completed,
+            "avg_seconds": self.total_seconds / self.completed if self.completed else None,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False)
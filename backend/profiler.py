@@ -0,0 +1,225 @@
+"""
+Opt-in slow-query profiler (SLOW_QUERY_MS).
+
+A pymongo CommandListener on the Motor client times every command. Commands
+slower than the threshold are logged with their filter shape and the route
+that issued them. Shapes keep field names and operators and replace literal
+values with "?". The first time a shape is slow, the profiler re-runs the
+command as explain("executionStats") in the background. It records the
+plan stages (COLLSCAN/IXSCAN and index names) and docs/keys examined versus
+returned. GET /api/admin/slow-queries lists the slowest shapes since startup.
+
+The route comes from a context variable set by RequestScopeMiddleware.
+Motor copies the context into its executor threads, where listeners run.
+Explain costs at least as much as the slow command itself, so keep this
+for development and staging. In production, use a threshold high enough
+to catch only outliers.
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+# Commands whose shape and plan are worth recording
+PROFILED = {"find", "aggregate", "count", "distinct", "findAndModify", "update", "delete"}
+# Fields of the command document that describe the query (the rest is plumbing)
+SHAPE_FIELDS = ("filter", "query", "q", "sort", "pipeline", "key", "updates", "deletes")
+MAX_ROUTES = 5
+
+request_scope: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("request_scope", default=None)
+
+
+def shape(value):
+    """`value` with every literal replaced by "?"; keys and operators are kept.
+    Sort specs and stage names survive because they are keys."""
+    if isinstance(value, dict):
+        return {k: shape(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        # $in: [...] / $and: [...] -> one representative element
+        return [shape(value[0])] if value else []
+    return "?"
+
+
+def command_shape(command_name: str, command: dict) -> str:
+    parts = {}
+    for field in SHAPE_FIELDS:
+        if field in command:
+            value = command[field]
+            # Sort directions and distinct's field name are not sensitive
+            parts[field] = value if field == "key" else dict(value) if field == "sort" else shape(value)
+    return json.dumps(parts, sort_keys=False, default=str)
+
+
+def _find(doc, key):
+    """First value stored under `key` anywhere in an explain document."""
+    if isinstance(doc, dict):
+        if key in doc:
+            return doc[key]
+        values = doc.values()
+    elif isinstance(doc, list):
+        values = doc
+    else:
+        return None
+    for value in values:
+        found = _find(value, key)
+        if found is not None:
+            return found
+    return None
+
+
+def _stages(plan) -> List[str]:
+    stages = []
+    while isinstance(plan, dict):
+        stage = plan.get("stage", "?")
+        if plan.get("indexName"):
+            stage += f"({plan['indexName']})"
+        stages.append(stage)
+        plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0]
+    return stages
+
+
+def summarize_explain(explain: dict) -> dict:
+    planner = _find(explain, "queryPlanner") or {}
+    stats = _find(explain, "executionStats") or {}
+    stages = _stages(planner.get("winningPlan", {}).get("queryPlan") or planner.get("winningPlan"))
+    return {
+        "plan": " <- ".join(stages),
+        "collscan": any(stage.startswith("COLLSCAN") for stage in stages),
+        "n_returned": stats.get("nReturned"),
+        "docs_examined": stats.get("totalDocsExamined"),
+        "keys_examined": stats.get("totalKeysExamined"),
+        "execution_ms": stats.get("executionTimeMillis"),
+    }
+
+
+class QueryProfiler(monitoring.CommandListener):
+    def __init__(self, threshold_ms: float, explain: bool = True):
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self.client = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Dict[Tuple, Tuple[dict, Optional[dict]]] = {}
+        self._shapes: Dict[Tuple[str, str, str], dict] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_ms > 0
+
+    def attach(self, client, loop: asyncio.AbstractEventLoop):
+        """Give the profiler a client and loop to run explains with (startup hook)."""
+        self.client = client
+        self.loop = loop
+
+    # CommandListener
+
+    def started(self, event):
+        if event.command_name in PROFILED:
+            self._pending[(event.request_id, event.connection_id)] = (event.command, request_scope.get())
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event)
+
+    def _finish(self, event):
+        pending = self._pending.pop((event.request_id, event.connection_id), None)
+        if pending is None:
+            return
+        duration_ms = event.duration_micros / 1000
+        if duration_ms < self.threshold_ms:
+            return
+        command, scope = pending
+        name = event.command_name
+        collection = command.get(name) if isinstance(command.get(name), str) else ""
+        query_shape = command_shape(name, command)
+        route = (getattr(scope.get("route"), "path", None) or scope.get("path")) if scope else None
+        key = (collection, name, query_shape)
+
+        with self._lock:
+            entry = self._shapes.get(key)
+            first = entry is None
+            if first:
+                entry = self._shapes[key] = {
+                    "collection": collection,
+                    "command": name,
+                    "shape": query_shape,
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "routes": [],
+                    "explain": None,
+                    "last_seen": None,
+                }
+            entry["count"] += 1
+            entry["total_ms"] += duration_ms
+            entry["max_ms"] = max(entry["max_ms"], duration_ms)
+            entry["last_seen"] = time.time()
+            if route and route not in entry["routes"]:
+                entry["routes"] = (entry["routes"] + [route])[-MAX_ROUTES:]
+
+        logger.warning("Slow %s on %s: %.1f ms (route %s) %s", name, collection, duration_ms, route, query_shape)
+        if first and self.explain and self.loop is not None:
+            self.loop.call_soon_threadsafe(self._schedule_explain, key, event.database_name, command)
+
+    # Explain
+
+    def _schedule_explain(self, key, database: str, command: dict):
+        asyncio.ensure_future(self._explain(key, database, command))
+
+    async def _explain(self, key, database: str, command: dict):
+        # Session, cluster time and read preference fields are not part of the query
+        original = {k: v for k, v in command.items() if not k.startswith("$") and k not in ("lsid", "txnNumber")}
+        try:
+            result = await self.client[database].command({"explain": original, "verbosity": "executionStats"})
+        except Exception as exc:
+            logger.info("Could not explain slow %s: %s", key[1], exc)
+            return
+        summary = summarize_explain(result)
+        with self._lock:
+            if key in self._shapes:  # unless reset() ran meanwhile
+                self._shapes[key]["explain"] = summary
+        logger.warning(
+            "Plan for slow %s on %s: %s, %s docs / %s keys examined for %s returned",
+            key[1], key[0], summary["plan"], summary["docs_examined"], summary["keys_examined"],
+            summary["n_returned"],
+        )
+
+    def top(self, limit: int = 20, order: str = "max_ms") -> List[dict]:
+        with self._lock:
+            entries = [dict(entry) for entry in self._shapes.values()]
+        for entry in entries:
+            entry["avg_ms"] = entry["total_ms"] / entry["count"]
+        return sorted(entries, key=lambda e: e[order], reverse=True)[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._shapes.clear()
+
+
+class RequestScopeMiddleware:
+    """Expose the ASGI scope of the current request to the profiler. The
+    router adds the matched route to this same dict, so the route template
+    is available by the time any query runs."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = request_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_scope.reset(token)
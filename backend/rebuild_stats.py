@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Script para verificar y reconstruir las estadísticas materializadas
+Ejecutar: python rebuild_stats.py            (reconstruye desde los reclamos)
+          python rebuild_stats.py --verify   (solo reporta diferencias)
+"""
+
+import asyncio
+import sys
+from motor.motor_asyncio import AsyncIOMotorClient
+import os
+from dotenv import load_dotenv
+from pathlib import Path
+
+from stats import rebuild_stats, verify_stats
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+async def main(verify_only: bool) -> int:
+    # Conectar a MongoDB
+    mongo_url = os.environ['MONGO_URL']
+    client = AsyncIOMotorClient(mongo_url, tz_aware=True)
+    db = client[os.environ['DB_NAME']]
+
+    try:
+        if not verify_only:
+            count = await rebuild_stats(db)
+            print(f"✅ {count} documentos de estadísticas reconstruidos")
+        drift = await verify_stats(db)
+    finally:
+        client.close()
+
+    if not drift:
+        print("✅ Las estadísticas coinciden con los reclamos")
+        return 0
+
+    for rollup_id, report in sorted(drift.items()):
+        print(f"⚠️  {rollup_id}")
+        print(f"   guardado: {report['stored']}")
+        print(f"   esperado: {report['expected']}")
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main("--verify" in sys.argv[1:])))
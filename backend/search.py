@@ -0,0 +1,70 @@
+"""
+Claim search backed by MongoDB indexes.
+
+Free text goes through the `texto_busqueda` text index (Spanish stemming,
+diacritic-insensitive) and is ranked by textScore. Terms that look like a
+claim number ("Linea A-CON", "líneaB-seg-00") become an anchored prefix match
+on `numero_busqueda`, an accent-folded lowercase copy of `numero_reclamo`
+with its own index.
+"""
+
+import re
+import unicodedata
+from typing import Optional, Tuple
+
+from pagination import decode_offset_cursor, encode_offset_cursor
+
+_NUMERO_PREFIX = re.compile(r"^linea\S*$")
+
+
+def fold(text: str) -> str:
+    """Lowercase and strip accents: 'Línea' -> 'linea'."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def numero_busqueda(numero_reclamo: str) -> str:
+    return fold(numero_reclamo)
+
+
+def build_search_filter(search: str) -> Tuple[dict, bool]:
+    """Return (filter, ranked) for a user search string.
+
+    `ranked` is True when the filter uses $text and results should be
+    ordered by relevance.
+    """
+    term = search.strip()
+    folded = fold(term).replace(" ", "")
+    if _NUMERO_PREFIX.match(folded):
+        return {"numero_busqueda": {"$regex": "^" + re.escape(folded)}}, False
+    return {"$text": {"$search": term, "$language": "spanish"}}, True
+
+
+async def fetch_ranked_page(collection, query: dict, projection: dict, limit: int, cursor: Optional[str] = None):
+    """Page through a $text query by relevance. Returns (items, next_cursor, prev_cursor)."""
+    offset = decode_offset_cursor(cursor) if cursor else 0
+    score = {"$meta": "textScore"}
+    docs = await collection.find(query, {**projection, "score": score}).sort(
+        [("score", score), ("fecha_creacion", -1), ("id", -1)]
+    ).skip(offset).limit(limit + 1).to_list(limit + 1)
+
+    items = docs[:limit]
+    next_cursor = encode_offset_cursor(offset + limit) if len(docs) > limit else None
+    prev_cursor = encode_offset_cursor(max(offset - limit, 0)) if offset else None
+    return items, next_cursor, prev_cursor
+
+
+async def backfill_numero_busqueda(db) -> int:
+    """Set numero_busqueda on claims created before it existed.
+
+    Uses the numero_busqueda index (missing values are indexed as null), so
+    once the backfill is done this is a cheap no-op at startup. The pipeline
+    mirrors fold() for claim numbers, whose only non-ASCII character is 'í'.
+    """
+    result = await db.reclamos.update_many(
+        {"numero_busqueda": None},
+        [{"$set": {"numero_busqueda": {"$toLower": {
+            "$replaceAll": {"input": "$numero_reclamo", "find": "í", "replacement": "i"}
+        }}}}],
+    )
+    return result.modified_count
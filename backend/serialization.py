@@ -0,0 +1,64 @@
+"""
+Timestamp encoding between the API models and MongoDB.
+
+Timestamps are stored as native BSON dates and the client is created with
+tz_aware=True, so reads return aware UTC datetimes with no per-field
+parsing. Documents written before that change held isoformat() strings;
+decode() still accepts them until migrate_datetimes.py has converted the
+collection.
+"""
+
+from datetime import datetime, timezone
+from typing import Optional
+
+# Datetime fields per collection, shared with migrate_datetimes.py
+DATETIME_FIELDS = {
+    "reclamos": ("fecha_creacion", "fecha_cierre", "last_comment_at", "updated_at"),
+    "users": ("created_at",),
+    "notifications": ("created_at",),
+    "invitations": ("created_at", "expires_at"),
+    "comentarios": ("timestamp",),
+}
+# Embedded arrays whose items carry a timestamp: collection -> (array, field).
+# Only claims not yet processed by migrate_comentarios.py still have these.
+EMBEDDED_DATETIME_FIELDS = {
+    "reclamos": ("comentarios", "timestamp"),
+}
+
+
+def to_datetime(value) -> Optional[datetime]:
+    """Legacy ISO string or datetime -> aware UTC datetime."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _decode_fields(doc: dict, fields) -> dict:
+    for field in fields:
+        value = doc.get(field)
+        if isinstance(value, str):
+            doc[field] = to_datetime(value)
+    return doc
+
+
+def decode(collection: str, doc: Optional[dict]) -> Optional[dict]:
+    """Convert any legacy string timestamps in a document read from `collection`, in place."""
+    if doc is None:
+        return None
+    _decode_fields(doc, DATETIME_FIELDS[collection])
+    embedded = EMBEDDED_DATETIME_FIELDS.get(collection)
+    if embedded:
+        array, field = embedded
+        for item in doc.get(array) or []:
+            _decode_fields(item, (field,))
+    return doc
+
+
+def decode_many(collection: str, docs: list) -> list:
+    for doc in docs:
+        decode(collection, doc)
+    return docs
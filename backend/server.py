@@ -1,45 +1,178 @@
-from fastapi import FastAPI, APIRouter, UploadFile, File, HTTPException, Query, Depends
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, APIRouter, UploadFile, File, HTTPException, Query, Depends, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import re
+import asyncio
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 import uuid
 from datetime import datetime, timezone, timedelta
-import shutil
 from jose import jwt, JWTError
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from passlib.context import CryptContext
 
+from blobs import UploadTooLarge, add_reference, release_references, store_upload
+from bulk_import import detect_format, run_import
+from cache import TTLCache, list_cache_key
+from compression import CompressionMiddleware
+from counters import (
+    check_unique_numbers, codigo_categoria, ensure_counters_seeded, generar_numero_reclamo, next_numero
+)
+from data_access import (
+    FORBIDDEN, MISSING, UNCHANGED, adjuntar_archivo, duplicate_field, explain_miss, registrar_comentario,
+    update_reclamo
+)
+from export import XLSX_AVAILABLE, create_xlsx_job, purge_exports, run_xlsx_job, stream_csv, stream_ndjson
+from http_cache import (
+    ImmutableStaticFiles, bump_generation, claim_etag, is_fresh, not_modified, read_generation,
+    set_validators, weak_etag
+)
+from facets import fetch_facet_counts
+from fast_json import FAST_JSON, trusted_page
+from indexes import ensure_indexes
+from metrics import Metrics, MetricsMiddleware
+from profiler import QueryProfiler, RequestScopeMiddleware
+from notification_queue import NotificationQueue
+from notification_stream import NotificationBroker, stream_events
+from pagination import fetch_page
+from passwords import PasswordHasher
+from serialization import decode, decode_many
+from search import backfill_numero_busqueda, build_search_filter, fetch_ranked_page, numero_busqueda
+from stats import ensure_stats, read_stats, record_created, record_deleted, record_updated
+from tokens import (
+    ACCESS, REFRESH, STREAM, TokenVersions, access_claims, password_fingerprint, refresh_claims, stream_claims,
+    user_from_claims
+)
+
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Request, MongoDB and event-loop metrics for GET /metrics
+metrics = Metrics()
+
+# Slow-query profiler, off unless SLOW_QUERY_MS is set; PROFILE_EXPLAIN=false
+# keeps the logging but skips the explain() capture
+query_profiler = QueryProfiler(
+    threshold_ms=float(os.environ.get('SLOW_QUERY_MS', '0')),
+    explain=os.environ.get('PROFILE_EXPLAIN', 'true').lower() == 'true'
+)
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+# tz_aware: BSON dates come back as aware UTC datetimes
+event_listeners = [metrics.mongo_listener] + ([query_profiler] if query_profiler.enabled else [])
+client = AsyncIOMotorClient(mongo_url, tz_aware=True, event_listeners=event_listeners)
 db = client[os.environ['DB_NAME']]
 
 # Create uploads directory
 UPLOADS_DIR = ROOT_DIR / 'uploads'
 UPLOADS_DIR.mkdir(exist_ok=True)
+EXPORTS_DIR = ROOT_DIR / 'exports'
+EXPORTS_DIR.mkdir(exist_ok=True)
+# XLSX export jobs and their files are deleted after this long
+EXPORT_RETENTION = timedelta(hours=float(os.environ.get('EXPORT_RETENTION_HOURS', '24')))
+MAX_UPLOAD_BYTES = int(os.environ.get('MAX_UPLOAD_BYTES', str(10 * 1024 * 1024)))
+MAX_IMPORT_BYTES = int(os.environ.get('MAX_IMPORT_BYTES', str(20 * 1024 * 1024)))
 
 # JWT and Password configuration
 SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'your-secret-key-change-in-production')
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# AUTH_MODE=stateless: short-lived access tokens that carry role and line,
+# so authentication needs no database read, plus refresh tokens (see
+# tokens.py). The default "session" mode keeps 7-day tokens with only the
+# user id, looked up on every request through user_cache.
+STATELESS_AUTH = os.environ.get('AUTH_MODE', 'session').lower() == 'stateless'
+if STATELESS_AUTH:
+    ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ.get('ACCESS_TOKEN_EXPIRE_MINUTES', '15'))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.environ.get('REFRESH_TOKEN_EXPIRE_DAYS', '7'))
+# Tokens for /api/notifications/stream, which travel in the query string
+STREAM_TOKEN_EXPIRE_SECONDS = int(os.environ.get('STREAM_TOKEN_EXPIRE_SECONDS', '300'))
+token_versions = TokenVersions(
+    access_ttl=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
+    refresh_interval=float(os.environ.get('AUTH_REVOCATION_REFRESH_SECONDS', '10'))
+)
+
+# BCRYPT_ROUNDS changes the cost of new hashes; existing ones are upgraded
+# on the next successful login unless PASSWORD_REHASH_ON_LOGIN is false.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=int(os.environ.get('BCRYPT_ROUNDS', '12'))
+)
+PASSWORD_REHASH_ON_LOGIN = os.environ.get('PASSWORD_REHASH_ON_LOGIN', 'true').lower() == 'true'
+password_hasher = PasswordHasher(pwd_context, max_workers=int(os.environ.get('PASSWORD_HASH_WORKERS', '4')))
 security = HTTPBearer()
 
+# Server-push channel for the notification bell. The broker is in-process:
+# a stream only gets notifications created by its own worker, so run the API
+# with a single worker while streams are in use (see notification_stream.py)
+notification_broker = NotificationBroker()
+
+def publish_notifications(docs: List[dict]):
+    for doc in docs:
+        notification_broker.publish(doc["user_id"], "notification", jsonable_encoder(doc))
+
+# Notifications are written in batches off the request path
+notification_queue = NotificationQueue(db.notifications, on_persisted=publish_notifications)
+
+# Authenticated-user cache for get_current_user. Writes that change a user
+# evict it in this process; other workers pick the change up after the TTL,
+# so set USER_CACHE_TTL_SECONDS=0 where that delay is not acceptable.
+user_cache = TTLCache(
+    maxsize=int(os.environ.get('USER_CACHE_MAX_ENTRIES', '10000')),
+    ttl=float(os.environ.get('USER_CACHE_TTL_SECONDS', '30'))
+)
+
+metrics.gauge("user_cache_entries", "Users in the authentication cache", lambda: len(user_cache))
+metrics.gauge("user_cache_hits_total", "Authentication cache hits", lambda: user_cache.hits, kind="counter")
+metrics.gauge("user_cache_misses_total", "Authentication cache misses", lambda: user_cache.misses, kind="counter")
+# Claim list pages (listar_reclamos_cacheado). Keys include the write
+# generation read from MongoDB on every list request, so a claim write in
+# any worker makes older entries unreachable; the TTL only bounds how long
+# they take memory.
+list_cache = TTLCache(
+    maxsize=int(os.environ.get('LIST_CACHE_MAX_ENTRIES', '512')),
+    ttl=float(os.environ.get('LIST_CACHE_TTL_SECONDS', '10'))
+)
+
+metrics.gauge("list_cache_entries", "Claim list pages in the result cache", lambda: len(list_cache))
+metrics.gauge("list_cache_hits_total", "Claim list cache hits", lambda: list_cache.hits, kind="counter")
+metrics.gauge("list_cache_misses_total", "Claim list cache misses", lambda: list_cache.misses, kind="counter")
+metrics.gauge("list_cache_hit_ratio", "Claim list cache hits per lookup since startup",
+              lambda: list_cache.stats()["hit_rate"])
+metrics.gauge("list_cache_evictions_total", "Claim list pages evicted by size", lambda: list_cache.evictions,
+              kind="counter")
+metrics.gauge("token_revocations", "Users whose older access tokens are rejected", lambda: len(token_versions))
+metrics.gauge(
+    "token_rejections_total", "Access tokens rejected as revoked", lambda: token_versions.rejected, kind="counter"
+)
+metrics.gauge("password_hash_in_flight", "bcrypt operations running or queued", lambda: password_hasher.pending)
+metrics.gauge("password_hash_queue_depth", "bcrypt operations waiting for a thread", lambda: password_hasher.queue_depth)
+metrics.gauge("notification_queue_depth", "Notifications waiting to be written", lambda: notification_queue.depth)
+metrics.gauge("notifications_persisted_total", "Notifications written", lambda: notification_queue.persisted, kind="counter")
+metrics.gauge("notifications_failed_total", "Notifications dropped", lambda: notification_queue.failed, kind="counter")
+metrics.gauge("notification_streams", "Open notification streams", lambda: notification_broker.connections)
+metrics.gauge(
+    "notification_stream_dropped_total", "Events dropped for slow streams", lambda: notification_broker.dropped,
+    kind="counter"
+)
+
 # Create the main app without a prefix
 app = FastAPI()
 
-# Mount uploads directory for serving files
-app.mount("/uploads", StaticFiles(directory=str(UPLOADS_DIR)), name="uploads")
+# Mount uploads directory for serving files; names are content hashes, so
+# browsers may cache them forever
+app.mount("/uploads", ImmutableStaticFiles(directory=str(UPLOADS_DIR)), name="uploads")
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -56,6 +189,8 @@ class User(BaseModel):
     linea_asignada: Optional[str] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     is_active: bool = True
+    # Incremented when role, line or password change (see tokens.py)
+    token_version: int = 0
 
 class UserCreate(BaseModel):
     username: str
@@ -85,6 +220,16 @@ class TokenResponse(BaseModel):
     access_token: str
     token_type: str
     user: UserResponse
+    # Only in AUTH_MODE=stateless
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class StreamTokenResponse(BaseModel):
+    token: str
+    expires_in: int
 
 class Notification(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -126,7 +271,10 @@ class InvitationResponse(BaseModel):
     expires_at: datetime
 
 class Comment(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    reclamo_id: Optional[str] = None
     text: str
     author: str
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -136,6 +284,7 @@ class Reclamo(BaseModel):
     
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     numero_reclamo: str
+    numero_busqueda: Optional[str] = None  # accent-folded lowercase copy for prefix search
     linea: str
     categoria: str
     sector_estacion: str
@@ -143,13 +292,16 @@ class Reclamo(BaseModel):
     archivos: List[str] = []
     estado: str = "Pendiente"
     responsable: Optional[str] = None
-    comentarios: List[dict] = []
+    comment_count: int = 0  # comments live in the comentarios collection
+    last_comment_at: Optional[datetime] = None
     creator_id: Optional[str] = None  # ID del usuario que creó el reclamo
     creator_username: Optional[str] = None
     fecha_creacion: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     fecha_cierre: Optional[datetime] = None
     solucion: Optional[str] = None
     responsable_cierre: Optional[str] = None
+    version: int = 0  # incremented by every write; drives the ETag
+    updated_at: Optional[datetime] = None
 
 class ReclamoCreate(BaseModel):
     linea: str
@@ -167,6 +319,61 @@ class CommentCreate(BaseModel):
     text: str
     author: str
 
+class ReclamosPage(BaseModel):
+    items: List[Reclamo]
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+class ReclamoResumen(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    
+    id: str
+    numero_reclamo: str
+    linea: str
+    categoria: str
+    sector_estacion: str
+    estado: str
+    fecha_creacion: datetime
+
+class ReclamosResumenPage(BaseModel):
+    items: List[ReclamoResumen]
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+class FacetaValor(BaseModel):
+    valor: Optional[str] = None
+    total: int
+
+class BusquedaReclamos(ReclamosResumenPage):
+    total: int
+    # linea / categoria / estado / responsable -> counts under the other filters
+    facetas: Dict[str, List[FacetaValor]]
+
+class ExportacionJob(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    
+    id: str
+    estado: str  # pendiente, listo or error
+    filas: int = 0
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+class ImportRowError(BaseModel):
+    fila: int
+    errores: List[str]
+
+class ImportResult(BaseModel):
+    total: int
+    importados: int
+    errores: List[ImportRowError]
+    creados: List[dict]
+
+class ComentariosPage(BaseModel):
+    items: List[Comment]
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
 class EstadisticasResponse(BaseModel):
     total_reclamos: int
     reclamos_por_linea: dict
@@ -176,64 +383,90 @@ class EstadisticasResponse(BaseModel):
     reclamos_por_mes: dict
 
 # Password and JWT utilities
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+# bcrypt runs in password_hasher's thread pool so it never blocks the event loop
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.verify(plain_password, hashed_password)
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+async def get_password_hash(password: str) -> str:
+    return await password_hasher.hash(password)
 
-def create_access_token(data: dict) -> str:
+def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+def emitir_tokens(user: dict) -> dict:
+    """Token fields of a TokenResponse for a user document (with password_hash)."""
+    if not STATELESS_AUTH:
+        return {"access_token": create_access_token(data={"sub": user["id"]}), "token_type": "bearer"}
+    return {
+        "access_token": create_access_token(access_claims(user)),
+        "refresh_token": create_access_token(refresh_claims(user), timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)),
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
+
+async def revocar_sesiones(user_id: str, version: Optional[int]):
+    """Forget the cached user and, in stateless mode, reject its access
+    tokens older than `version` (None: all of them, for deleted users)."""
+    user_cache.pop(user_id)
+    if STATELESS_AUTH:
+        await token_versions.revoke(db, user_id, version)
+
+async def authenticate_token(token: str) -> dict:
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid authentication credentials")
+        # Refresh and stream tokens are only good for their own endpoint
+        if payload.get("typ", ACCESS) != ACCESS:
+            raise HTTPException(status_code=401, detail="Invalid authentication credentials")
         
-        user = await db.users.find_one({"id": user_id}, {"_id": 0, "password_hash": 0})
+        if STATELESS_AUTH:
+            # Everything needed is in the token; only revocations are checked
+            if "role" not in payload:
+                raise HTTPException(status_code=401, detail="Invalid authentication credentials")
+            if not token_versions.accepts(user_id, payload.get("ver", 0)):
+                raise HTTPException(status_code=401, detail="Token revoked")
+            return user_from_claims(payload)
+        
+        user = user_cache.get(user_id)
         if user is None:
-            raise HTTPException(status_code=401, detail="User not found")
+            user = await db.users.find_one({"id": user_id}, {"_id": 0, "password_hash": 0})
+            if user is None:
+                raise HTTPException(status_code=401, detail="User not found")
+            user_cache.set(user_id, user)
         
-        return user
+        # Handlers may modify the dict they get
+        return dict(user)
     except JWTError:
         raise HTTPException(status_code=401, detail="Could not validate credentials")
 
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+    return await authenticate_token(credentials.credentials)
+
 async def get_current_admin(current_user: dict = Depends(get_current_user)) -> dict:
     if current_user.get("role") != "ADMIN":
         raise HTTPException(status_code=403, detail="Not enough permissions")
     return current_user
 
-async def create_notification(user_id: str, reclamo_id: str, reclamo_numero: str, message: str):
+def create_notification(user_id: str, reclamo_id: str, reclamo_numero: str, message: str):
     notification = Notification(
         user_id=user_id,
         reclamo_id=reclamo_id,
         reclamo_numero=reclamo_numero,
         message=message
     )
-    doc = notification.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
-    await db.notifications.insert_one(doc)
-
-# Generate reclamo number
-def generar_numero_reclamo(linea: str, categoria: str, contador: int) -> str:
-    categoria_map = {
-        "Condiciones de trabajo": "CON",
-        "Faltante de materiales o elementos de seguridad": "MAT",
-        "Higiene y salubridad": "HIG",
-        "Seguridad y prevención": "SEG",
-        "Personal y recursos humanos": "PER",
-        "Conflictos o situaciones laborales": "LAB",
-        "Otros reclamos gremiales": "OTR"
-    }
-    codigo_cat = categoria_map.get(categoria, "OTR")
-    return f"Línea{linea}-{codigo_cat}-{contador:04d}"
+    # Persisted and pushed to the user's streams by notification_queue
+    notification_queue.enqueue(notification.model_dump())
+
+# Claims not yet processed by migrate_comentarios.py still embed their
+# comments; never load them with the claim.
+RECLAMO_PROJECTION = {"_id": 0, "comentarios": 0}
+RESUMEN_PROJECTION = {"_id": 0, **{field: 1 for field in ReclamoResumen.model_fields}}
 
 # Routes
 @api_router.get("/")
@@ -246,38 +479,36 @@ async def root():
 async def admin_access():
     """Acceso directo para administrador sin credenciales"""
     # Buscar usuario admin
-    admin_user = await db.users.find_one({"role": "ADMIN"}, {"_id": 0, "password_hash": 0})
+    admin_user = await db.users.find_one({"role": "ADMIN"}, {"_id": 0})
     if not admin_user:
         raise HTTPException(status_code=404, detail="Admin user not found")
     
-    # Create access token
-    access_token = create_access_token(data={"sub": admin_user["id"]})
-    
-    if isinstance(admin_user['created_at'], str):
-        admin_user['created_at'] = datetime.fromisoformat(admin_user['created_at'])
+    user_response = UserResponse(**decode("users", admin_user))
     
-    user_response = UserResponse(**admin_user)
-    
-    return TokenResponse(
-        access_token=access_token,
-        token_type="bearer",
-        user=user_response
-    )
+    return TokenResponse(user=user_response, **emitir_tokens(admin_user))
 
 @api_router.post("/auth/login", response_model=TokenResponse)
 async def login(credentials: UserLogin):
     user = await db.users.find_one({"username": credentials.username}, {"_id": 0})
-    if not user or not verify_password(credentials.password, user["password_hash"]):
+    if not user:
         raise HTTPException(status_code=401, detail="Incorrect username or password")
     
+    if PASSWORD_REHASH_ON_LOGIN:
+        valid, new_hash = await password_hasher.verify_and_update(credentials.password, user["password_hash"])
+    else:
+        valid, new_hash = await verify_password(credentials.password, user["password_hash"]), None
+    if not valid:
+        raise HTTPException(status_code=401, detail="Incorrect username or password")
+    if new_hash:
+        await db.users.update_one({"id": user["id"]}, {"$set": {"password_hash": new_hash}})
+        user["password_hash"] = new_hash
+    
     if not user.get("is_active", True):
         raise HTTPException(status_code=403, detail="User account is disabled")
     
-    access_token = create_access_token(data={"sub": user["id"]})
-    
-    if isinstance(user['created_at'], str):
-        user['created_at'] = datetime.fromisoformat(user['created_at'])
+    tokens = emitir_tokens(user)
     
+    decode("users", user)
     user_response = UserResponse(
         id=user["id"],
         username=user["username"],
@@ -287,18 +518,36 @@ async def login(credentials: UserLogin):
         created_at=user["created_at"]
     )
     
-    return TokenResponse(
-        access_token=access_token,
-        token_type="bearer",
-        user=user_response
-    )
+    return TokenResponse(user=user_response, **tokens)
+
+@api_router.post("/auth/refresh", response_model=TokenResponse)
+async def refresh_tokens(data: RefreshRequest):
+    if not STATELESS_AUTH:
+        raise HTTPException(status_code=400, detail="Refresh tokens require AUTH_MODE=stateless")
+    try:
+        payload = jwt.decode(data.refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Could not validate credentials")
+    if payload.get("typ") != REFRESH or not payload.get("sub"):
+        raise HTTPException(status_code=401, detail="Invalid authentication credentials")
+    
+    # The one read of the refresh cycle: new claims come from the current user
+    user = await db.users.find_one({"id": payload["sub"]}, {"_id": 0})
+    if not user or not user.get("is_active", True):
+        raise HTTPException(status_code=401, detail="User not found")
+    if payload.get("pwd") != password_fingerprint(user["password_hash"]):
+        raise HTTPException(status_code=401, detail="Token revoked")
+    
+    return TokenResponse(user=UserResponse(**decode("users", user)), **emitir_tokens(user))
 
 @api_router.get("/auth/me", response_model=UserResponse)
 async def get_me(current_user: dict = Depends(get_current_user)):
-    if isinstance(current_user['created_at'], str):
-        current_user['created_at'] = datetime.fromisoformat(current_user['created_at'])
-    
-    return UserResponse(**current_user)
+    if STATELESS_AUTH:
+        # Access tokens do not carry email and created_at
+        current_user = await db.users.find_one({"id": current_user["id"]}, {"_id": 0, "password_hash": 0})
+        if not current_user:
+            raise HTTPException(status_code=404, detail="User not found")
+    return UserResponse(**decode("users", current_user))
 
 @api_router.patch("/users/me/password")
 async def change_own_password(password_data: ChangePasswordRequest, current_user: dict = Depends(get_current_user)):
@@ -308,7 +557,7 @@ async def change_own_password(password_data: ChangePasswordRequest, current_user
         raise HTTPException(status_code=404, detail="User not found")
     
     # Verify current password
-    if not verify_password(password_data.current_password, user["password_hash"]):
+    if not await verify_password(password_data.current_password, user["password_hash"]):
         raise HTTPException(status_code=400, detail="Current password is incorrect")
     
     # Validate new password
@@ -319,12 +568,20 @@ async def change_own_password(password_data: ChangePasswordRequest, current_user
         raise HTTPException(status_code=400, detail="New password must be different from current password")
     
     # Update password
-    new_password_hash = get_password_hash(password_data.new_password)
-    await db.users.update_one(
+    new_password_hash = await get_password_hash(password_data.new_password)
+    user = await db.users.find_one_and_update(
         {"id": current_user["id"]},
-        {"$set": {"password_hash": new_password_hash}}
+        {"$set": {"password_hash": new_password_hash}, "$inc": {"token_version": 1}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
     )
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    await revocar_sesiones(user["id"], user["token_version"])
     
+    if STATELESS_AUTH:
+        # Every other session is signed out; this one continues with new tokens
+        return {"message": "Password changed successfully", **emitir_tokens(user)}
     return {"message": "Password changed successfully"}
 
 @api_router.post("/reclamos", response_model=Reclamo)
@@ -336,33 +593,39 @@ async def crear_reclamo(input: ReclamoCreate, current_user: dict = Depends(get_c
         if input.linea != current_user["linea_asignada"]:
             raise HTTPException(status_code=403, detail=f"You can only create claims for line {current_user['linea_asignada']}")
     
-    # Get count for numero generation
-    count = await db.reclamos.count_documents({"linea": input.linea, "categoria": input.categoria})
-    numero = generar_numero_reclamo(input.linea, input.categoria, count + 1)
-    
     reclamo_dict = input.model_dump()
-    reclamo_dict['numero_reclamo'] = numero
     reclamo_dict['creator_id'] = current_user["id"]
     reclamo_dict['creator_username'] = current_user["username"]
-    reclamo_obj = Reclamo(**reclamo_dict)
-    
-    doc = reclamo_obj.model_dump()
-    doc['fecha_creacion'] = doc['fecha_creacion'].isoformat()
-    if doc['fecha_cierre']:
-        doc['fecha_cierre'] = doc['fecha_cierre'].isoformat()
     
-    await db.reclamos.insert_one(doc)
+    # Next number from the atomic per-(linea, categoria) counter. A duplicate
+    # can only happen if a counter was reset below existing numbers, so
+    # retry a couple of times before giving up.
+    for _ in range(3):
+        contador = await next_numero(db, input.linea, codigo_categoria(input.categoria))
+        numero = generar_numero_reclamo(input.linea, input.categoria, contador)
+        reclamo_obj = Reclamo(numero_reclamo=numero, numero_busqueda=numero_busqueda(numero), **reclamo_dict)
+        reclamo_obj.updated_at = reclamo_obj.fecha_creacion
+        
+        doc = reclamo_obj.model_dump()
+        try:
+            await db.reclamos.insert_one(doc)
+            break
+        except DuplicateKeyError:
+            logger.warning("Claim number %s already taken, allocating another", numero)
+    else:
+        raise HTTPException(status_code=409, detail="Could not allocate a claim number")
+    
+    await record_created(db, doc)
+    await bump_generation(db)
     return reclamo_obj
 
-@api_router.get("/reclamos", response_model=List[Reclamo])
-async def obtener_reclamos(
+def construir_query_reclamos(
+    current_user: dict,
     linea: Optional[str] = None,
     categoria: Optional[str] = None,
     estado: Optional[str] = None,
-    responsable: Optional[str] = None,
-    search: Optional[str] = None,
-    current_user: dict = Depends(get_current_user)
-):
+    responsable: Optional[str] = None
+) -> dict:
     query = {}
     
     # Filter by role
@@ -381,29 +644,244 @@ async def obtener_reclamos(
         query['estado'] = estado
     if responsable:
         query['responsable'] = responsable
-    if search:
-        query['$or'] = [
-            {'numero_reclamo': {'$regex': search, '$options': 'i'}},
-            {'descripcion': {'$regex': search, '$options': 'i'}},
-            {'sector_estacion': {'$regex': search, '$options': 'i'}}
-        ]
-    
-    reclamos = await db.reclamos.find(query, {"_id": 0}).sort('fecha_creacion', -1).to_list(1000)
-    
-    for reclamo in reclamos:
-        if isinstance(reclamo['fecha_creacion'], str):
-            reclamo['fecha_creacion'] = datetime.fromisoformat(reclamo['fecha_creacion'])
-        if reclamo.get('fecha_cierre') and isinstance(reclamo['fecha_cierre'], str):
-            reclamo['fecha_cierre'] = datetime.fromisoformat(reclamo['fecha_cierre'])
-        for comentario in reclamo.get('comentarios', []):
-            if isinstance(comentario['timestamp'], str):
-                comentario['timestamp'] = datetime.fromisoformat(comentario['timestamp'])
-    
-    return reclamos
+    return query
+
+async def rechazar_escritura(reclamo_id: str, current_user: dict, motivo: Optional[str] = None):
+    """A scoped claim write matched nothing: 404 if the claim is gone, 403 if
+    it is not the user's, 409 if it changed between the write and this read.
+    Always raises; pass `motivo` when explain_miss has already been asked."""
+    motivo = motivo or await explain_miss(db, reclamo_id, current_user)
+    if motivo == MISSING:
+        raise HTTPException(status_code=404, detail="Reclamo no encontrado")
+    if motivo == FORBIDDEN:
+        raise HTTPException(status_code=403, detail="Access denied")
+    raise HTTPException(status_code=409, detail="Reclamo modificado durante la operación, intente nuevamente")
+
+async def validar_lista(
+    request: Request, response: Response, current_user: dict, *parts
+) -> Tuple[Optional[Response], int]:
+    """Weak validators for a list or statistics response. Returns a 304 to
+    send instead of the body when the client's copy is still current, and
+    the claim write generation the validators were built from."""
+    generation, last_modified = await read_generation(db)
+    scope = (current_user["id"], current_user["role"], current_user.get("linea_asignada"))
+    etag = weak_etag(f"g{generation}", request.url.path, scope, *parts)
+    if is_fresh(request, etag, last_modified):
+        return not_modified(etag, last_modified), generation
+    set_validators(response, etag, last_modified)
+    return None, generation
+
+async def listar_reclamos_cacheado(
+    generation: int, current_user: dict, query: dict, search: Optional[str], cursor: Optional[str], limit: int,
+    projection: dict
+):
+    """listar_reclamos through list_cache; returns decoded documents. The
+    key holds the emisor's id (and the query its creator_id), so an emisor
+    is only ever served its own claims; admins share entries."""
+    key = list_cache_key(tuple(sorted(projection)), generation, current_user, query, search, cursor, limit)
+    page = list_cache.get(key)
+    if page is None:
+        reclamos, next_cursor, prev_cursor = await listar_reclamos(query, search, cursor, limit, projection)
+        page = (decode_many("reclamos", reclamos), next_cursor, prev_cursor)
+        list_cache.set(key, page)
+    return page
+
+async def listar_reclamos(query: dict, search: Optional[str], cursor: Optional[str], limit: int, projection: dict):
+    ranked = False
+    if search and search.strip():
+        search_filter, ranked = build_search_filter(search)
+        query = {**query, **search_filter}
+    
+    try:
+        if ranked:
+            return await fetch_ranked_page(db.reclamos, query, projection, limit, cursor)
+        return await fetch_page(db.reclamos, query, projection, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@api_router.get("/reclamos", response_model=ReclamosPage)
+async def obtener_reclamos(
+    request: Request,
+    response: Response,
+    linea: Optional[str] = None,
+    categoria: Optional[str] = None,
+    estado: Optional[str] = None,
+    responsable: Optional[str] = None,
+    search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: dict = Depends(get_current_user)
+):
+    query = construir_query_reclamos(current_user, linea, categoria, estado, responsable)
+    cached, generation = await validar_lista(request, response, current_user, query, search, cursor, limit)
+    if cached:
+        return cached
+    reclamos, next_cursor, prev_cursor = await listar_reclamos_cacheado(
+        generation, current_user, query, search, cursor, limit, RECLAMO_PROJECTION
+    )
+    
+    if FAST_JSON:
+        return trusted_page(Reclamo, reclamos, next_cursor, prev_cursor, response)
+    return ReclamosPage(items=reclamos, next_cursor=next_cursor, prev_cursor=prev_cursor)
+
+@api_router.get("/reclamos/resumen", response_model=ReclamosResumenPage)
+async def obtener_reclamos_resumen(
+    request: Request,
+    response: Response,
+    linea: Optional[str] = None,
+    categoria: Optional[str] = None,
+    estado: Optional[str] = None,
+    responsable: Optional[str] = None,
+    search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    current_user: dict = Depends(get_current_user)
+):
+    """Lean list for tables: only the columns they show. Without search the
+    query is covered by the *_resumen indexes and never touches documents."""
+    query = construir_query_reclamos(current_user, linea, categoria, estado, responsable)
+    cached, generation = await validar_lista(request, response, current_user, query, search, cursor, limit)
+    if cached:
+        return cached
+    reclamos, next_cursor, prev_cursor = await listar_reclamos_cacheado(
+        generation, current_user, query, search, cursor, limit, RESUMEN_PROJECTION
+    )
+    
+    if FAST_JSON:
+        return trusted_page(ReclamoResumen, reclamos, next_cursor, prev_cursor, response)
+    return ReclamosResumenPage(items=reclamos, next_cursor=next_cursor, prev_cursor=prev_cursor)
+
+@api_router.get("/reclamos/search", response_model=BusquedaReclamos)
+async def buscar_reclamos(
+    request: Request,
+    response: Response,
+    linea: Optional[str] = None,
+    categoria: Optional[str] = None,
+    estado: Optional[str] = None,
+    responsable: Optional[str] = None,
+    search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    current_user: dict = Depends(get_current_user)
+):
+    """A page of the resumen list plus, for each filter dropdown, how many
+    claims each option would give under the other filters (see facets.py),
+    scoped like /reclamos. The page is the /reclamos/resumen page, with the
+    same keyset cursors and cache entries."""
+    query = construir_query_reclamos(current_user, linea, categoria, estado, responsable)
+    # The caller's scope applies to every facet; the filters only to the others'
+    base = construir_query_reclamos(current_user)
+    filtros = {field: value for field, value in query.items() if base.get(field) != value}
+    
+    cached, generation = await validar_lista(request, response, current_user, filtros, search, cursor, limit)
+    if cached:
+        return cached
+    
+    reclamos, next_cursor, prev_cursor = await listar_reclamos_cacheado(
+        generation, current_user, query, search, cursor, limit, RESUMEN_PROJECTION
+    )
+    
+    # Counts do not depend on the page: one entry serves every cursor and limit
+    key = list_cache_key("facetas", generation, current_user, filtros, search, None, 0)
+    conteos = list_cache.get(key)
+    if conteos is None:
+        if search and search.strip():
+            base = {**base, **build_search_filter(search)[0]}
+        conteos = await fetch_facet_counts(db.reclamos, base, filtros)
+        list_cache.set(key, conteos)
+    
+    if FAST_JSON:
+        return trusted_page(
+            ReclamoResumen, reclamos, next_cursor, prev_cursor, response,
+            total=conteos["total"], facetas=conteos["facetas"]
+        )
+    return BusquedaReclamos(items=reclamos, next_cursor=next_cursor, prev_cursor=prev_cursor, **conteos)
+
+def query_exportacion(current_user: dict, linea, categoria, estado, responsable, search) -> dict:
+    query = construir_query_reclamos(current_user, linea, categoria, estado, responsable)
+    if search and search.strip():
+        # Exports keep date order; the search only filters
+        query = {**query, **build_search_filter(search)[0]}
+    return query
+
+@api_router.get("/reclamos/export")
+async def exportar_reclamos(
+    formato: str = Query("csv", pattern="^(csv|ndjson)$"),
+    linea: Optional[str] = None,
+    categoria: Optional[str] = None,
+    estado: Optional[str] = None,
+    responsable: Optional[str] = None,
+    search: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    query = query_exportacion(current_user, linea, categoria, estado, responsable, search)
+    fecha = datetime.now(timezone.utc).strftime("%Y%m%d")
+    if formato == "csv":
+        body, media_type = stream_csv(db.reclamos, query), "text/csv; charset=utf-8"
+    else:
+        body, media_type = stream_ndjson(db.reclamos, query), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="reclamos-{fecha}.{formato}"'}
+    )
+
+# XLSX exports run in the background; keep a reference to each task until it finishes
+export_tasks = set()
+
+@api_router.post("/reclamos/export/xlsx", response_model=ExportacionJob, status_code=202)
+async def crear_exportacion_xlsx(
+    linea: Optional[str] = None,
+    categoria: Optional[str] = None,
+    estado: Optional[str] = None,
+    responsable: Optional[str] = None,
+    search: Optional[str] = None,
+    current_admin: dict = Depends(get_current_admin)
+):
+    if not XLSX_AVAILABLE:
+        raise HTTPException(status_code=501, detail="XLSX export is not available (openpyxl is not installed)")
+    query = query_exportacion(current_admin, linea, categoria, estado, responsable, search)
+    # Files only pile up through new jobs, so clean up before each one
+    await purge_exports(db, EXPORTS_DIR, EXPORT_RETENTION)
+    job = await create_xlsx_job(db, query, current_admin["id"])
+    task = asyncio.create_task(run_xlsx_job(db, job["id"], query, EXPORTS_DIR))
+    export_tasks.add(task)
+    task.add_done_callback(export_tasks.discard)
+    return job
+
+async def obtener_job_exportacion(job_id: str, current_admin: dict) -> dict:
+    job = await db.exportaciones.find_one({"id": job_id, "created_by": current_admin["id"]}, {"_id": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Export not found")
+    return job
+
+@api_router.get("/reclamos/export/xlsx/{job_id}", response_model=ExportacionJob)
+async def estado_exportacion_xlsx(job_id: str, current_admin: dict = Depends(get_current_admin)):
+    return await obtener_job_exportacion(job_id, current_admin)
+
+@api_router.get("/reclamos/export/xlsx/{job_id}/archivo")
+async def descargar_exportacion_xlsx(job_id: str, current_admin: dict = Depends(get_current_admin)):
+    job = await obtener_job_exportacion(job_id, current_admin)
+    if job["estado"] != "listo":
+        raise HTTPException(status_code=409, detail=f"Export is {job['estado']}")
+    path = EXPORTS_DIR / job["archivo"]
+    if not path.exists():
+        raise HTTPException(status_code=410, detail="Export file is no longer available")
+    fecha = job["created_at"].strftime("%Y%m%d")
+    return FileResponse(
+        path,
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        filename=f"reclamos-{fecha}.xlsx"
+    )
 
 @api_router.get("/reclamos/{reclamo_id}", response_model=Reclamo)
-async def obtener_reclamo(reclamo_id: str, current_user: dict = Depends(get_current_user)):
-    reclamo = await db.reclamos.find_one({"id": reclamo_id}, {"_id": 0})
+async def obtener_reclamo(
+    reclamo_id: str,
+    request: Request,
+    response: Response,
+    current_user: dict = Depends(get_current_user)
+):
+    reclamo = await db.reclamos.find_one({"id": reclamo_id}, RECLAMO_PROJECTION)
     if not reclamo:
         raise HTTPException(status_code=404, detail="Reclamo no encontrado")
     
@@ -412,69 +890,58 @@ async def obtener_reclamo(reclamo_id: str, current_user: dict = Depends(get_curr
         if reclamo.get("creator_id") != current_user["id"]:
             raise HTTPException(status_code=403, detail="Access denied")
     
-    if isinstance(reclamo['fecha_creacion'], str):
-        reclamo['fecha_creacion'] = datetime.fromisoformat(reclamo['fecha_creacion'])
-    if reclamo.get('fecha_cierre') and isinstance(reclamo['fecha_cierre'], str):
-        reclamo['fecha_cierre'] = datetime.fromisoformat(reclamo['fecha_cierre'])
-    for comentario in reclamo.get('comentarios', []):
-        if isinstance(comentario['timestamp'], str):
-            comentario['timestamp'] = datetime.fromisoformat(comentario['timestamp'])
-    
+    decode("reclamos", reclamo)
+    etag = claim_etag(reclamo)
+    last_modified = reclamo.get("updated_at") or reclamo["fecha_creacion"]
+    if is_fresh(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+    set_validators(response, etag, last_modified)
     return reclamo
 
 @api_router.patch("/reclamos/{reclamo_id}", response_model=Reclamo)
 async def actualizar_reclamo(reclamo_id: str, update: ReclamoUpdate, current_user: dict = Depends(get_current_user)):
-    reclamo = await db.reclamos.find_one({"id": reclamo_id}, {"_id": 0})
-    if not reclamo:
-        raise HTTPException(status_code=404, detail="Reclamo no encontrado")
-    
     # Only admin can update reclamos
     if current_user["role"] != "ADMIN":
         raise HTTPException(status_code=403, detail="Only administrators can update claims")
     
     update_data = {k: v for k, v in update.model_dump().items() if v is not None}
+    if not update_data:
+        reclamo = await db.reclamos.find_one({"id": reclamo_id}, RECLAMO_PROJECTION)
+        if not reclamo:
+            raise HTTPException(status_code=404, detail="Reclamo no encontrado")
+        return decode("reclamos", reclamo)
+    
+    # One round trip; fecha_cierre is set on the server when resolving
+    result = await update_reclamo(db, reclamo_id, update_data, RECLAMO_PROJECTION)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Reclamo no encontrado")
+    reclamo, updated_reclamo = result
     
-    if update.estado == "Resuelto" and not reclamo.get('fecha_cierre'):
-        update_data['fecha_cierre'] = datetime.now(timezone.utc).isoformat()
-    
-    if update_data:
-        await db.reclamos.update_one({"id": reclamo_id}, {"$set": update_data})
-    
-    updated_reclamo = await db.reclamos.find_one({"id": reclamo_id}, {"_id": 0})
-    
-    if isinstance(updated_reclamo['fecha_creacion'], str):
-        updated_reclamo['fecha_creacion'] = datetime.fromisoformat(updated_reclamo['fecha_creacion'])
-    if updated_reclamo.get('fecha_cierre') and isinstance(updated_reclamo['fecha_cierre'], str):
-        updated_reclamo['fecha_cierre'] = datetime.fromisoformat(updated_reclamo['fecha_cierre'])
-    for comentario in updated_reclamo.get('comentarios', []):
-        if isinstance(comentario['timestamp'], str):
-            comentario['timestamp'] = datetime.fromisoformat(comentario['timestamp'])
-    
-    return updated_reclamo
+    await asyncio.gather(record_updated(db, reclamo, updated_reclamo), bump_generation(db))
+    return decode("reclamos", updated_reclamo)
 
 @api_router.post("/reclamos/{reclamo_id}/comentarios")
 async def agregar_comentario(reclamo_id: str, comment: CommentCreate, current_user: dict = Depends(get_current_user)):
-    reclamo = await db.reclamos.find_one({"id": reclamo_id})
-    if not reclamo:
-        raise HTTPException(status_code=404, detail="Reclamo no encontrado")
-    
-    # Verify access
-    if current_user["role"] == "EMISOR_RECLAMO":
-        if reclamo.get("creator_id") != current_user["id"]:
-            raise HTTPException(status_code=403, detail="Access denied")
-    
-    nuevo_comentario = Comment(text=comment.text, author=comment.author)
+    nuevo_comentario = Comment(reclamo_id=reclamo_id, text=comment.text, author=comment.author)
     comment_dict = nuevo_comentario.model_dump()
-    comment_dict['timestamp'] = comment_dict['timestamp'].isoformat()
     
-    await db.reclamos.update_one(
-        {"id": reclamo_id},
-        {"$push": {"comentarios": comment_dict}}
-    )
+    # The comment goes in before the claim's version changes: a comments GET
+    # in between may list it under the old ETag, but never caches the new
+    # ETag without it. The counter update checks access (emisores only match
+    # their own claims); a rejected comment is deleted again.
+    await db.comentarios.insert_one(nuevo_comentario.model_dump())
+    try:
+        reclamo = await registrar_comentario(db, reclamo_id, current_user, nuevo_comentario.timestamp)
+        if reclamo is None:
+            await rechazar_escritura(reclamo_id, current_user)
+    except Exception:
+        await db.comentarios.delete_one({"id": nuevo_comentario.id})
+        raise
+    await bump_generation(db)
     
     # Create notification if admin responded to emisor's reclamo
     if current_user["role"] == "ADMIN" and reclamo.get("creator_id"):
-        await create_notification(
+        create_notification(
             user_id=reclamo["creator_id"],
             reclamo_id=reclamo_id,
             reclamo_numero=reclamo["numero_reclamo"],
@@ -483,9 +950,16 @@ async def agregar_comentario(reclamo_id: str, comment: CommentCreate, current_us
     
     return {"message": "Comentario agregado", "comentario": comment_dict}
 
-@api_router.post("/reclamos/{reclamo_id}/archivos")
-async def subir_archivo(reclamo_id: str, file: UploadFile = File(...), current_user: dict = Depends(get_current_user)):
-    reclamo = await db.reclamos.find_one({"id": reclamo_id})
+@api_router.get("/reclamos/{reclamo_id}/comentarios", response_model=ComentariosPage)
+async def obtener_comentarios(
+    reclamo_id: str,
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: dict = Depends(get_current_user)
+):
+    reclamo = await db.reclamos.find_one({"id": reclamo_id}, {"_id": 0, "id": 1, "creator_id": 1, "version": 1})
     if not reclamo:
         raise HTTPException(status_code=404, detail="Reclamo no encontrado")
     
@@ -494,29 +968,68 @@ async def subir_archivo(reclamo_id: str, file: UploadFile = File(...), current_u
         if reclamo.get("creator_id") != current_user["id"]:
             raise HTTPException(status_code=403, detail="Access denied")
     
-    # Save file
-    file_id = str(uuid.uuid4())
-    file_extension = Path(file.filename).suffix
-    filename = f"{file_id}{file_extension}"
-    file_path = UPLOADS_DIR / filename
+    # Adding a comment bumps the claim's version
+    etag = weak_etag(claim_etag(reclamo).strip('"'), cursor, limit)
+    if is_fresh(request, etag):
+        return not_modified(etag)
+    set_validators(response, etag)
     
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
-    file_url = f"/uploads/{filename}"
-    
-    await db.reclamos.update_one(
-        {"id": reclamo_id},
-        {"$push": {"archivos": file_url}}
-    )
+    # Oldest first, like a conversation
+    try:
+        comentarios, next_cursor, prev_cursor = await fetch_page(
+            db.comentarios, {"reclamo_id": reclamo_id}, {"_id": 0}, limit, cursor,
+            sort_field="timestamp", descending=False
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
     
-    return {"message": "Archivo subido", "url": file_url}
+    return ComentariosPage(items=decode_many("comentarios", comentarios), next_cursor=next_cursor, prev_cursor=prev_cursor)
+
+@api_router.post("/reclamos/{reclamo_id}/archivos")
+async def subir_archivo(reclamo_id: str, request: Request, file: UploadFile = File(...), current_user: dict = Depends(get_current_user)):
+    # The multipart body has already been spooled by now (see blobs.py); this
+    # only saves copying an obviously oversized file into the store
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES + 64 * 1024:
+        raise HTTPException(status_code=413, detail=f"File exceeds {MAX_UPLOAD_BYTES} bytes")
+    
+    # Check access before anything is written under UPLOADS_DIR
+    motivo = await explain_miss(db, reclamo_id, current_user)
+    if motivo != UNCHANGED:
+        await rechazar_escritura(reclamo_id, current_user, motivo)
+    
+    # Save file, stored once per content hash
+    try:
+        blob = await store_upload(db, file, UPLOADS_DIR, MAX_UPLOAD_BYTES)
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail=f"File exceeds {MAX_UPLOAD_BYTES} bytes")
+    
+    file_url = f"/uploads/{blob['filename']}"
+    
+    # Scoped again in case the claim was deleted meanwhile; a blob nobody
+    # references is removed by gc_uploads.py
+    if await adjuntar_archivo(db, reclamo_id, current_user, file_url):
+        await asyncio.gather(add_reference(db, blob["_id"]), bump_generation(db))
+    else:
+        motivo = await explain_miss(db, reclamo_id, current_user)
+        # UNCHANGED: the file was already attached
+        if motivo != UNCHANGED:
+            await rechazar_escritura(reclamo_id, current_user, motivo)
+    
+    return {"message": "Archivo subido", "url": file_url, "sha256": blob["_id"]}
 
 @api_router.delete("/reclamos/{reclamo_id}")
 async def eliminar_reclamo(reclamo_id: str, current_admin: dict = Depends(get_current_admin)):
-    result = await db.reclamos.delete_one({"id": reclamo_id})
-    if result.deleted_count == 0:
+    reclamo = await db.reclamos.find_one_and_delete(
+        {"id": reclamo_id},
+        projection={"_id": 0, "comentarios": 0, "descripcion": 0}
+    )
+    if not reclamo:
         raise HTTPException(status_code=404, detail="Reclamo no encontrado")
+    await record_deleted(db, reclamo)
+    await bump_generation(db)
+    await db.comentarios.delete_many({"reclamo_id": reclamo_id})
+    await release_references(db, reclamo.get("archivos", []))
     return {"message": "Reclamo eliminado"}
 
 # Notifications endpoints
@@ -527,11 +1040,7 @@ async def get_notifications(current_user: dict = Depends(get_current_user)):
         {"_id": 0}
     ).sort('created_at', -1).to_list(100)
     
-    for notif in notifications:
-        if isinstance(notif['created_at'], str):
-            notif['created_at'] = datetime.fromisoformat(notif['created_at'])
-    
-    return notifications
+    return decode_many("notifications", notifications)
 
 @api_router.patch("/notifications/{notification_id}/read")
 async def mark_notification_read(notification_id: str, current_user: dict = Depends(get_current_user)):
@@ -548,17 +1057,47 @@ async def get_unread_count(current_user: dict = Depends(get_current_user)):
     count = await db.notifications.count_documents({"user_id": current_user["id"], "is_read": False})
     return {"count": count}
 
+@api_router.post("/notifications/stream-token", response_model=StreamTokenResponse)
+async def create_stream_token(current_user: dict = Depends(get_current_user)):
+    return {
+        "token": create_access_token(stream_claims(current_user), timedelta(seconds=STREAM_TOKEN_EXPIRE_SECONDS)),
+        "expires_in": STREAM_TOKEN_EXPIRE_SECONDS,
+    }
+
+@api_router.get("/notifications/stream")
+async def notifications_stream(request: Request, token: str, last_event_id: Optional[str] = None):
+    # EventSource cannot send an Authorization header, so a short-lived
+    # stream token from /notifications/stream-token comes in the query
+    # string. Browsers resend Last-Event-ID when they reconnect.
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Could not validate credentials")
+    if payload.get("typ") != STREAM or not payload.get("sub"):
+        raise HTTPException(status_code=401, detail="Invalid stream token")
+    user_id = payload["sub"]
+    last_event_id = request.headers.get("last-event-id") or last_event_id
+    
+    async def load_sync():
+        return {"count": await db.notifications.count_documents({"user_id": user_id, "is_read": False})}
+    
+    return StreamingResponse(
+        stream_events(notification_broker, user_id, request, last_event_id, load_sync),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # Invitation endpoints (Admin only)
 @api_router.post("/invitations/create", response_model=InvitationResponse)
 async def create_invitation(invitation_data: InvitationCreate, current_admin: dict = Depends(get_current_admin)):
-    # Check if username already exists
-    existing_user = await db.users.find_one({"username": invitation_data.username})
-    if existing_user:
-        raise HTTPException(status_code=400, detail="Username already exists")
-    
-    # Check if email already exists
-    existing_email = await db.users.find_one({"email": invitation_data.email})
-    if existing_email:
+    # Username or email already taken by a user (one query)
+    existing = await db.users.find_one(
+        {"$or": [{"username": invitation_data.username}, {"email": invitation_data.email}]},
+        {"_id": 0, "username": 1}
+    )
+    if existing:
+        if existing["username"] == invitation_data.username:
+            raise HTTPException(status_code=400, detail="Username already exists")
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Create invitation
@@ -569,11 +1108,7 @@ async def create_invitation(invitation_data: InvitationCreate, current_admin: di
         linea_asignada=invitation_data.linea_asignada
     )
     
-    doc = invitation.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
-    doc['expires_at'] = doc['expires_at'].isoformat()
-    
-    await db.invitations.insert_one(doc)
+    await db.invitations.insert_one(invitation.model_dump())
     
     # Generate invitation link
     base_url = os.environ.get('FRONTEND_URL', 'https://reclamos-metro.preview.emergentagent.com')
@@ -591,16 +1126,12 @@ async def create_invitation(invitation_data: InvitationCreate, current_admin: di
 
 @api_router.get("/invitations/{token}")
 async def get_invitation(token: str):
-    invitation = await db.invitations.find_one({"token": token}, {"_id": 0})
+    invitation = decode("invitations", await db.invitations.find_one({"token": token}, {"_id": 0}))
     if not invitation:
         raise HTTPException(status_code=404, detail="Invitation not found")
     
     # Check expiration
-    expires_at = invitation['expires_at']
-    if isinstance(expires_at, str):
-        expires_at = datetime.fromisoformat(expires_at)
-    
-    if datetime.now(timezone.utc) > expires_at:
+    if datetime.now(timezone.utc) > invitation['expires_at']:
         raise HTTPException(status_code=400, detail="Invitation expired")
     
     # Check if user already exists
@@ -618,16 +1149,12 @@ async def get_invitation(token: str):
 
 @api_router.post("/invitations/{token}/accept", response_model=TokenResponse)
 async def accept_invitation(token: str):
-    invitation = await db.invitations.find_one({"token": token}, {"_id": 0})
+    invitation = decode("invitations", await db.invitations.find_one({"token": token}, {"_id": 0}))
     if not invitation:
         raise HTTPException(status_code=404, detail="Invitation not found")
     
     # Check expiration
-    expires_at = invitation['expires_at']
-    if isinstance(expires_at, str):
-        expires_at = datetime.fromisoformat(expires_at)
-    
-    if datetime.now(timezone.utc) > expires_at:
+    if datetime.now(timezone.utc) > invitation['expires_at']:
         raise HTTPException(status_code=400, detail="Invitation expired")
     
     # Check if user already exists
@@ -635,11 +1162,7 @@ async def accept_invitation(token: str):
     
     if existing_user:
         # User already exists, just authenticate them
-        if isinstance(existing_user['created_at'], str):
-            existing_user['created_at'] = datetime.fromisoformat(existing_user['created_at'])
-        
-        # Create access token
-        access_token = create_access_token(data={"sub": existing_user["id"]})
+        decode("users", existing_user)
         
         user_response = UserResponse(
             id=existing_user["id"],
@@ -650,31 +1173,23 @@ async def accept_invitation(token: str):
             created_at=existing_user["created_at"]
         )
         
-        return TokenResponse(
-            access_token=access_token,
-            token_type="bearer",
-            user=user_response
-        )
+        return TokenResponse(user=user_response, **emitir_tokens(existing_user))
     
     # Create new user
     user = User(
         username=invitation['username'],
         email=invitation['email'],
-        password_hash=get_password_hash(invitation['password']),
+        password_hash=await get_password_hash(invitation['password']),
         role="EMISOR_RECLAMO",
         linea_asignada=invitation.get('linea_asignada')
     )
     
-    doc = user.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
-    
-    await db.users.insert_one(doc)
+    await db.users.insert_one(user.model_dump())
     
     # Mark invitation as used (for tracking purposes only)
     await db.invitations.update_one({"token": token}, {"$set": {"used": True}})
     
-    # Create access token
-    access_token = create_access_token(data={"sub": user.id})
+    tokens = emitir_tokens(user.model_dump())
     
     user_response = UserResponse(
         id=user.id,
@@ -685,49 +1200,31 @@ async def accept_invitation(token: str):
         created_at=user.created_at
     )
     
-    return TokenResponse(
-        access_token=access_token,
-        token_type="bearer",
-        user=user_response
-    )
+    return TokenResponse(user=user_response, **tokens)
 
 @api_router.get("/invitations")
 async def get_invitations(current_admin: dict = Depends(get_current_admin)):
     invitations = await db.invitations.find({}, {"_id": 0}).sort('created_at', -1).to_list(100)
     
-    for inv in invitations:
-        if isinstance(inv['created_at'], str):
-            inv['created_at'] = datetime.fromisoformat(inv['created_at'])
-        if isinstance(inv['expires_at'], str):
-            inv['expires_at'] = datetime.fromisoformat(inv['expires_at'])
-    
-    return invitations
+    return decode_many("invitations", invitations)
 
 # User management endpoints (Admin only)
 @api_router.post("/users/create", response_model=UserResponse)
 async def create_user(user_data: UserCreate, current_admin: dict = Depends(get_current_admin)):
-    # Check if username exists
-    existing_user = await db.users.find_one({"username": user_data.username})
-    if existing_user:
-        raise HTTPException(status_code=400, detail="Username already exists")
-    
-    # Check if email exists
-    existing_email = await db.users.find_one({"email": user_data.email})
-    if existing_email:
-        raise HTTPException(status_code=400, detail="Email already registered")
-    
-    # Create user
+    # Create user; the unique indexes on username and email reject duplicates
     user = User(
         username=user_data.username,
         email=user_data.email,
-        password_hash=get_password_hash(user_data.password),
+        password_hash=await get_password_hash(user_data.password),
         role="EMISOR_RECLAMO"
     )
     
-    doc = user.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
-    
-    await db.users.insert_one(doc)
+    try:
+        await db.users.insert_one(user.model_dump())
+    except DuplicateKeyError as exc:
+        if duplicate_field(exc) == "email":
+            raise HTTPException(status_code=400, detail="Email already registered")
+        raise HTTPException(status_code=400, detail="Username already exists")
     
     return UserResponse(
         id=user.id,
@@ -742,11 +1239,7 @@ async def create_user(user_data: UserCreate, current_admin: dict = Depends(get_c
 async def get_users(current_admin: dict = Depends(get_current_admin)):
     users = await db.users.find({}, {"_id": 0, "password_hash": 0}).to_list(1000)
     
-    for user in users:
-        if isinstance(user['created_at'], str):
-            user['created_at'] = datetime.fromisoformat(user['created_at'])
-    
-    return users
+    return decode_many("users", users)
 
 @api_router.delete("/users/{user_id}")
 async def delete_user(user_id: str, current_admin: dict = Depends(get_current_admin)):
@@ -757,17 +1250,21 @@ async def delete_user(user_id: str, current_admin: dict = Depends(get_current_ad
     result = await db.users.delete_one({"id": user_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
+    await revocar_sesiones(user_id, None)
     
     return {"message": "User deleted successfully"}
 
 @api_router.patch("/users/{user_id}/assign-line")
 async def assign_line_to_user(user_id: str, linea: str, current_admin: dict = Depends(get_current_admin)):
-    result = await db.users.update_one(
+    user = await db.users.find_one_and_update(
         {"id": user_id},
-        {"$set": {"linea_asignada": linea}}
+        {"$set": {"linea_asignada": linea}, "$inc": {"token_version": 1}},
+        projection={"_id": 0, "token_version": 1},
+        return_document=ReturnDocument.AFTER
     )
-    if result.matched_count == 0:
+    if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    await revocar_sesiones(user_id, user["token_version"])
     return {"message": f"Line {linea} assigned to user"}
 
 @api_router.patch("/users/{user_id}/role")
@@ -775,82 +1272,79 @@ async def change_user_role(user_id: str, role: str, current_admin: dict = Depend
     if role not in ["ADMIN", "EMISOR_RECLAMO"]:
         raise HTTPException(status_code=400, detail="Invalid role")
     
-    result = await db.users.update_one(
+    user = await db.users.find_one_and_update(
         {"id": user_id},
-        {"$set": {"role": role}}
+        {"$set": {"role": role}, "$inc": {"token_version": 1}},
+        projection={"_id": 0, "token_version": 1},
+        return_document=ReturnDocument.AFTER
     )
-    if result.matched_count == 0:
+    if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    await revocar_sesiones(user_id, user["token_version"])
     return {"message": f"Role updated to {role}"}
 
+# Bulk import (see bulk_import.py for the row formats)
+@api_router.post("/import/{tipo}", response_model=ImportResult)
+async def importar(
+    tipo: str,
+    file: UploadFile = File(...),
+    formato: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    dry_run: bool = False,
+    current_admin: dict = Depends(get_current_admin)
+):
+    if tipo not in ("usuarios", "invitaciones", "reclamos"):
+        raise HTTPException(status_code=404, detail="Unknown import type")
+    
+    data = await file.read(MAX_IMPORT_BYTES + 1)
+    if len(data) > MAX_IMPORT_BYTES:
+        raise HTTPException(status_code=413, detail=f"File exceeds {MAX_IMPORT_BYTES} bytes")
+    
+    try:
+        report = await run_import(
+            db, tipo, data, formato or detect_format(file.filename), password_hasher, dry_run=dry_run
+        )
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="File must be UTF-8 encoded")
+    
+    if tipo == "invitaciones":
+        base_url = os.environ.get('FRONTEND_URL', 'https://reclamos-metro.preview.emergentagent.com')
+        for creado in report["creados"]:
+            if "token" in creado:
+                creado["invitation_link"] = f"{base_url}/invitacion/{creado['token']}"
+    return report
+
+@api_router.get("/admin/slow-queries")
+async def obtener_consultas_lentas(
+    limit: int = Query(20, ge=1, le=200),
+    orden: str = Query("max_ms", pattern="^(max_ms|total_ms|avg_ms|count)$"),
+    current_admin: dict = Depends(get_current_admin)
+):
+    if not query_profiler.enabled:
+        raise HTTPException(status_code=404, detail="Query profiler is disabled (set SLOW_QUERY_MS)")
+    return {"threshold_ms": query_profiler.threshold_ms, "items": query_profiler.top(limit, orden)}
+
 @api_router.get("/estadisticas", response_model=EstadisticasResponse)
-async def obtener_estadisticas(current_user: dict = Depends(get_current_user)):
-    query = {}
+async def obtener_estadisticas(request: Request, response: Response, current_user: dict = Depends(get_current_user)):
+    cached, _ = await validar_lista(request, response, current_user)
+    if cached:
+        return cached
     
-    # Filter by role
+    # Filter by role: emisores only see their own counters
     if current_user["role"] == "EMISOR_RECLAMO":
-        query['creator_id'] = current_user["id"]
-        if current_user.get("linea_asignada"):
-            query['linea'] = current_user["linea_asignada"]
+        stats = await read_stats(db, creator_id=current_user["id"], linea=current_user.get("linea_asignada"))
+    else:
+        stats = await read_stats(db)
     
-    reclamos = await db.reclamos.find(query, {"_id": 0}).to_list(10000)
-    
-    total = len(reclamos)
-    
-    # Reclamos por línea
-    por_linea = {}
-    for r in reclamos:
-        linea = r['linea']
-        por_linea[linea] = por_linea.get(linea, 0) + 1
-    
-    # Reclamos por categoría
-    por_categoria = {}
-    for r in reclamos:
-        cat = r['categoria']
-        por_categoria[cat] = por_categoria.get(cat, 0) + 1
-    
-    # Reclamos por estado
-    por_estado = {}
-    for r in reclamos:
-        estado = r['estado']
-        por_estado[estado] = por_estado.get(estado, 0) + 1
-    
-    # Tiempo promedio de resolución
-    tiempos = []
-    for r in reclamos:
-        if r.get('fecha_cierre') and r['estado'] == 'Resuelto':
-            fecha_creacion = r['fecha_creacion']
-            fecha_cierre = r['fecha_cierre']
-            if isinstance(fecha_creacion, str):
-                fecha_creacion = datetime.fromisoformat(fecha_creacion)
-            if isinstance(fecha_cierre, str):
-                fecha_cierre = datetime.fromisoformat(fecha_cierre)
-            dias = (fecha_cierre - fecha_creacion).days
-            tiempos.append(dias)
-    
-    tiempo_promedio = sum(tiempos) / len(tiempos) if tiempos else None
-    
-    # Reclamos por mes
-    por_mes = {}
-    for r in reclamos:
-        fecha = r['fecha_creacion']
-        if isinstance(fecha, str):
-            fecha = datetime.fromisoformat(fecha)
-        mes_key = fecha.strftime('%Y-%m')
-        por_mes[mes_key] = por_mes.get(mes_key, 0) + 1
-    
-    return EstadisticasResponse(
-        total_reclamos=total,
-        reclamos_por_linea=por_linea,
-        reclamos_por_categoria=por_categoria,
-        reclamos_por_estado=por_estado,
-        tiempo_promedio_resolucion=tiempo_promedio,
-        reclamos_por_mes=por_mes
-    )
+    return EstadisticasResponse(**stats)
 
 # Include the router in the main app
 app.include_router(api_router)
 
+# Compress bodies of COMPRESS_MIN_BYTES or more (0 disables compression)
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', '1024'))
+if COMPRESS_MIN_BYTES > 0:
+    app.add_middleware(CompressionMiddleware, minimum_size=COMPRESS_MIN_BYTES)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -859,6 +1353,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if query_profiler.enabled:
+    app.add_middleware(RequestScopeMiddleware)
+
+# Outermost, so its timings include every other middleware
+app.add_middleware(MetricsMiddleware, metrics=metrics)
+
+# Prometheus scrape endpoint; set METRICS_TOKEN to require a bearer token
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics(request: Request):
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -866,6 +1375,41 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+TOKEN_PARAM = re.compile(r"([?&])token=[^&\s]*")
+
+class RedactTokenFilter(logging.Filter):
+    """Keep query-string tokens (notification stream) out of the access log."""
+    def filter(self, record: logging.LogRecord) -> bool:
+        if isinstance(record.args, tuple):
+            record.args = tuple(
+                TOKEN_PARAM.sub(r"\1token=***", arg) if isinstance(arg, str) else arg for arg in record.args
+            )
+        return True
+
+logging.getLogger("uvicorn.access").addFilter(RedactTokenFilter())
+
+@app.on_event("startup")
+async def startup_db_client():
+    metrics.start_loop_monitor()
+    query_profiler.attach(client, asyncio.get_running_loop())
+    notification_queue.start()
+    await ensure_indexes(db)
+    # Fails startup when legacy duplicates kept numero_reclamo_unique from being built
+    await check_unique_numbers(db)
+    await backfill_numero_busqueda(db)
+    if await ensure_counters_seeded(db):
+        logger.info("Claim number counters seeded from existing claims")
+    if await ensure_stats(db):
+        logger.info("Statistics rollups built from existing claims")
+    if STATELESS_AUTH:
+        await token_versions.load(db)
+        token_versions.start(db)
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    metrics.stop_loop_monitor()
+    token_versions.stop()
+    await notification_queue.stop()
+    notification_broker.close()
+    client.close()
+    password_hasher.shutdown()
\ No newline at end of file
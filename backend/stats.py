@@ -0,0 +1,286 @@
+"""
+Claim statistics for /api/estadisticas.
+
+Reads come from the `estadisticas` collection, a set of counters kept up to
+date by every claim write: one document for all claims (`global`) and one
+per (creator_id, linea) for emisores. Each write applies its delta with a
+single $inc per document, so concurrent writes never lose counts.
+
+The same counters can be recomputed from scratch with one $facet
+aggregation per scope; rebuild_stats.py uses that to verify and repair
+drift.
+"""
+
+from typing import Dict, Optional
+
+from pymongo import ReplaceOne, UpdateOne
+
+from serialization import to_datetime
+
+MS_PER_DAY = 24 * 60 * 60 * 1000
+GLOBAL_ID = "global"
+COUNTERS = ("por_linea", "por_categoria", "por_estado", "por_mes")
+
+
+def scope_id(creator_id: str, linea: str) -> str:
+    return f"creator:{creator_id}:{linea}"
+
+
+# Counter names are user-provided values used as field names; '.' and a
+# leading '$' are not allowed there, so swap them for full-width lookalikes.
+def _key(value: str) -> str:
+    value = str(value).replace(".", "．")
+    return "＄" + value[1:] if value.startswith("$") else value
+
+
+def _unkey(value: str) -> str:
+    value = value.replace("．", ".")
+    return "$" + value[1:] if value.startswith("＄") else value
+
+
+def _dias_resolucion(reclamo: dict) -> Optional[int]:
+    if reclamo.get("estado") != "Resuelto" or not reclamo.get("fecha_cierre"):
+        return None
+    return (to_datetime(reclamo["fecha_cierre"]) - to_datetime(reclamo["fecha_creacion"])).days
+
+
+def _contribution(reclamo: dict, sign: int) -> Dict[str, int]:
+    inc = {
+        "total": sign,
+        f"por_linea.{_key(reclamo['linea'])}": sign,
+        f"por_categoria.{_key(reclamo['categoria'])}": sign,
+        f"por_estado.{_key(reclamo['estado'])}": sign,
+        f"por_mes.{to_datetime(reclamo['fecha_creacion']).strftime('%Y-%m')}": sign,
+    }
+    dias = _dias_resolucion(reclamo)
+    if dias is not None:
+        inc["resueltos"] = sign
+        inc["dias_resolucion"] = sign * dias
+    return inc
+
+
+async def _apply(db, reclamo: dict, inc: Dict[str, int]):
+    inc = {k: v for k, v in inc.items() if v}
+    if not inc:
+        return
+    ops = [UpdateOne({"_id": GLOBAL_ID}, {"$inc": inc}, upsert=True)]
+    if reclamo.get("creator_id"):
+        ops.append(UpdateOne(
+            {"_id": scope_id(reclamo["creator_id"], reclamo["linea"])},
+            {"$inc": inc, "$setOnInsert": {"creator_id": reclamo["creator_id"], "linea": reclamo["linea"]}},
+            upsert=True,
+        ))
+    await db.estadisticas.bulk_write(ops, ordered=False)
+
+
+async def record_created(db, reclamo: dict):
+    await _apply(db, reclamo, _contribution(reclamo, 1))
+
+
+async def record_created_many(db, reclamos: list):
+    """record_created for a batch: the deltas are summed per rollup document
+    and written with one bulk_write."""
+    global_inc: Dict[str, int] = {}
+    scoped: Dict[str, Dict[str, int]] = {}
+    scopes: Dict[str, dict] = {}
+    for reclamo in reclamos:
+        contribution = _contribution(reclamo, 1)
+        targets = [global_inc]
+        if reclamo.get("creator_id"):
+            sid = scope_id(reclamo["creator_id"], reclamo["linea"])
+            scopes[sid] = {"creator_id": reclamo["creator_id"], "linea": reclamo["linea"]}
+            targets.append(scoped.setdefault(sid, {}))
+        for inc in targets:
+            for field, value in contribution.items():
+                inc[field] = inc.get(field, 0) + value
+    if not global_inc:
+        return
+    ops = [UpdateOne({"_id": GLOBAL_ID}, {"$inc": global_inc}, upsert=True)]
+    for sid, inc in scoped.items():
+        ops.append(UpdateOne({"_id": sid}, {"$inc": inc, "$setOnInsert": scopes[sid]}, upsert=True))
+    await db.estadisticas.bulk_write(ops, ordered=False)
+
+
+async def record_deleted(db, reclamo: dict):
+    await _apply(db, reclamo, _contribution(reclamo, -1))
+
+
+async def record_updated(db, before: dict, after: dict):
+    inc = _contribution(after, 1)
+    for field, value in _contribution(before, -1).items():
+        inc[field] = inc.get(field, 0) + value
+    await _apply(db, after, inc)
+
+
+def _to_response(raw: dict) -> dict:
+    resueltos = raw.get("resueltos", 0)
+    return {
+        "total_reclamos": raw.get("total", 0),
+        "reclamos_por_linea": raw.get("por_linea", {}),
+        "reclamos_por_categoria": raw.get("por_categoria", {}),
+        "reclamos_por_estado": raw.get("por_estado", {}),
+        "tiempo_promedio_resolucion": raw.get("dias_resolucion", 0) / resueltos if resueltos else None,
+        "reclamos_por_mes": dict(sorted(raw.get("por_mes", {}).items())),
+    }
+
+
+def _from_doc(doc: Optional[dict]) -> dict:
+    """Rollup document -> raw counters, dropping counters that went back to 0."""
+    doc = doc or {}
+    raw = {
+        "total": doc.get("total", 0),
+        "resueltos": doc.get("resueltos", 0),
+        "dias_resolucion": doc.get("dias_resolucion", 0),
+    }
+    for counter in COUNTERS:
+        raw[counter] = {_unkey(k): v for k, v in doc.get(counter, {}).items() if v}
+    return raw
+
+
+def _merge(raws) -> dict:
+    merged = {"total": 0, "resueltos": 0, "dias_resolucion": 0, **{c: {} for c in COUNTERS}}
+    for raw in raws:
+        for field in ("total", "resueltos", "dias_resolucion"):
+            merged[field] += raw[field]
+        for counter in COUNTERS:
+            for k, v in raw[counter].items():
+                merged[counter][k] = merged[counter].get(k, 0) + v
+    return merged
+
+
+async def read_stats(db, creator_id: Optional[str] = None, linea: Optional[str] = None) -> dict:
+    """Return the EstadisticasResponse fields from the rollups.
+
+    Without creator_id this is the global view; with creator_id and linea it
+    is a single document read. An emisor without an assigned line sums the
+    few documents it has, one per line it created claims on.
+    """
+    if creator_id is None:
+        raw = _from_doc(await db.estadisticas.find_one({"_id": GLOBAL_ID}))
+    elif linea:
+        raw = _from_doc(await db.estadisticas.find_one({"_id": scope_id(creator_id, linea)}))
+    else:
+        docs = await db.estadisticas.find({"creator_id": creator_id}).to_list(None)
+        raw = _merge(_from_doc(doc) for doc in docs)
+    return _to_response(raw)
+
+
+# Recomputing from the claims
+
+def _count_by(field) -> list:
+    return [{"$group": {"_id": field, "n": {"$sum": 1}}}]
+
+
+def stats_pipeline(query: dict) -> list:
+    return [
+        {"$match": query},
+        {"$project": {
+            "_id": 0,
+            "linea": 1,
+            "categoria": 1,
+            "estado": 1,
+            # $toDate accepts both native dates and the stored ISO strings
+            "creacion": {"$toDate": "$fecha_creacion"},
+            "cierre": {"$cond": [
+                {"$and": [{"$eq": ["$estado", "Resuelto"]}, {"$ifNull": ["$fecha_cierre", False]}]},
+                {"$toDate": "$fecha_cierre"},
+                None,
+            ]},
+        }},
+        {"$facet": {
+            "total": [{"$count": "n"}],
+            "por_linea": _count_by("$linea"),
+            "por_categoria": _count_by("$categoria"),
+            "por_estado": _count_by("$estado"),
+            "por_mes": _count_by({"$dateToString": {"format": "%Y-%m", "date": "$creacion"}}),
+            # Whole days between creation and close, like timedelta.days
+            "resolucion": [
+                {"$match": {"cierre": {"$ne": None}}},
+                {"$group": {
+                    "_id": None,
+                    "n": {"$sum": 1},
+                    "dias": {"$sum": {"$floor": {
+                        "$divide": [{"$subtract": ["$cierre", "$creacion"]}, MS_PER_DAY]
+                    }}},
+                }},
+            ],
+        }},
+    ]
+
+
+def _as_dict(buckets: list) -> dict:
+    return {b["_id"]: b["n"] for b in buckets}
+
+
+async def aggregate_raw(db, query: dict) -> dict:
+    """Recompute the raw counters for claims matching `query`."""
+    result = await db.reclamos.aggregate(stats_pipeline(query)).to_list(1)
+    facets = result[0]
+    resolucion = facets["resolucion"][0] if facets["resolucion"] else {"n": 0, "dias": 0}
+    return {
+        "total": facets["total"][0]["n"] if facets["total"] else 0,
+        "por_linea": _as_dict(facets["por_linea"]),
+        "por_categoria": _as_dict(facets["por_categoria"]),
+        "por_estado": _as_dict(facets["por_estado"]),
+        "por_mes": _as_dict(facets["por_mes"]),
+        "resueltos": resolucion["n"],
+        "dias_resolucion": int(resolucion["dias"]),
+    }
+
+
+async def _expected_rollups(db) -> Dict[str, dict]:
+    expected = {GLOBAL_ID: await aggregate_raw(db, {})}
+    scopes = db.reclamos.aggregate([
+        {"$match": {"creator_id": {"$ne": None}}},
+        {"$group": {"_id": {"creator_id": "$creator_id", "linea": "$linea"}}},
+    ])
+    async for scope in scopes:
+        creator_id, linea = scope["_id"]["creator_id"], scope["_id"]["linea"]
+        expected[scope_id(creator_id, linea)] = await aggregate_raw(db, {"creator_id": creator_id, "linea": linea})
+    return expected
+
+
+async def verify_stats(db) -> Dict[str, dict]:
+    """Return {rollup id: {"stored": ..., "expected": ...}} for every drifted rollup."""
+    expected = await _expected_rollups(db)
+    stored = {doc["_id"]: _from_doc(doc) async for doc in db.estadisticas.find({})}
+    empty = _from_doc(None)
+    drift = {}
+    for rollup_id in set(expected) | set(stored):
+        want = expected.get(rollup_id, empty)
+        have = stored.get(rollup_id, empty)
+        if want != have:
+            drift[rollup_id] = {"stored": have, "expected": want}
+    return drift
+
+
+async def rebuild_stats(db) -> int:
+    """Replace every rollup with values recomputed from the claims.
+
+    Writes that land while the rebuild runs may be counted twice or not at
+    all; run verify_stats afterwards or rebuild during a quiet period.
+    """
+    expected = await _expected_rollups(db)
+    ops = []
+    for rollup_id, raw in expected.items():
+        doc = {
+            "total": raw["total"],
+            "resueltos": raw["resueltos"],
+            "dias_resolucion": raw["dias_resolucion"],
+            **{c: {_key(k): v for k, v in raw[c].items()} for c in COUNTERS},
+        }
+        if rollup_id != GLOBAL_ID:
+            _, creator_id, linea = rollup_id.split(":", 2)
+            doc.update(creator_id=creator_id, linea=linea)
+        ops.append(ReplaceOne({"_id": rollup_id}, doc, upsert=True))
+    await db.estadisticas.bulk_write(ops, ordered=False)
+    await db.estadisticas.delete_many({"_id": {"$nin": list(expected)}})
+    return len(ops)
+
+
+async def ensure_stats(db) -> bool:
+    """Build the rollups on first start after deploying them. Returns True if it did."""
+    if await db.estadisticas.find_one({"_id": GLOBAL_ID}, {"_id": 1}):
+        return False
+    await rebuild_stats(db)
+    return True
@@ -0,0 +1,138 @@
+"""
+Stateless authentication (AUTH_MODE=stateless).
+
+Access tokens are short-lived and carry everything get_current_user needs:
+sub, username, role, linea and the user's token version (ver). They are
+checked against an in-process table of revocations, so authenticating a
+request reads nothing from MongoDB.
+
+Changing a user's role, line or password, or deleting the user, increments
+users.token_version. It also records {_id: user id, version, expires_at} in
+`token_revocations`. Access tokens with an older ver are rejected from then
+on. A revocation is only needed until the access tokens it revokes have
+expired, so a TTL index removes it after one access-token lifetime. The
+table is therefore small: only users changed in the last few minutes.
+Every worker reloads the collection every AUTH_REVOCATION_REFRESH_SECONDS.
+Other processes may accept a revoked token for up to that long; the
+process that made the change rejects it immediately.
+
+Refresh tokens live longer and carry only sub and a fingerprint of the
+password hash. /api/auth/refresh reads the user once and issues a new pair
+with current claims. A password change invalidates every refresh token,
+and deleting the user makes refreshing fail.
+
+Stream tokens (typ "stream", in both auth modes) only open
+/api/notifications/stream. EventSource cannot send headers, so they travel
+in the query string; they live for a few minutes and are rejected
+everywhere else, so one copied from a log is of little use.
+"""
+
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+ACCESS, REFRESH, STREAM = "access", "refresh", "stream"
+# Minimum version of a deleted user: no token is ever accepted again
+DELETED = 2 ** 62
+
+
+def password_fingerprint(password_hash: str) -> str:
+    return hashlib.sha256(password_hash.encode()).hexdigest()[:16]
+
+
+def access_claims(user: dict) -> dict:
+    return {
+        "sub": user["id"],
+        "typ": ACCESS,
+        "username": user["username"],
+        "role": user["role"],
+        "linea": user.get("linea_asignada"),
+        "ver": user.get("token_version", 0),
+    }
+
+
+def refresh_claims(user: dict) -> dict:
+    return {"sub": user["id"], "typ": REFRESH, "pwd": password_fingerprint(user["password_hash"])}
+
+
+def stream_claims(user: dict) -> dict:
+    return {"sub": user["id"], "typ": STREAM}
+
+
+def user_from_claims(payload: dict) -> dict:
+    """The current_user dict handlers get, rebuilt from an access token."""
+    return {
+        "id": payload["sub"],
+        "username": payload["username"],
+        "role": payload["role"],
+        "linea_asignada": payload.get("linea"),
+    }
+
+
+class TokenVersions:
+    """user id -> lowest access-token version still accepted."""
+
+    def __init__(self, access_ttl: timedelta, refresh_interval: float = 10):
+        self.access_ttl = access_ttl
+        self.refresh_interval = refresh_interval
+        self._minimum: Dict[str, int] = {}
+        # Revocations made here that load() has not seen in the collection yet
+        self._recent: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.rejected = 0
+
+    def __len__(self) -> int:
+        return len(self._minimum)
+
+    def accepts(self, user_id: str, version: int) -> bool:
+        if version >= self._minimum.get(user_id, 0):
+            return True
+        self.rejected += 1
+        return False
+
+    async def revoke(self, db, user_id: str, version: Optional[int]):
+        """Reject access tokens of `user_id` older than `version` (None: all of them)."""
+        version = DELETED if version is None else version
+        self._minimum[user_id] = max(self._minimum.get(user_id, 0), version)
+        self._recent[user_id] = self._minimum[user_id]
+        await db.token_revocations.update_one(
+            {"_id": user_id},
+            {"$max": {"version": version}, "$set": {"expires_at": datetime.now(timezone.utc) + self.access_ttl}},
+            upsert=True,
+        )
+
+    async def load(self, db):
+        now = datetime.now(timezone.utc)
+        # The TTL monitor runs once a minute; skip what it has not removed yet
+        docs = await db.token_revocations.find({"expires_at": {"$gt": now}}).to_list(None)
+        stored = {doc["_id"]: doc["version"] for doc in docs}
+        minimum = dict(stored)
+        # Revocations made here, including during the scan, whose write the
+        # scan did not see yet. Keep them until a later scan does.
+        recent, self._recent = self._recent, {}
+        for user_id, version in recent.items():
+            if version > stored.get(user_id, 0):
+                minimum[user_id] = version
+                self._recent[user_id] = version
+        self._minimum = minimum
+
+    def start(self, db):
+        if self._task is None:
+            self._task = asyncio.create_task(self._reload(db))
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _reload(self, db):
+        while True:
+            try:
+                await self.load(db)
+            except Exception:
+                logger.exception("Could not reload token revocations")
+            await asyncio.sleep(self.refresh_interval)
@@ -2,6 +2,7 @@ import { useState } from 'react';
 import { X, Lock, Eye, EyeOff } from 'lucide-react';
 import axios from 'axios';
 import { toast } from 'sonner';
+import { useAuth } from '@/context/AuthContext';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
@@ -16,6 +17,7 @@ const CambiarPasswordModal = ({ isOpen, onClose, getAuthHeaders }) => {
   const [showCurrentPassword, setShowCurrentPassword] = useState(false);
   const [showNewPassword, setShowNewPassword] = useState(false);
   const [showConfirmPassword, setShowConfirmPassword] = useState(false);
+  const { updateTokens } = useAuth();
 
   const handleSubmit = async (e) => {
     e.preventDefault();
@@ -38,7 +40,7 @@ const CambiarPasswordModal = ({ isOpen, onClose, getAuthHeaders }) => {
 
     setLoading(true);
     try {
-      await axios.patch(
+      const response = await axios.patch(
         `${API}/users/me/password`,
         {
           current_password: formData.current_password,
@@ -49,6 +51,12 @@ const CambiarPasswordModal = ({ isOpen, onClose, getAuthHeaders }) => {
         }
       );
 
+      // Con AUTH_MODE=stateless el cambio cierra las demás sesiones y
+      // devuelve tokens nuevos para esta
+      if (response.data.access_token) {
+        updateTokens(response.data);
+      }
+
       toast.success('Contraseña cambiada exitosamente');
       setFormData({ current_password: '', new_password: '', confirm_password: '' });
       onClose();
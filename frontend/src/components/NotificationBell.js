@@ -9,21 +9,69 @@ const API = `${BACKEND_URL}/api`;
 
 const NotificationBell = () => {
   const navigate = useNavigate();
-  const { getAuthHeaders } = useAuth();
+  const { getAuthHeaders, token } = useAuth();
   const [notifications, setNotifications] = useState([]);
   const [unreadCount, setUnreadCount] = useState(0);
   const [showDropdown, setShowDropdown] = useState(false);
 
   useEffect(() => {
+    if (!token) return;
     loadNotifications();
-    loadUnreadCount();
-    
-    const interval = setInterval(() => {
-      loadUnreadCount();
-    }, 30000); // Check every 30 seconds
 
-    return () => clearInterval(interval);
-  }, []);
+    // El servidor envía las notificaciones nuevas; EventSource se reconecta solo
+    // y reenvía Last-Event-ID para recibir lo que se perdió. EventSource no
+    // admite cabeceras, así que usa un token de corta duración en la URL
+    let source = null;
+    let lastEventId = null;
+    let closed = false;
+    let retry = null;
+
+    const reconnect = () => {
+      if (!closed) retry = setTimeout(connect, 5000);
+    };
+
+    const connect = async () => {
+      try {
+        const response = await axios.post(`${API}/notifications/stream-token`, {}, {
+          headers: getAuthHeaders()
+        });
+        if (closed) return;
+        const params = new URLSearchParams({ token: response.data.token });
+        if (lastEventId) params.set('last_event_id', lastEventId);
+        source = new EventSource(`${API}/notifications/stream?${params}`);
+      } catch (error) {
+        console.error('Error opening notification stream:', error);
+        reconnect();
+        return;
+      }
+
+      source.addEventListener('notification', (event) => {
+        lastEventId = event.lastEventId;
+        const notification = JSON.parse(event.data);
+        setNotifications((prev) => [notification, ...prev].slice(0, 5));
+        setUnreadCount((prev) => prev + 1);
+      });
+
+      // Estado completo cuando no se pudo reenviar lo perdido
+      source.addEventListener('sync', (event) => {
+        setUnreadCount(JSON.parse(event.data).count);
+        loadNotifications();
+      });
+
+      // Si el token caducó la reconexión falla y EventSource se cierra: pedir otro
+      source.onerror = () => {
+        if (source.readyState === EventSource.CLOSED) reconnect();
+      };
+    };
+
+    connect();
+
+    return () => {
+      closed = true;
+      clearTimeout(retry);
+      if (source) source.close();
+    };
+  }, [token]);
 
   const loadNotifications = async () => {
     try {
@@ -36,31 +84,21 @@ const NotificationBell = () => {
     }
   };
 
-  const loadUnreadCount = async () => {
-    try {
-      const response = await axios.get(`${API}/notifications/unread/count`, {
-        headers: getAuthHeaders()
-      });
-      setUnreadCount(response.data.count);
-    } catch (error) {
-      console.error('Error loading unread count:', error);
-    }
-  };
-
-  const markAsRead = async (notificationId) => {
+  // El contador viene del stream (notification y sync); leer solo lo descuenta
+  const markAsRead = async (notification) => {
     try {
-      await axios.patch(`${API}/notifications/${notificationId}/read`, {}, {
+      await axios.patch(`${API}/notifications/${notification.id}/read`, {}, {
         headers: getAuthHeaders()
       });
+      if (!notification.is_read) setUnreadCount((prev) => Math.max(prev - 1, 0));
       loadNotifications();
-      loadUnreadCount();
     } catch (error) {
       console.error('Error marking notification as read:', error);
     }
   };
 
   const handleNotificationClick = (notification) => {
-    markAsRead(notification.id);
+    markAsRead(notification);
     navigate(`/reclamo/${notification.reclamo_id}`);
     setShowDropdown(false);
   };
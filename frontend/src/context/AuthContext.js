@@ -1,4 +1,4 @@
-import { createContext, useState, useContext, useEffect } from 'react';
+import { createContext, useState, useContext, useEffect, useRef } from 'react';
 import axios from 'axios';
 
 const AuthContext = createContext(null);
@@ -6,10 +6,63 @@ const AuthContext = createContext(null);
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+// Guarda los tokens de una respuesta de login. refresh_token solo llega
+// con AUTH_MODE=stateless en el backend.
+export const storeTokens = ({ access_token, refresh_token }) => {
+  localStorage.setItem('token', access_token);
+  if (refresh_token) {
+    localStorage.setItem('refreshToken', refresh_token);
+  }
+};
+
 export const AuthProvider = ({ children }) => {
   const [user, setUser] = useState(null);
   const [loading, setLoading] = useState(true);
   const [token, setToken] = useState(localStorage.getItem('token'));
+  const refreshing = useRef(null);
+
+  // Con tokens de corta duración: ante un 401, renovar una sola vez (aunque
+  // fallen varias peticiones a la vez) y repetir la petición original
+  useEffect(() => {
+    const interceptor = axios.interceptors.response.use(
+      (response) => response,
+      async (error) => {
+        const original = error.config;
+        const refreshToken = localStorage.getItem('refreshToken');
+        if (
+          error.response?.status !== 401 ||
+          !refreshToken ||
+          !original ||
+          original._retry ||
+          [`${API}/auth/login`, `${API}/auth/refresh`].includes(original.url)
+        ) {
+          return Promise.reject(error);
+        }
+        original._retry = true;
+        try {
+          if (!refreshing.current) {
+            refreshing.current = axios
+              .post(`${API}/auth/refresh`, { refresh_token: refreshToken })
+              .then((response) => {
+                storeTokens(response.data);
+                setToken(response.data.access_token);
+                return response.data.access_token;
+              })
+              .finally(() => {
+                refreshing.current = null;
+              });
+          }
+          const newToken = await refreshing.current;
+          original.headers = { ...original.headers, Authorization: `Bearer ${newToken}` };
+          return axios(original);
+        } catch (refreshError) {
+          logout();
+          return Promise.reject(error);
+        }
+      }
+    );
+    return () => axios.interceptors.response.eject(interceptor);
+  }, []);
 
   useEffect(() => {
     if (token) {
@@ -36,7 +89,7 @@ export const AuthProvider = ({ children }) => {
   const login = async (username, password) => {
     const response = await axios.post(`${API}/auth/login`, { username, password });
     const { access_token, user: userData } = response.data;
-    localStorage.setItem('token', access_token);
+    storeTokens(response.data);
     setToken(access_token);
     setUser(userData);
     return userData;
@@ -45,14 +98,20 @@ export const AuthProvider = ({ children }) => {
   const register = async (username, email, password) => {
     const response = await axios.post(`${API}/auth/register`, { username, email, password });
     const { access_token, user: userData } = response.data;
-    localStorage.setItem('token', access_token);
+    storeTokens(response.data);
     setToken(access_token);
     setUser(userData);
     return userData;
   };
 
+  const updateTokens = (data) => {
+    storeTokens(data);
+    setToken(data.access_token);
+  };
+
   const logout = () => {
     localStorage.removeItem('token');
+    localStorage.removeItem('refreshToken');
     setToken(null);
     setUser(null);
   };
@@ -62,7 +121,7 @@ export const AuthProvider = ({ children }) => {
   };
 
   return (
-    <AuthContext.Provider value={{ user, loading, login, register, logout, getAuthHeaders, isAuthenticated: !!user }}>
+    <AuthContext.Provider value={{ user, token, loading, login, register, logout, updateTokens, getAuthHeaders, isAuthenticated: !!user }}>
       {children}
     </AuthContext.Provider>
   );
@@ -1,8 +1,8 @@
 import { useState, useEffect } from 'react';
 import { useNavigate, useSearchParams } from 'react-router-dom';
 import axios from 'axios';
-import { useAuth } from '@/context/AuthContext';
-import { ArrowLeft, Search, Filter } from 'lucide-react';
+import { useAuth, storeTokens } from '@/context/AuthContext';
+import { ArrowLeft, Search, Filter, Download } from 'lucide-react';
 import { format } from 'date-fns';
 import { es } from 'date-fns/locale';
 
@@ -28,6 +28,10 @@ const Administracion = () => {
   const [searchParams] = useSearchParams();
   const [reclamos, setReclamos] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [cursor, setCursor] = useState(null);
+  const [paginacion, setPaginacion] = useState({ next: null, prev: null });
+  const [facetas, setFacetas] = useState({});
+  const [total, setTotal] = useState(null);
   const [filters, setFilters] = useState({
     linea: searchParams.get('linea') || '',
     categoria: '',
@@ -43,13 +47,13 @@ const Administracion = () => {
     if (isAuthenticated || localStorage.getItem('token')) {
       cargarReclamos();
     }
-  }, [filters, isAuthenticated]);
+  }, [filters, cursor, isAuthenticated]);
 
   const initializePage = async () => {
     if (!isAuthenticated && !localStorage.getItem('token') && !localStorage.getItem('adminInitialized')) {
       try {
         const response = await axios.get(`${API}/admin/access`);
-        localStorage.setItem('token', response.data.access_token);
+        storeTokens(response.data);
         localStorage.setItem('adminInitialized', 'true');
         window.location.reload();
       } catch (error) {
@@ -58,19 +62,29 @@ const Administracion = () => {
     }
   };
 
+  const construirParams = () => {
+    const params = {};
+    if (filters.linea && user?.role === 'ADMIN') params.linea = filters.linea;
+    if (filters.categoria) params.categoria = filters.categoria;
+    if (filters.estado) params.estado = filters.estado;
+    if (filters.search) params.search = filters.search;
+    return params;
+  };
+
   const cargarReclamos = async () => {
     try {
-      const params = {};
-      if (filters.linea && user?.role === 'ADMIN') params.linea = filters.linea;
-      if (filters.categoria) params.categoria = filters.categoria;
-      if (filters.estado) params.estado = filters.estado;
-      if (filters.search) params.search = filters.search;
+      const params = construirParams();
+      if (cursor) params.cursor = cursor;
 
-      const response = await axios.get(`${API}/reclamos`, { 
+      // Resultados y conteos de cada filtro en una sola consulta
+      const response = await axios.get(`${API}/reclamos/search`, { 
         params,
         headers: getAuthHeaders()
       });
-      setReclamos(response.data);
+      setReclamos(response.data.items);
+      setPaginacion({ next: response.data.next_cursor, prev: response.data.prev_cursor });
+      setFacetas(response.data.facetas);
+      setTotal(response.data.total);
     } catch (error) {
       console.error('Error cargando reclamos:', error);
     } finally {
@@ -78,7 +92,32 @@ const Administracion = () => {
     }
   };
 
+  const exportarCSV = async () => {
+    try {
+      const response = await axios.get(`${API}/reclamos/export`, {
+        params: { ...construirParams(), formato: 'csv' },
+        headers: getAuthHeaders(),
+        responseType: 'blob'
+      });
+      const url = URL.createObjectURL(response.data);
+      const link = document.createElement('a');
+      link.href = url;
+      link.download = `reclamos-${format(new Date(), 'yyyyMMdd')}.csv`;
+      link.click();
+      URL.revokeObjectURL(url);
+    } catch (error) {
+      console.error('Error exportando reclamos:', error);
+    }
+  };
+
+  // "Línea A (12)": reclamos que daría la opción con los demás filtros aplicados
+  const conConteo = (faceta, valor, etiqueta) => {
+    const bucket = (facetas[faceta] || []).find((b) => b.valor === valor);
+    return facetas[faceta] ? `${etiqueta} (${bucket ? bucket.total : 0})` : etiqueta;
+  };
+
   const handleFilterChange = (e) => {
+    setCursor(null);
     setFilters({
       ...filters,
       [e.target.name]: e.target.value
@@ -126,6 +165,20 @@ const Administracion = () => {
           <div style={{ display: 'flex', alignItems: 'center', gap: '0.5rem', marginBottom: '1rem' }}>
             <Filter size={20} style={{ color: '#1e3a5f' }} />
             <h3 style={{ fontSize: '1.1rem', fontWeight: '600', color: '#1e3a5f' }}>Filtros</h3>
+            {total !== null && (
+              <span style={{ color: '#64748b', fontSize: '0.9rem' }} data-testid="reclamos-total">
+                {total} reclamos
+              </span>
+            )}
+            <button
+              className="btn-secondary"
+              onClick={exportarCSV}
+              style={{ marginLeft: 'auto' }}
+              data-testid="export-csv-btn"
+            >
+              <Download size={16} style={{display: 'inline', marginRight: '4px'}} />
+              Exportar CSV
+            </button>
           </div>
           <div className="filters-grid">
             <div className="form-group" style={{ marginBottom: 0 }}>
@@ -140,7 +193,9 @@ const Administracion = () => {
               >
                 <option value="">Todas</option>
                 {LINEAS.slice(1).map(linea => (
-                  <option key={linea} value={linea}>{linea === 'Premetro' ? 'Premetro' : `Línea ${linea}`}</option>
+                  <option key={linea} value={linea}>
+                    {conConteo('linea', linea, linea === 'Premetro' ? 'Premetro' : `Línea ${linea}`)}
+                  </option>
                 ))}
               </select>
             </div>
@@ -157,7 +212,7 @@ const Administracion = () => {
               >
                 <option value="">Todas</option>
                 {CATEGORIAS.slice(1).map(cat => (
-                  <option key={cat} value={cat}>{cat}</option>
+                  <option key={cat} value={cat}>{conConteo('categoria', cat, cat)}</option>
                 ))}
               </select>
             </div>
@@ -173,7 +228,7 @@ const Administracion = () => {
                 data-testid="filter-estado"
               >
                 {ESTADOS.map(estado => (
-                  <option key={estado} value={estado}>{estado || 'Todos'}</option>
+                  <option key={estado} value={estado}>{estado ? conConteo('estado', estado, estado) : 'Todos'}</option>
                 ))}
               </select>
             </div>
@@ -240,6 +295,24 @@ const Administracion = () => {
                 ))}
               </tbody>
             </table>
+            <div style={{ display: 'flex', justifyContent: 'flex-end', gap: '0.75rem', marginTop: '1rem' }}>
+              <button
+                className="btn-secondary"
+                onClick={() => setCursor(paginacion.prev)}
+                disabled={!paginacion.prev}
+                data-testid="page-prev-btn"
+              >
+                Anterior
+              </button>
+              <button
+                className="btn-secondary"
+                onClick={() => setCursor(paginacion.next)}
+                disabled={!paginacion.next}
+                data-testid="page-next-btn"
+              >
+                Siguiente
+              </button>
+            </div>
           </div>
         )}
       </div>
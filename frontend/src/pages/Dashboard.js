@@ -1,7 +1,7 @@
 import { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import axios from 'axios';
-import { useAuth } from '@/context/AuthContext';
+import { useAuth, storeTokens } from '@/context/AuthContext';
 import { Train, Plus, BarChart3, ClipboardList, LogOut, Users, Key } from 'lucide-react';
 import NotificationBell from '@/components/NotificationBell';
 import CambiarPasswordModal from '@/components/CambiarPasswordModal';
@@ -22,7 +22,7 @@ const LINEAS = [
 const Dashboard = () => {
   const navigate = useNavigate();
   const { user, logout, getAuthHeaders, isAuthenticated } = useAuth();
-  const [reclamos, setReclamos] = useState([]);
+  const [conteos, setConteos] = useState({ total: {}, resueltos: {} });
   const [loading, setLoading] = useState(true);
   const [isAdmin, setIsAdmin] = useState(false);
   const [showPasswordModal, setShowPasswordModal] = useState(false);
@@ -36,8 +36,7 @@ const Dashboard = () => {
     if (!isAuthenticated && !localStorage.getItem('adminInitialized')) {
       try {
         const response = await axios.get(`${API}/admin/access`);
-        const { access_token, user: adminUser } = response.data;
-        localStorage.setItem('token', access_token);
+        storeTokens(response.data);
         localStorage.setItem('isAdmin', 'true');
         localStorage.setItem('adminInitialized', 'true');
         setIsAdmin(true);
@@ -60,10 +59,16 @@ const Dashboard = () => {
 
   const cargarReclamos = async () => {
     try {
-      const response = await axios.get(`${API}/reclamos`, {
-        headers: getAuthHeaders()
-      });
-      setReclamos(response.data);
+      // Los contadores por línea salen de las facetas de la búsqueda: dos
+      // consultas acotadas en lugar de traer todos los reclamos
+      const porLinea = (data) => Object.fromEntries(
+        (data.facetas.linea || []).map((b) => [b.valor, b.total])
+      );
+      const [todos, resueltos] = await Promise.all([
+        axios.get(`${API}/reclamos/search`, { params: { limit: 1 }, headers: getAuthHeaders() }),
+        axios.get(`${API}/reclamos/search`, { params: { limit: 1, estado: 'Resuelto' }, headers: getAuthHeaders() })
+      ]);
+      setConteos({ total: porLinea(todos.data), resueltos: porLinea(resueltos.data) });
     } catch (error) {
       console.error('Error cargando reclamos:', error);
     } finally {
@@ -79,11 +84,11 @@ const Dashboard = () => {
   };
 
   const contarReclamosPorLinea = (lineaId) => {
-    return reclamos.filter(r => r.linea === lineaId).length;
+    return conteos.total[lineaId] || 0;
   };
 
   const contarPendientesPorLinea = (lineaId) => {
-    return reclamos.filter(r => r.linea === lineaId && r.estado !== 'Resuelto').length;
+    return contarReclamosPorLinea(lineaId) - (conteos.resueltos[lineaId] || 0);
   };
 
   // Filter lineas based on role
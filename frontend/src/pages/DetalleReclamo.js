@@ -18,6 +18,8 @@ const DetalleReclamo = () => {
   const { user, getAuthHeaders } = useAuth();
   const [reclamo, setReclamo] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [comentarios, setComentarios] = useState([]);
+  const [comentariosCursor, setComentariosCursor] = useState(null);
   const [nuevoComentario, setNuevoComentario] = useState('');
   const [autor, setAutor] = useState(user?.username || '');
   const [editando, setEditando] = useState(false);
@@ -30,6 +32,7 @@ const DetalleReclamo = () => {
 
   useEffect(() => {
     cargarReclamo();
+    cargarComentarios();
   }, [id]);
 
   useEffect(() => {
@@ -61,6 +64,21 @@ const DetalleReclamo = () => {
     }
   };
 
+  // Los comentarios se cargan por páginas, del más antiguo al más reciente
+  const cargarComentarios = async (cursor = null) => {
+    try {
+      const params = cursor ? { cursor } : {};
+      const response = await axios.get(`${API}/reclamos/${id}/comentarios`, {
+        params,
+        headers: getAuthHeaders()
+      });
+      setComentarios((prev) => (cursor ? [...prev, ...response.data.items] : response.data.items));
+      setComentariosCursor(response.data.next_cursor);
+    } catch (error) {
+      console.error('Error cargando comentarios:', error);
+    }
+  };
+
   const handleAgregarComentario = async (e) => {
     e.preventDefault();
     if (!nuevoComentario.trim()) {
@@ -78,6 +96,7 @@ const DetalleReclamo = () => {
       setNuevoComentario('');
       toast.success('Comentario agregado');
       cargarReclamo();
+      cargarComentarios();
     } catch (error) {
       console.error('Error agregando comentario:', error);
       toast.error('Error al agregar comentario');
@@ -362,9 +381,9 @@ const DetalleReclamo = () => {
               Comentarios y Seguimiento
             </h3>
 
-            {reclamo.comentarios && reclamo.comentarios.length > 0 && (
+            {comentarios.length > 0 && (
               <div style={{ marginBottom: '2rem' }}>
-                {reclamo.comentarios.map((comentario) => (
+                {comentarios.map((comentario) => (
                   <div key={comentario.id} className="comentario-item" data-testid={`comentario-${comentario.id}`}>
                     <div className="comentario-header">
                       <span className="comentario-author">{comentario.author}</span>
@@ -373,6 +392,16 @@ const DetalleReclamo = () => {
                     <div className="comentario-text">{comentario.text}</div>
                   </div>
                 ))}
+                {comentariosCursor && (
+                  <button
+                    type="button"
+                    className="btn-secondary"
+                    onClick={() => cargarComentarios(comentariosCursor)}
+                    data-testid="cargar-mas-comentarios-btn"
+                  >
+                    Ver más comentarios ({comentarios.length} de {reclamo.comment_count})
+                  </button>
+                )}
               </div>
             )}
 
@@ -1,7 +1,7 @@
 import { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import axios from 'axios';
-import { useAuth } from '@/context/AuthContext';
+import { useAuth, storeTokens } from '@/context/AuthContext';
 import { ArrowLeft, TrendingUp, Clock, AlertCircle, CheckCircle } from 'lucide-react';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
@@ -21,7 +21,7 @@ const Estadisticas = () => {
     if (!isAuthenticated && !localStorage.getItem('token') && !localStorage.getItem('adminInitialized')) {
       try {
         const response = await axios.get(`${API}/admin/access`);
-        localStorage.setItem('token', response.data.access_token);
+        storeTokens(response.data);
         localStorage.setItem('adminInitialized', 'true');
         window.location.reload();
       } catch (error) {
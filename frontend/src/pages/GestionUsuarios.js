@@ -1,7 +1,7 @@
 import { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import axios from 'axios';
-import { useAuth } from '@/context/AuthContext';
+import { useAuth, storeTokens } from '@/context/AuthContext';
 import { ArrowLeft, Users, Check, Trash2, Link as LinkIcon } from 'lucide-react';
 import GenerarInvitacionModal from '@/components/GenerarInvitacionModal';
 import { toast } from 'sonner';
@@ -35,7 +35,7 @@ const GestionUsuarios = () => {
     if (!isAuthenticated && !localStorage.getItem('token') && !localStorage.getItem('adminInitialized')) {
       try {
         const response = await axios.get(`${API}/admin/access`);
-        localStorage.setItem('token', response.data.access_token);
+        storeTokens(response.data);
         localStorage.setItem('adminInitialized', 'true');
         window.location.reload();
       } catch (error) {
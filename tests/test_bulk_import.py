@@ -0,0 +1,57 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pydantic")
+pytest.importorskip("pymongo")
+
+from bulk_import import Report, _not_registered, _unique_in_file  # noqa: E402
+
+
+def _rows(*pairs):
+    return [(fila, SimpleNamespace(username=username, email=email)) for fila, (username, email) in enumerate(pairs, 1)]
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length):
+        return self.docs
+
+
+class FakeUsers:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection):
+        usernames = set(query["$or"][0]["username"]["$in"])
+        emails = set(query["$or"][1]["email"]["$in"])
+        return FakeCursor([d for d in self.docs if d["username"] in usernames or d["email"] in emails])
+
+
+def test_in_file_and_database_checks_compare_emails_the_same_way():
+    rows = _rows(("ana", "ana@example.com"), ("ANA2", "Ana@example.com"), ("luis", "luis@example.com"))
+    db = SimpleNamespace(users=FakeUsers([{"username": "otro", "email": "Luis@example.com"}]))
+    report = Report(len(rows))
+
+    kept = asyncio.run(_not_registered(db, _unique_in_file(rows, report), report))
+
+    # Neither check folds case, like the email_unique index
+    assert [fila for fila, _ in kept] == [1, 2, 3]
+    assert report.as_dict()["errores"] == []
+
+
+def test_exact_duplicates_are_reported_in_both_checks():
+    rows = _rows(("ana", "ana@example.com"), ("ana", "otra@example.com"), ("luis", "luis@example.com"))
+    db = SimpleNamespace(users=FakeUsers([{"username": "x", "email": "luis@example.com"}]))
+    report = Report(len(rows))
+
+    kept = asyncio.run(_not_registered(db, _unique_in_file(rows, report), report))
+
+    assert [fila for fila, _ in kept] == [1]
+    assert report.as_dict()["errores"] == [
+        {"fila": 2, "errores": ["username: duplicates row 1"]},
+        {"fila": 3, "errores": ["email: already registered"]},
+    ]
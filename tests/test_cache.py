@@ -0,0 +1,82 @@
+import cache
+from cache import TTLCache, list_cache_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(monkeypatch, maxsize=3, ttl=10):
+    clock = FakeClock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    return TTLCache(maxsize=maxsize, ttl=ttl), clock
+
+
+def test_get_returns_stored_value_until_ttl(monkeypatch):
+    c, clock = make_cache(monkeypatch)
+    c.set("u1", {"id": "u1"})
+    clock.now += 9.9
+    assert c.get("u1") == {"id": "u1"}
+    clock.now += 0.1
+    assert c.get("u1") is None
+    assert len(c) == 0
+    assert (c.hits, c.misses) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted(monkeypatch):
+    c, _ = make_cache(monkeypatch, maxsize=2)
+    c.set("a", 1)
+    c.set("b", 2)
+    c.get("a")  # "b" is now the least recently used
+    c.set("c", 3)
+    assert c.get("b") is None
+    assert c.get("a") == 1 and c.get("c") == 3
+    assert c.evictions == 1
+
+
+def test_zero_ttl_disables_the_cache(monkeypatch):
+    c, _ = make_cache(monkeypatch, ttl=0)
+    c.set("a", 1)
+    assert not c.enabled
+    assert c.get("a") is None
+    assert len(c) == 0
+
+
+def test_pop_and_stats(monkeypatch):
+    c, _ = make_cache(monkeypatch)
+    c.set("a", 1)
+    c.pop("a")
+    c.pop("missing")
+    assert c.get("a") is None
+    stats = c.stats()
+    assert stats["size"] == 0 and stats["misses"] == 1 and stats["hit_rate"] == 0
+
+
+ADMIN = {"id": "a1", "role": "ADMIN"}
+OTRO_ADMIN = {"id": "a2", "role": "ADMIN"}
+EMISOR = {"id": "e1", "role": "EMISOR_RECLAMO"}
+
+
+def test_list_cache_key_is_shared_by_admins_but_not_emisores():
+    query = {"linea": "B"}
+    key = list_cache_key("k", 1, ADMIN, query, None, None, 50)
+    assert key == list_cache_key("k", 1, OTRO_ADMIN, query, None, None, 50)
+    assert key != list_cache_key("k", 1, EMISOR, query, None, None, 50)
+
+
+def test_list_cache_key_changes_with_generation_kind_and_page():
+    key = list_cache_key("k", 1, ADMIN, {}, None, None, 50)
+    assert key != list_cache_key("k", 2, ADMIN, {}, None, None, 50)
+    assert key != list_cache_key("facetas", 1, ADMIN, {}, None, None, 50)
+    assert key != list_cache_key("k", 1, ADMIN, {}, None, "abc", 50)
+    assert key != list_cache_key("k", 1, ADMIN, {}, None, None, 20)
+
+
+def test_list_cache_key_ignores_filter_order_and_blank_search():
+    assert list_cache_key("k", 1, ADMIN, {"linea": "B", "estado": "Pendiente"}, " frenos ", None, 50) == \
+        list_cache_key("k", 1, ADMIN, {"estado": "Pendiente", "linea": "B"}, "frenos", None, 50)
+    assert list_cache_key("k", 1, ADMIN, {}, "  ", None, 50) == list_cache_key("k", 1, ADMIN, {}, None, None, 50)
@@ -0,0 +1,50 @@
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from export import _csv_value, _is_formula, purge_exports
+
+
+@pytest.mark.parametrize("value", ["=HYPERLINK(\"http://x\")", "+54 11", "-1", "@SUM(A1)", "\tx"])
+def test_formula_like_text_is_escaped_in_csv(value):
+    assert _is_formula(value)
+    assert _csv_value(value) == "'" + value
+
+
+def test_plain_values_are_written_as_is():
+    assert _csv_value("Andén 3") == "Andén 3"
+    assert _csv_value(7) == 7
+    assert _csv_value(None) == ""
+    assert _csv_value(datetime(2025, 3, 10, tzinfo=timezone.utc)) == "2025-03-10T00:00:00+00:00"
+
+
+class FakeExportaciones:
+    def __init__(self):
+        self.deleted = None
+
+    async def delete_many(self, query):
+        self.deleted = query
+
+
+class FakeDb:
+    def __init__(self):
+        self.exportaciones = FakeExportaciones()
+
+
+def test_purge_exports_removes_old_files_and_jobs(tmp_path):
+    old = tmp_path / "old.xlsx"
+    new = tmp_path / "new.xlsx"
+    old.write_bytes(b"x")
+    new.write_bytes(b"x")
+    two_days_ago = (datetime.now(timezone.utc) - timedelta(days=2)).timestamp()
+    os.utime(old, (two_days_ago, two_days_ago))
+    db = FakeDb()
+
+    assert asyncio.run(purge_exports(db, tmp_path, timedelta(hours=24))) == 1
+
+    assert not old.exists()
+    assert new.exists()
+    cutoff = db.exportaciones.deleted["created_at"]["$lt"]
+    assert timedelta(hours=23) < datetime.now(timezone.utc) - cutoff <= timedelta(hours=24, seconds=5)
@@ -0,0 +1,89 @@
+import asyncio
+
+from facets import FACETS, facet_pipeline, fetch_facet_counts
+
+
+def _stages(pipeline):
+    match, project, facet = pipeline
+    return match["$match"], project["$project"], facet["$facet"]
+
+
+def test_counts_only_see_facet_fields():
+    _, project, facets = _stages(facet_pipeline({}, {}))
+    assert project == {"_id": 0, "linea": 1, "categoria": 1, "estado": 1, "responsable": 1}
+    assert set(facets) == {"total", *FACETS}
+
+
+def test_scope_and_search_go_in_the_leading_match():
+    base = {"creator_id": "e1", "linea": "B", "$text": {"$search": "frenos"}}
+    match, _, facets = _stages(facet_pipeline(base, {}))
+    assert match == base
+    assert facets["total"] == [{"$count": "n"}]
+
+
+def test_single_filter_applies_to_every_branch_but_its_own():
+    match, _, facets = _stages(facet_pipeline({}, {"estado": "Pendiente"}))
+    # The estado branch counts every claim, so nothing can be left out up front
+    assert match == {}
+    assert facets["total"][0] == {"$match": {"estado": "Pendiente"}}
+    assert facets["linea"][0] == {"$match": {"estado": "Pendiente"}}
+    assert facets["estado"][0] == {"$group": {"_id": "$estado", "total": {"$sum": 1}}}
+
+
+def test_several_filters_narrow_the_leading_match():
+    filters = {"linea": "B", "estado": "Pendiente", "categoria": "Higiene"}
+    match, _, facets = _stages(facet_pipeline({}, filters))
+    assert match == {"$or": [
+        {"estado": "Pendiente", "categoria": "Higiene"},
+        {"linea": "B", "categoria": "Higiene"},
+        {"linea": "B", "estado": "Pendiente"},
+    ]}
+    assert facets["linea"][0] == {"$match": {"estado": "Pendiente", "categoria": "Higiene"}}
+    assert facets["responsable"][0] == {"$match": filters}
+
+
+def test_non_facet_filters_are_applied_once_up_front():
+    match, _, facets = _stages(facet_pipeline({}, {"creator_id": "e1", "estado": "Pendiente"}))
+    assert match == {"creator_id": "e1"}
+    assert facets["total"][0] == {"$match": {"estado": "Pendiente"}}
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length):
+        return self.docs
+
+
+class FakeCollection:
+    def __init__(self, result):
+        self.result = result
+        self.pipeline = None
+
+    def aggregate(self, pipeline):
+        self.pipeline = pipeline
+        return FakeCursor([self.result])
+
+
+def test_fetch_facet_counts_shapes_the_buckets():
+    collection = FakeCollection({
+        "total": [{"n": 3}],
+        "linea": [{"_id": "B", "total": 2}, {"_id": "A", "total": 1}],
+        "categoria": [],
+        "estado": [{"_id": "Pendiente", "total": 3}],
+        "responsable": [{"_id": None, "total": 3}],
+    })
+
+    counts = asyncio.run(fetch_facet_counts(collection, {}, {"estado": "Pendiente"}))
+
+    assert counts["total"] == 3
+    assert counts["facetas"]["linea"] == [{"valor": "B", "total": 2}, {"valor": "A", "total": 1}]
+    assert counts["facetas"]["categoria"] == []
+    assert counts["facetas"]["responsable"] == [{"valor": None, "total": 3}]
+
+
+def test_fetch_facet_counts_without_matches():
+    empty = {"total": [], **{field: [] for field in FACETS}}
+    counts = asyncio.run(fetch_facet_counts(FakeCollection(empty), {}, {}))
+    assert counts == {"total": 0, "facetas": {field: [] for field in FACETS}}
@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("pymongo")
+
+from indexes import drop_retired_indexes  # noqa: E402
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length):
+        return list(self.docs)
+
+
+class FakeCollection:
+    def __init__(self, indexes):
+        self.indexes = indexes
+
+    def list_indexes(self):
+        return FakeCursor(self.indexes)
+
+    async def drop_index(self, name):
+        self.indexes = [info for info in self.indexes if info["name"] != name]
+
+
+def test_drop_retired_indexes_keeps_current_declarations():
+    reclamos = FakeCollection([
+        {"name": "_id_", "key": {"_id": 1}},
+        {"name": "linea_fecha", "key": {"linea": 1, "fecha_creacion": -1, "id": -1}},
+        # the old two-key estado_fecha, which kept its name when (id) was added
+        {"name": "estado_fecha", "key": {"estado": 1, "fecha_creacion": -1}},
+        {"name": "numero_busqueda", "key": {"numero_busqueda": 1}},
+    ])
+    db = {"reclamos": reclamos}
+
+    dropped = asyncio.run(drop_retired_indexes(db))
+
+    assert dropped == ["reclamos.linea_fecha", "reclamos.estado_fecha"]
+    assert [info["name"] for info in reclamos.indexes] == ["_id_", "numero_busqueda"]
+
+
+def test_drop_retired_indexes_leaves_redeclared_spec_alone():
+    reclamos = FakeCollection([
+        {"name": "estado_fecha", "key": {"estado": 1, "fecha_creacion": -1, "id": -1}},
+    ])
+
+    assert asyncio.run(drop_retired_indexes({"reclamos": reclamos})) == []
+    assert len(reclamos.indexes) == 1
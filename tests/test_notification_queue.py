@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("pymongo")
+
+from pymongo.errors import BulkWriteError  # noqa: E402
+
+from notification_queue import DUPLICATE_KEY, NotificationQueue  # noqa: E402
+
+
+class FakeCollection:
+    def __init__(self, write_errors):
+        self.write_errors = write_errors
+
+    async def insert_many(self, docs, ordered):
+        raise BulkWriteError({
+            "nInserted": len(docs) - len(self.write_errors),
+            "writeErrors": self.write_errors,
+        })
+
+
+def _flush(queue, docs):
+    asyncio.run(queue._flush([(doc, 0.0) for doc in docs]))
+
+
+def test_partial_failure_publishes_what_was_inserted():
+    published = []
+    queue = NotificationQueue(
+        FakeCollection([{"index": 1, "code": 121, "errmsg": "Document failed validation"}]),
+        on_persisted=published.extend,
+    )
+
+    _flush(queue, [{"id": "a"}, {"id": "b"}, {"id": "c"}])
+
+    assert [doc["id"] for doc in published] == ["a", "c"]
+    assert queue.persisted == 2
+    assert queue.failed == 1
+
+
+def test_duplicates_from_a_retried_write_count_as_persisted():
+    published = []
+    queue = NotificationQueue(
+        FakeCollection([{"index": 0, "code": DUPLICATE_KEY, "errmsg": "E11000"}]),
+        on_persisted=published.extend,
+    )
+
+    _flush(queue, [{"id": "a"}, {"id": "b"}])
+
+    assert [doc["id"] for doc in published] == ["a", "b"]
+    assert queue.failed == 0
@@ -0,0 +1,73 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from pagination import (
+    NEXT,
+    PREV,
+    _keyset_filter,
+    _pack,
+    decode_cursor,
+    decode_offset_cursor,
+    encode_cursor,
+    encode_offset_cursor,
+)
+
+
+def test_cursor_round_trip_datetime():
+    fecha = datetime(2025, 3, 1, 12, 30, tzinfo=timezone.utc)
+    cursor = encode_cursor({"id": "abc", "fecha_creacion": fecha}, NEXT)
+    assert decode_cursor(cursor) == (NEXT, fecha, "abc")
+
+
+def test_cursor_round_trip_plain_value():
+    cursor = encode_cursor({"id": "abc", "numero": "A-001"}, PREV, sort_field="numero")
+    assert decode_cursor(cursor) == (PREV, "A-001", "abc")
+
+
+def test_cursor_is_url_safe():
+    cursor = encode_cursor({"id": "a/b+c", "fecha_creacion": datetime.now(timezone.utc)}, NEXT)
+    assert "=" not in cursor and "/" not in cursor and "+" not in cursor
+
+
+@pytest.mark.parametrize("cursor", ["", "not base64!", "bnVsbA", encode_offset_cursor(3)])
+def test_decode_cursor_rejects_garbage(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_keyset_filter_breaks_ties_on_id():
+    fecha = datetime(2025, 3, 1, tzinfo=timezone.utc)
+    clauses = _keyset_filter("fecha_creacion", "$gt", fecha, "abc")["$or"]
+    assert clauses == [
+        {"fecha_creacion": {"$gt": fecha}},
+        {"fecha_creacion": fecha, "id": {"$gt": "abc"}},
+    ]
+
+
+def test_keyset_filter_past_dates_reaches_legacy_strings():
+    # Descending walk from a date: every ISO string sorts after it
+    fecha = datetime(2025, 3, 1, tzinfo=timezone.utc)
+    clauses = _keyset_filter("fecha_creacion", "$lt", fecha, "abc")["$or"]
+    assert {"fecha_creacion": {"$type": "string"}} in clauses
+
+
+def test_keyset_filter_back_from_legacy_strings_reaches_dates():
+    clauses = _keyset_filter("fecha_creacion", "$gt", "2024-01-01T00:00:00+00:00", "abc")["$or"]
+    assert {"fecha_creacion": {"$type": "date"}} in clauses
+    assert {"fecha_creacion": {"$type": "string"}} not in clauses
+
+
+def test_keyset_filter_within_legacy_strings_stays_on_strings():
+    clauses = _keyset_filter("fecha_creacion", "$lt", "2024-01-01T00:00:00+00:00", "abc")["$or"]
+    assert all("$type" not in str(clause) for clause in clauses)
+
+
+def test_offset_cursor_round_trip():
+    assert decode_offset_cursor(encode_offset_cursor(150)) == 150
+
+
+@pytest.mark.parametrize("payload", [-1, "3", None])
+def test_offset_cursor_rejects_bad_offsets(payload):
+    with pytest.raises(ValueError):
+        decode_offset_cursor(_pack({"o": payload}))
@@ -0,0 +1,31 @@
+import re
+
+from search import build_search_filter, fold, numero_busqueda
+
+
+def test_fold_strips_accents_and_lowercases():
+    assert fold("Línea Ñandú") == "linea nandu"
+
+
+def test_numero_busqueda_matches_folded_user_input():
+    assert numero_busqueda("LíneaB-SEG-0042") == "lineab-seg-0042"
+
+
+def test_claim_number_becomes_anchored_prefix():
+    query, ranked = build_search_filter("  Línea B-SEG ")
+    assert not ranked
+    pattern = query["numero_busqueda"]["$regex"]
+    assert pattern.startswith("^")
+    assert re.match(pattern, numero_busqueda("LineaB-SEG-0042"))
+
+
+def test_prefix_is_escaped():
+    query, _ = build_search_filter("lineaA.*")
+    assert query["numero_busqueda"]["$regex"] == "^" + re.escape("lineaa.*")
+
+
+def test_free_text_uses_spanish_text_index():
+    assert build_search_filter(" frenos cabina ") == (
+        {"$text": {"$search": "frenos cabina", "$language": "spanish"}},
+        True,
+    )
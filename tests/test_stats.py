@@ -0,0 +1,53 @@
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("pymongo")
+
+from stats import _contribution, _key, _unkey  # noqa: E402
+
+RECLAMO = {
+    "linea": "B",
+    "categoria": "Higiene y salubridad",
+    "estado": "Pendiente",
+    "fecha_creacion": datetime(2025, 3, 10, tzinfo=timezone.utc),
+    "fecha_cierre": None,
+}
+
+
+def test_contribution_counts_each_dimension():
+    assert _contribution(RECLAMO, 1) == {
+        "total": 1,
+        "por_linea.B": 1,
+        "por_categoria.Higiene y salubridad": 1,
+        "por_estado.Pendiente": 1,
+        "por_mes.2025-03": 1,
+    }
+
+
+def test_contribution_of_resolved_claim_adds_resolution_days():
+    resuelto = {**RECLAMO, "estado": "Resuelto", "fecha_cierre": datetime(2025, 3, 14, 9, tzinfo=timezone.utc)}
+    inc = _contribution(resuelto, 1)
+    assert inc["resueltos"] == 1
+    assert inc["dias_resolucion"] == 4
+
+
+def test_contribution_accepts_legacy_string_dates():
+    legacy = {**RECLAMO, "fecha_creacion": "2024-12-31T23:00:00+00:00"}
+    assert "por_mes.2024-12" in _contribution(legacy, 1)
+
+
+def test_update_delta_cancels_unchanged_counters():
+    before = _contribution(RECLAMO, -1)
+    after = _contribution({**RECLAMO, "estado": "En gestión"}, 1)
+    delta = dict(after)
+    for field, value in before.items():
+        delta[field] = delta.get(field, 0) + value
+    assert {k: v for k, v in delta.items() if v} == {"por_estado.Pendiente": -1, "por_estado.En gestión": 1}
+
+
+@pytest.mark.parametrize("value", ["Línea A.1", "$where", "plain"])
+def test_counter_keys_round_trip(value):
+    key = _key(value)
+    assert "." not in key and not key.startswith("$")
+    assert _unkey(key) == value
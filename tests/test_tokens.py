@@ -0,0 +1,133 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from tokens import (
+    ACCESS, DELETED, REFRESH, STREAM, TokenVersions, access_claims, password_fingerprint, refresh_claims,
+    stream_claims, user_from_claims,
+)
+
+USER = {
+    "id": "u1",
+    "username": "ana",
+    "role": "EMISOR_RECLAMO",
+    "linea_asignada": "B",
+    "token_version": 3,
+    "password_hash": "$2b$12$abc",
+}
+
+
+def test_access_claims_round_trip_to_current_user():
+    claims = access_claims(USER)
+    assert claims == {"sub": "u1", "typ": ACCESS, "username": "ana", "role": "EMISOR_RECLAMO", "linea": "B", "ver": 3}
+    assert user_from_claims(claims) == {
+        "id": "u1", "username": "ana", "role": "EMISOR_RECLAMO", "linea_asignada": "B",
+    }
+
+
+def test_access_claims_default_version_is_zero():
+    user = {k: v for k, v in USER.items() if k != "token_version"}
+    assert access_claims(user)["ver"] == 0
+
+
+def test_refresh_claims_change_with_the_password():
+    claims = refresh_claims(USER)
+    assert claims == {"sub": "u1", "typ": REFRESH, "pwd": password_fingerprint(USER["password_hash"])}
+    assert refresh_claims({**USER, "password_hash": "$2b$12$xyz"})["pwd"] != claims["pwd"]
+
+
+def test_stream_claims_carry_only_the_user():
+    assert stream_claims(USER) == {"sub": "u1", "typ": STREAM}
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length):
+        return list(self.docs)
+
+
+class FakeRevocations:
+    def __init__(self):
+        self.docs = {}
+
+    async def update_one(self, query, update, upsert=False):
+        doc = self.docs.setdefault(query["_id"], {"_id": query["_id"], "version": 0})
+        doc["version"] = max(doc["version"], update["$max"]["version"])
+        doc.update(update["$set"])
+
+    def find(self, query):
+        now = query["expires_at"]["$gt"]
+        return FakeCursor([doc for doc in self.docs.values() if doc["expires_at"] > now])
+
+
+class FakeDb:
+    def __init__(self):
+        self.token_revocations = FakeRevocations()
+
+
+def test_revoke_rejects_older_versions_only():
+    versions = TokenVersions(access_ttl=timedelta(minutes=15))
+    db = FakeDb()
+    assert versions.accepts("u1", 0)
+
+    asyncio.run(versions.revoke(db, "u1", 4))
+
+    assert not versions.accepts("u1", 3)
+    assert versions.accepts("u1", 4)
+    assert versions.accepts("u2", 0)
+    assert versions.rejected == 1
+
+
+def test_revoke_without_version_rejects_every_token():
+    versions = TokenVersions(access_ttl=timedelta(minutes=15))
+    asyncio.run(versions.revoke(FakeDb(), "u1", None))
+    assert not versions.accepts("u1", DELETED - 1)
+
+
+def test_load_picks_up_revocations_from_other_processes():
+    db = FakeDb()
+    asyncio.run(TokenVersions(access_ttl=timedelta(minutes=15)).revoke(db, "u1", 2))
+    # Expired, not yet removed by the TTL monitor
+    db.token_revocations.docs["u2"] = {
+        "_id": "u2", "version": 9, "expires_at": datetime.now(timezone.utc) - timedelta(seconds=1),
+    }
+    versions = TokenVersions(access_ttl=timedelta(minutes=15))
+
+    asyncio.run(versions.load(db))
+
+    assert len(versions) == 1
+    assert not versions.accepts("u1", 1)
+    assert versions.accepts("u2", 0)
+
+
+class SlowRevocations(FakeRevocations):
+    """Writes land only when `land()` is called, as if still in flight."""
+
+    def __init__(self):
+        super().__init__()
+        self.pending = []
+
+    async def update_one(self, query, update, upsert=False):
+        self.pending.append((query, update))
+
+    async def land(self):
+        for query, update in self.pending:
+            await FakeRevocations.update_one(self, query, update)
+        self.pending = []
+
+
+def test_load_keeps_local_revocations_the_scan_has_not_seen():
+    db = FakeDb()
+    db.token_revocations = SlowRevocations()
+    versions = TokenVersions(access_ttl=timedelta(minutes=15))
+    asyncio.run(versions.revoke(db, "u1", 2))
+
+    asyncio.run(versions.load(db))
+    assert not versions.accepts("u1", 1)
+
+    asyncio.run(db.token_revocations.land())
+    asyncio.run(versions.load(db))
+    asyncio.run(versions.load(db))
+    assert not versions.accepts("u1", 1)
+    assert versions._recent == {}